@@ -0,0 +1,6 @@
+"""
+Benchmarks for Task Manager.
+
+Each module can be run on its own, for example:
+"python -m benchmarks.bench_connections".
+"""
@@ -0,0 +1,124 @@
+"""
+Concurrency benchmark for the asyncio services.
+
+Fires thousands of concurrent get_task and get_my_tasks calls at the
+AsyncTaskService and reports throughput and latency for a few worker pool
+sizes, next to the same calls made one after another on TaskService.
+
+Enter "python -m benchmarks.bench_async" into console to run.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from task_manager.async_services import AsyncTaskService
+from task_manager.business_logic import TaskService
+from task_manager.connection import ConnectionManager
+from task_manager.data_access import UserRepository
+
+
+def seed(connections, task_count, user_count):
+    """Adds user_count users and task_count tasks shared between them."""
+    db = connections.get_connection()
+    db.executemany(
+        "INSERT INTO user(username, password, email) VALUES(?, ?, ?)",
+        ((f"user{i}", "pwd", f"user{i}@test.com")
+         for i in range(user_count)),
+    )
+    db.executemany(
+        """
+        INSERT INTO tasks(title, description, assignedDate, dueDate,
+        userId)
+        VALUES(?, ?, ?, ?, (SELECT id FROM user WHERE username = ?))
+        """,
+        ((f"task {i}", "benchmark task", 20250101, 20251231,
+          f"user{i % user_count}")
+         for i in range(task_count)),
+    )
+    db.commit()
+
+
+def make_calls(count, task_count, user_count, seed_value=1):
+    """Returns a repeatable mix of (method name, argument) calls."""
+    rng = random.Random(seed_value)
+    calls = []
+    for _ in range(count):
+        if rng.random() < 0.8:
+            calls.append(("get_task", rng.randint(1, task_count)))
+        else:
+            calls.append(("get_my_tasks",
+                          f"user{rng.randrange(user_count)}"))
+    return calls
+
+
+async def run_async(service, calls):
+    """Runs every call at once. Returns (seconds, latencies)."""
+    async def timed(name, argument):
+        start = time.perf_counter()
+        await getattr(service, name)(argument)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(
+        *(timed(name, argument) for name, argument in calls))
+    return time.perf_counter() - start, latencies
+
+
+def run_sync(service, calls):
+    """Runs every call one after another. Returns (seconds, latencies)."""
+    latencies = []
+    start = time.perf_counter()
+    for name, argument in calls:
+        call_start = time.perf_counter()
+        getattr(service, name)(argument)
+        latencies.append(time.perf_counter() - call_start)
+    return time.perf_counter() - start, latencies
+
+
+def report(label, calls, seconds, latencies):
+    """Prints throughput and p50/p99 latency."""
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"{label:>22}: {len(calls) / seconds:>9,.0f} calls/sec, "
+          f"p50 {quantiles[49] * 1000:7.2f} ms, "
+          f"p99 {quantiles[98] * 1000:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--calls", type=int, default=5000,
+                        help="number of concurrent calls")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--cache-size", type=int, default=0,
+                        help="get_task cache size, 0 measures the database")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        connections = ConnectionManager(os.path.join(tmp, "bench.db"))
+        UserRepository(connections)
+        service = TaskService(connections, args.cache_size)
+        seed(connections, args.tasks, args.users)
+        calls = make_calls(args.calls, args.tasks, args.users)
+
+        print(f"{args.calls} calls, 80% get_task / 20% get_my_tasks")
+        report("TaskService sequential", calls,
+               *run_sync(service, calls))
+
+        for workers in args.workers:
+            async def run():
+                async with AsyncTaskService(
+                        connections, max_workers=workers,
+                        cache_size=args.cache_size) as async_service:
+                    return await run_async(async_service, calls)
+
+            report(f"async, {workers} worker(s)", calls, *asyncio.run(run()))
+
+        connections.close_all()
+
+
+if __name__ == "__main__":
+    main()
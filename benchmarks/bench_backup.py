@@ -0,0 +1,75 @@
+"""
+Benchmark of the online backup.
+
+Fills a temporary database, then backs it up with several step sizes
+while another thread keeps adding tasks, reporting the backup time and
+the writer's p50 and p99 commit latency during the backup. The text
+export of the same database is timed for comparison.
+
+Enter "python -m benchmarks.bench_backup" into console to run.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from task_manager.backup import backup_database
+from task_manager.connection import ConnectionManager
+from task_manager.data_access import TaskRepository, UserRepository
+from benchmarks.bench_csv import seed, timed
+
+
+def write_until(connections, stop, latencies):
+    """Adds tasks one per transaction until stop is set."""
+    repository = TaskRepository(connections)
+    while not stop.is_set():
+        start = time.perf_counter()
+        repository.add_task("live", "written during the backup",
+                            "2025-01-01", "2025-12-31", "admin")
+        latencies.append(time.perf_counter() - start)
+        stop.wait(0.001)
+    connections.close_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=1000000)
+    parser.add_argument("--pages", type=int, nargs="+",
+                        default=[-1, 4096, 1024, 256])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        connections = ConnectionManager(os.path.join(tmp, "bench.db"),
+                                        profile="fast")
+        UserRepository(connections)
+        repository = TaskRepository(connections)
+        seed(connections, args.tasks)
+        size = os.path.getsize(connections.database) / 2 ** 20
+        print(f"{args.tasks:,} tasks, {size:,.0f} MiB")
+
+        for pages in args.pages:
+            stop = threading.Event()
+            latencies = []
+            writer = threading.Thread(target=write_until,
+                                      args=(connections, stop, latencies))
+            writer.start()
+            seconds, summary = timed(backup_database, connections,
+                                     os.path.join(tmp, "backups"), pages,
+                                     keep=1)
+            stop.set()
+            writer.join()
+            quantiles = statistics.quantiles(latencies, n=100)
+            print(f"backup, {pages:>5} pages/step: {seconds:6.2f}s, "
+                  f"{len(latencies):>5} writes during it, p50 "
+                  f"{quantiles[49] * 1000:6.2f} ms, p99 "
+                  f"{quantiles[98] * 1000:6.2f} ms")
+
+        seconds, _ = timed(repository.export_tasks,
+                           os.path.join(tmp, "tasks.txt"))
+        print(f"export_tasks for comparison: {seconds:6.2f}s")
+        connections.close_all()
+
+
+if __name__ == "__main__":
+    main()
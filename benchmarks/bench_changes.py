@@ -0,0 +1,88 @@
+"""
+Benchmark of the change log.
+
+Times reading the newest changes with changes_since as the log grows, to
+check the cost follows the number of changes read rather than the size of
+the log, against re-reading every task with iter_all_tasks. Also times
+single task writes with and without the change log triggers.
+
+Enter "python -m benchmarks.bench_changes" into console to run.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from task_manager.business_logic import ChangeLogService, TaskService
+from task_manager.connection import ConnectionManager
+from task_manager.data_access import UserRepository
+from benchmarks.bench_csv import seed
+
+LOG_TRIGGERS = [f"{table}_log_{event}" for table in ("tasks", "user")
+                for event in ("insert", "update", "delete")]
+
+
+def time_writes(service, task_ids):
+    """Marks the tasks complete, one transaction each, and returns the
+    median seconds per write."""
+    latencies = []
+    for task_id in task_ids:
+        start = time.perf_counter()
+        service.mark_complete(task_id)
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10000, 100000, 1000000])
+    parser.add_argument("--changes", type=int, default=100)
+    parser.add_argument("--writes", type=int, default=2000)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            connections = ConnectionManager(os.path.join(tmp, "bench.db"),
+                                            profile="fast")
+            UserRepository(connections)
+            task_service = TaskService(connections)
+            change_service = ChangeLogService(connections)
+            seed(connections, size)
+
+            # The newest args.changes entries of a size entry log
+            after = change_service.latest_sequence() - args.changes
+            start = time.perf_counter()
+            changes = change_service.changes_since(after, args.changes)
+            delta = time.perf_counter() - start
+
+            start = time.perf_counter()
+            count = sum(1 for _ in task_service.iter_all_tasks())
+            full = time.perf_counter() - start
+            print(f"{size:>9,} logged: changes_since {len(changes)} "
+                  f"{delta * 1000:7.3f} ms, iter_all_tasks {count:,} "
+                  f"{full * 1000:9.1f} ms")
+            connections.close_all()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        connections = ConnectionManager(os.path.join(tmp, "bench.db"),
+                                        profile="fast")
+        UserRepository(connections)
+        service = TaskService(connections)
+        # Seeded tasks alternate complete and open, so use the open ones
+        seed(connections, args.writes * 4)
+        open_ids = range(1, args.writes * 4 + 1, 2)
+        logged = time_writes(service, open_ids[:args.writes])
+
+        db = connections.get_connection()
+        for name in LOG_TRIGGERS:
+            db.execute(f"DROP TRIGGER {name}")
+        db.commit()
+        unlogged = time_writes(service, open_ids[args.writes:])
+        print(f"mark_complete: {unlogged * 1e6:7.1f} us without the log, "
+              f"{logged * 1e6:7.1f} us with it")
+        connections.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark comparing the shared ConnectionManager against opening a new
+sqlite connection for every repository call.
+
+Enter "python -m benchmarks.bench_connections" into console to run.
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from task_manager.connection import ConnectionManager
+from task_manager.data_access import TaskRepository, UserRepository
+
+
+def seed(connections, task_count):
+    """Adds task_count tasks for the admin user and returns their IDs."""
+    db = connections.get_connection()
+    db.executemany(
+        """
+        INSERT INTO tasks(title, description, assignedDate, dueDate,
+        userId)
+        VALUES(?, ?, ?, ?, (SELECT id FROM user WHERE username = ?))
+        """,
+        (
+            (f"task {i}", "benchmark task", 20250101, 20251231,
+             "admin")
+            for i in range(task_count)
+        ),
+    )
+    db.commit()
+    return [row[0] for row in db.execute("SELECT id FROM tasks")]
+
+
+def connect_per_call_get_task(database, task_id):
+    """The original behaviour: connect, query and close on every call."""
+    db = sqlite3.connect(database)
+    cursor = db.cursor()
+    cursor.execute(
+        """
+        SELECT *
+        FROM tasks
+        WHERE id = ?
+        """,
+        (task_id,),
+    )
+    task = cursor.fetchone()
+    db.close()
+    return task
+
+
+def run_threads(target, thread_count, ops_per_thread):
+    """Runs target(ops) on thread_count threads and returns ops/sec."""
+    threads = [threading.Thread(target=target, args=(ops_per_thread,))
+               for _ in range(thread_count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return thread_count * ops_per_thread / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--ops", type=int, default=20000,
+                        help="operations per thread")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--cached-statements", type=int, default=128)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, "bench.db")
+        connections = ConnectionManager(
+            database, cached_statements=args.cached_statements)
+        UserRepository(connections)
+        repository = TaskRepository(connections)
+        task_ids = seed(connections, args.tasks)
+
+        def per_call(ops):
+            for i in range(ops):
+                connect_per_call_get_task(database,
+                                          task_ids[i % len(task_ids)])
+
+        def pooled(ops):
+            for i in range(ops):
+                repository.get_task(task_ids[i % len(task_ids)])
+            connections.close_connection()
+
+        print(f"get_task, {args.tasks} tasks, {args.ops} ops per thread")
+        for thread_count in (1, args.threads):
+            before = run_threads(per_call, thread_count, args.ops)
+            after = run_threads(pooled, thread_count, args.ops)
+            print(f"{thread_count} thread(s): connect per call "
+                  f"{before:,.0f} ops/sec, connection manager "
+                  f"{after:,.0f} ops/sec ({after / before:.1f}x)")
+
+        connections.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark of the CSV task export and import.
+
+Fills a temporary database with tasks whose descriptions contain commas,
+quotes and newlines, exports them to a CSV file, and imports that file into
+a fresh database. The parse step is also timed on its own against the
+original split(",") parser, on a file without special characters so both
+parsers see the same rows.
+
+Enter "python -m benchmarks.bench_csv" into console to run.
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from task_manager.connection import ConnectionManager
+from task_manager.data_access import (BULK_CHUNK_SIZE, TASK_FILE_FIELDS,
+                                      TaskRepository, UserRepository,
+                                      flag_to_int, parse_date,
+                                      parse_task_rows, read_chunks,
+                                      read_records)
+
+DESCRIPTIONS = [
+    "Plain description",
+    "Milk, eggs, bread",
+    'Ask for the "final" numbers',
+    "First line\nSecond line",
+]
+
+
+def seed(connections, task_count):
+    """Adds task_count tasks for the admin user."""
+    db = connections.get_connection()
+    db.executemany(
+        """
+        INSERT INTO tasks(title, description, assignedDate, dueDate,
+        isComplete, userId)
+        VALUES(?, ?, 20250101, 20251231, ?, 1)
+        """,
+        ((f"task {i}", DESCRIPTIONS[i % len(DESCRIPTIONS)], i % 2)
+         for i in range(task_count)),
+    )
+    db.commit()
+
+
+def split_lines(lines, usernames):
+    """The original parser: split(",") and strip every field, with the
+    same checks as parse_task_rows."""
+    rows = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        task = line.split(",")
+        if len(task) != 7:
+            continue
+        rows.append((int(task[0]), task[1].strip(), task[2].strip(),
+                     parse_date(task[3].strip()),
+                     parse_date(task[4].strip()),
+                     flag_to_int(task[5].strip().capitalize()),
+                     usernames.get(task[6].strip())))
+    return rows
+
+
+def write_plain_file(path, row_count):
+    """Writes row_count headerless rows without special characters."""
+    with open(path, "w", encoding="utf-8") as file:
+        for i in range(1, row_count + 1):
+            file.write(f"{i},task {i},plain description,2025-01-01,"
+                       f"2025-12-31,No,admin\n")
+
+
+def timed(function, *args, **kwargs):
+    """Runs function quietly and returns (seconds, result)."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def rate(rows, seconds):
+    """Formats a throughput figure."""
+    return f"{seconds:6.2f}s ({rows / seconds:>12,.0f} rows/sec)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2000000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tasks_file = os.path.join(tmp, "tasks.txt")
+        source = ConnectionManager(os.path.join(tmp, "source.db"),
+                                   profile="fast")
+        UserRepository(source)
+        repository = TaskRepository(source)
+        seed(source, args.rows)
+
+        print(f"{args.rows:,} tasks, 1 in 2 with a comma, quote or newline")
+        seconds, count = timed(repository.export_tasks, tasks_file)
+        print(f"export_tasks:          {rate(count, seconds)}")
+
+        copy = ConnectionManager(os.path.join(tmp, "copy.db"),
+                                 profile="fast")
+        UserRepository(copy)
+        seconds, summary = timed(TaskRepository(copy).bulk_import_tasks,
+                                 file_path=tasks_file)
+        print(f"bulk_import_tasks:     {rate(summary['added'], seconds)}")
+
+        same = (source.get_connection().execute(
+                    "SELECT COUNT(*), TOTAL(LENGTH(description)) FROM tasks"
+                ).fetchone()
+                == copy.get_connection().execute(
+                    "SELECT COUNT(*), TOTAL(LENGTH(description)) FROM tasks"
+                ).fetchone())
+        print(f"round trip:            {'same' if same else 'DIFFERENT'}")
+        source.close_all()
+        copy.close_all()
+
+        # Parse only, on a file both parsers read the same way. Each chunk
+        # is dropped once parsed, as the import does after inserting it.
+        write_plain_file(tasks_file, args.rows)
+        usernames = {"admin": 1}
+        with open(tasks_file, encoding="utf-8") as file:
+            seconds, _ = timed(lambda: sum(
+                len(split_lines(lines, usernames))
+                for lines in read_chunks(file, BULK_CHUNK_SIZE)))
+        print(f"parse, split(','):     {rate(args.rows, seconds)}")
+        with open(tasks_file, encoding="utf-8", newline="") as file:
+            csv_seconds, _ = timed(lambda: sum(
+                len(parse_task_rows(records, usernames)[0])
+                for records in read_chunks(
+                    read_records(file, TASK_FILE_FIELDS), BULK_CHUNK_SIZE)))
+        print(f"parse, csv reader:     {rate(args.rows, csv_seconds)} "
+              f"{seconds / csv_seconds:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
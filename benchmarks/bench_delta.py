@@ -0,0 +1,61 @@
+"""
+Benchmark of the delta task export against the full export.
+
+Fills a temporary database, runs a first delta export to set the
+watermark, then changes and deletes a few tasks and times the next delta
+export against a full export_tasks of the same database.
+
+Enter "python -m benchmarks.bench_delta" into console to run.
+"""
+import argparse
+import os
+import random
+import tempfile
+from task_manager.connection import ConnectionManager
+from task_manager.data_access import TaskRepository, UserRepository
+from benchmarks.bench_csv import rate, seed, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=1000000)
+    parser.add_argument("--changes", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        connections = ConnectionManager(os.path.join(tmp, "bench.db"),
+                                        profile="fast")
+        UserRepository(connections)
+        repository = TaskRepository(connections)
+        seed(connections, args.tasks)
+        changes_file = os.path.join(tmp, "changes.txt")
+
+        seconds, summary = timed(repository.export_task_changes,
+                                 changes_file)
+        print(f"{args.tasks:,} tasks")
+        print(f"first delta export:  {rate(summary['changed'], seconds)}")
+
+        task_ids = rng.sample(range(1, args.tasks + 1), args.changes)
+        deleted = task_ids[:args.changes // 10]
+        for task_id in task_ids[len(deleted):]:
+            repository.mark_complete(task_id)
+        for task_id in deleted:
+            repository.delete_task(task_id)
+
+        seconds, summary = timed(repository.export_task_changes,
+                                 changes_file)
+        delta = seconds
+        print(f"delta export:        {seconds * 1000:8.2f} ms "
+              f"({summary['changed']} changed, {summary['deleted']} "
+              f"deleted)")
+
+        seconds, count = timed(repository.export_tasks,
+                               os.path.join(tmp, "tasks.txt"))
+        print(f"full export:         {rate(count, seconds)} "
+              f"{seconds / delta:,.0f}x slower")
+        connections.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark comparing TaskRepository.import_tasks with bulk_import_tasks.
+
+Enter "python -m benchmarks.bench_import" into console to run.
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from pathlib import Path
+from task_manager import data_access
+from task_manager.connection import ConnectionManager
+from task_manager.data_access import TaskRepository, UserRepository
+
+
+def write_tasks_file(path, row_count):
+    """Writes row_count tasks for the admin user, 1 in 100 invalid."""
+    with open(path, "w", encoding="utf-8") as file:
+        for i in range(1, row_count + 1):
+            if i % 100 == 0:
+                file.write(f"{i},bad date,desc,2025-13-01,2025-12-31,No,"
+                           f"admin\n")
+            else:
+                file.write(f"{i},task {i},benchmark task,2025-01-01,"
+                           f"2025-12-31,No,admin\n")
+
+
+def time_import(database, run):
+    """Runs an import against a fresh database and returns the seconds."""
+    if os.path.exists(database):
+        os.remove(database)
+    connections = ConnectionManager(database)
+    UserRepository(connections)
+    repository = TaskRepository(connections)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        run(repository)
+    elapsed = time.perf_counter() - start
+
+    connections.close_all()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--chunk-size", type=int,
+                        default=data_access.BULK_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tasks_file = Path(tmp) / "tasks.txt"
+        database = os.path.join(tmp, "bench.db")
+        write_tasks_file(tasks_file, args.rows)
+
+        # import_tasks always reads TASKS_FILE
+        original_file = data_access.TASKS_FILE
+        data_access.TASKS_FILE = tasks_file
+        try:
+            before = time_import(
+                database, lambda repository: repository.import_tasks())
+        finally:
+            data_access.TASKS_FILE = original_file
+
+        after = time_import(
+            database, lambda repository: repository.bulk_import_tasks(
+                chunk_size=args.chunk_size, file_path=tasks_file))
+
+    print(f"Importing {args.rows:,} rows")
+    print(f"import_tasks:      {before:.2f}s "
+          f"({args.rows / before:,.0f} rows/sec)")
+    print(f"bulk_import_tasks: {after:.2f}s "
+          f"({args.rows / after:,.0f} rows/sec, {before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark of an in-memory database against database files.
+
+Times schema creation, single task commits and task lookups through the
+services on a ":memory:" database and on database files with the durable
+and fast storage profiles, as a guide to how much faster throwaway runs
+such as the tests are in memory.
+
+Enter "python -m benchmarks.bench_memory" into console to run.
+"""
+import argparse
+import os
+import tempfile
+import time
+from task_manager.business_logic import TaskService, UserService, Task
+from task_manager.connection import ConnectionManager
+
+
+def run(connections, tasks):
+    """Returns (setup, add, get) seconds for one database."""
+    start = time.perf_counter()
+    UserService(connections)
+    service = TaskService(connections, cache_size=0)
+    setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(tasks):
+        service.add_task(Task(title=f"task {i}", description="d",
+                              assigned_date="2025-01-01",
+                              due_date="2025-12-31", user="admin"))
+    add = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for task_id in range(1, tasks + 1):
+        service.get_task(task_id)
+    get = time.perf_counter() - start
+    connections.close_all()
+    return setup, add, get
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = [
+            ("file, durable", ConnectionManager(os.path.join(tmp, "d.db"))),
+            ("file, fast", ConnectionManager(os.path.join(tmp, "f.db"),
+                                             profile="fast")),
+            (":memory:", ConnectionManager(":memory:")),
+        ]
+        for name, connections in cases:
+            setup, add, get = run(connections, args.tasks)
+            print(f"{name:>14}: schema {setup * 1000:7.1f} ms, "
+                  f"add_task {args.tasks / add:>9,.0f}/sec, "
+                  f"get_task {args.tasks / get:>9,.0f}/sec")
+
+
+if __name__ == "__main__":
+    main()
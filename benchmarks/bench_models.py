@@ -0,0 +1,87 @@
+"""
+Benchmark of the Task model: memory per object and rows hydrated per
+second, comparing the __slots__ Task built with Task.from_row against the
+previous dict backed Task built with keyword arguments.
+
+Enter "python -m benchmarks.bench_models" into console to run.
+"""
+import argparse
+import time
+import tracemalloc
+from task_manager.business_logic import Task
+
+
+class DictTask:
+    """The previous dict backed Task model."""
+    def __init__(self, title, description, assigned_date, due_date, user,
+                 task_id=None, is_complete="No"):
+        self.task_id = task_id
+        self.title = title
+        self.description = description
+        self.assigned_date = assigned_date
+        self.due_date = due_date
+        self.is_complete = is_complete
+        self.user = user
+
+
+def keyword_hydrate(rows):
+    """The previous hand written mapping from rows to tasks."""
+    return [
+        DictTask(
+            task_id=task[0],
+            title=task[1],
+            description=task[2],
+            assigned_date=task[3],
+            due_date=task[4],
+            is_complete=task[5],
+            user=task[6]
+        )
+        for task in rows
+    ]
+
+
+def row_hydrate(rows):
+    """The current converter."""
+    return [Task.from_row(task) for task in rows]
+
+
+def bytes_per_object(hydrate, rows):
+    """Memory allocated per task, not counting the shared field values."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tasks = hydrate(rows)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del tasks
+    return (after - before) / len(rows)
+
+
+def rows_per_second(hydrate, rows, repeat):
+    """Best of repeat runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        hydrate(rows)
+        best = min(best, time.perf_counter() - start)
+    return len(rows) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = [(i, f"task {i}", "benchmark task", "2025-01-01", "2025-12-31",
+             "No", "admin") for i in range(args.rows)]
+
+    for name, hydrate in (("dict + keywords", keyword_hydrate),
+                          ("slots + from_row", row_hydrate)):
+        size = bytes_per_object(hydrate, rows)
+        speed = rows_per_second(hydrate, rows, args.repeat)
+        print(f"{name:<17} {size:6.0f} bytes/object, "
+              f"{speed:12,.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    main()
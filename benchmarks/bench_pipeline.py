@@ -0,0 +1,76 @@
+"""
+Benchmark showing how the bulk task import scales with worker processes.
+
+Each worker count imports the same file into a fresh database. The final
+rows and skip report are checked against the single process run.
+
+Enter "python -m benchmarks.bench_pipeline" into console to run.
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+from pathlib import Path
+from task_manager.connection import ConnectionManager
+from task_manager.data_access import (BULK_CHUNK_SIZE, TaskRepository,
+                                      UserRepository)
+from task_manager.import_pipeline import DEFAULT_WORKERS
+from benchmarks.bench_import import write_tasks_file
+
+
+def run_import(database, tasks_file, workers, chunk_size):
+    """Imports tasks_file into a fresh database and returns the results."""
+    if os.path.exists(database):
+        os.remove(database)
+    connections = ConnectionManager(database)
+    UserRepository(connections)
+    repository = TaskRepository(connections)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary = repository.bulk_import_tasks(
+            chunk_size=chunk_size, file_path=tasks_file, workers=workers)
+
+    db = connections.get_connection()
+    checksum = db.execute(
+        "SELECT COUNT(*), TOTAL(id), TOTAL(dueDate) FROM tasks"
+    ).fetchone()
+    connections.close_all()
+    return summary, checksum
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE)
+    parser.add_argument("--max-workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= args.max_workers:
+        worker_counts.append(worker_counts[-1] * 2)
+    if worker_counts[-1] != args.max_workers:
+        worker_counts.append(args.max_workers)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tasks_file = Path(tmp) / "tasks.txt"
+        database = os.path.join(tmp, "bench.db")
+        write_tasks_file(tasks_file, args.rows)
+
+        print(f"Importing {args.rows:,} rows, {os.cpu_count()} CPUs")
+        baseline = None
+        for workers in worker_counts:
+            summary, checksum = run_import(database, tasks_file, workers,
+                                           args.chunk_size)
+            result = (checksum, summary["skipped"])
+            if baseline is None:
+                baseline = (summary["seconds"], result)
+            same = "same" if result == baseline[1] else "DIFFERENT"
+            print(f"{workers:>3} worker(s): {summary['seconds']:.2f}s "
+                  f"({summary['rows_per_second']:,.0f} rows/sec, "
+                  f"{baseline[0] / summary['seconds']:.2f}x) "
+                  f"result {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark of rendering large task listings.
+
+Compares the original one print() per field output against the buffered
+Renderer modes. Output goes to a line buffered null device, which flushes
+on every newline the way a terminal does.
+
+Enter "python -m benchmarks.bench_render" into console to run.
+"""
+import argparse
+import contextlib
+import os
+import time
+from task_manager.business_logic import Task
+from task_manager.rendering import OUTPUT_MODES, Renderer
+
+PAGE_SIZE = 1000
+
+
+def make_tasks(count):
+    """Returns count tasks with realistic field lengths."""
+    return [Task.from_row((i, f"Task title number {i}",
+                           "A description of the work to be done " * 3,
+                           "2025-01-01", "2025-12-31", "No", f"user{i % 50}"))
+            for i in range(1, count + 1)]
+
+
+def print_per_field(tasks):
+    """The original listing: ten print() calls per task."""
+    for task in tasks:
+        print("-" * 80)
+        print(f"Task Number: {task.task_id}")
+        print(f"Task Assignee: {task.user}")
+        print(f"Assigned date: {task.assigned_date}")
+        print(f"Due date: {task.due_date}")
+        print(f"Task Title: {task.title}")
+        print(f"Completed: {task.is_complete}")
+        print("Task Description:")
+        print(f"{task.description}\n")
+    print("-" * 80 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=50000)
+    args = parser.parse_args()
+
+    tasks = make_tasks(args.tasks)
+    pages = [tasks[i:i + PAGE_SIZE] for i in range(0, len(tasks), PAGE_SIZE)]
+
+    with open(os.devnull, "w", buffering=1) as terminal:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(terminal):
+            print_per_field(tasks)
+        baseline = time.perf_counter() - start
+        print(f"{args.tasks} tasks, print per field: {baseline:.2f}s")
+
+        for mode in OUTPUT_MODES:
+            renderer = Renderer(mode, width=120)
+            start = time.perf_counter()
+            for number, page in enumerate(pages):
+                terminal.write(renderer.format(page, header=number == 0))
+            elapsed = time.perf_counter() - start
+            print(f"{args.tasks} tasks, {mode:>7}: {elapsed:.2f}s "
+                  f"({baseline / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
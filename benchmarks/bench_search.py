@@ -0,0 +1,129 @@
+"""
+Benchmark of the full text task search.
+
+Fills a temporary database with tasks whose titles and descriptions are
+made of random words, then times TaskService.search_tasks for rare words,
+common words, prefixes and searches limited to one user. Reports p50 and
+p99 latency.
+
+Enter "python -m benchmarks.bench_search" into console to run.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from itertools import accumulate
+from task_manager.business_logic import TaskService
+from task_manager.connection import ConnectionManager
+from task_manager.data_access import UserRepository
+
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "pa",
+             "do", "fi", "gu", "he", "ja"]
+
+
+def make_vocabulary(size, rng):
+    """Returns size made up words. Earlier words are used more often."""
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES)
+                          for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def seed(connections, task_count, users, vocabulary, rng):
+    """Adds users and task_count tasks made of random words, in batches."""
+    db = connections.get_connection()
+    db.executemany(
+        "INSERT INTO user(username, password, email) VALUES(?, ?, ?)",
+        ((f"user{i}", "pwd", f"user{i}@test.com") for i in range(users)),
+    )
+    # Zipf like weights so there are both very common and rare words.
+    # Cumulative weights are worked out once instead of on every call.
+    cum_weights = list(accumulate(1 / (rank + 1)
+                                  for rank in range(len(vocabulary))))
+
+    def text(count):
+        return " ".join(rng.choices(vocabulary, cum_weights=cum_weights,
+                                    k=count))
+
+    batch = 50000
+    for start in range(0, task_count, batch):
+        db.executemany(
+            """
+            INSERT INTO tasks(title, description, assignedDate, dueDate,
+            userId)
+            VALUES(?, ?, 20250101, 20251231,
+                   (SELECT id FROM user WHERE username = ?))
+            """,
+            ((text(4), text(20), f"user{i % users}")
+             for i in range(start, min(start + batch, task_count))),
+        )
+        db.commit()
+
+
+def time_searches(service, queries, user=None):
+    """Runs every query and returns the latencies in seconds."""
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        service.search_tasks(query, user)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name, latencies):
+    """Prints p50 and p99 latency in milliseconds."""
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"{name:>20}: p50 {quantiles[49] * 1000:8.3f} ms, "
+          f"p99 {quantiles[98] * 1000:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--words", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    vocabulary = make_vocabulary(args.words, rng)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        connections = ConnectionManager(os.path.join(tmp, "bench.db"),
+                                        profile="fast")
+        UserRepository(connections)
+        service = TaskService(connections)
+
+        start = time.perf_counter()
+        seed(connections, args.tasks, args.users, vocabulary, rng)
+        print(f"Indexed {args.tasks:,} tasks in "
+              f"{time.perf_counter() - start:.1f}s")
+
+        rare = vocabulary[len(vocabulary) // 2:]
+        cases = {
+            "rare word": [rng.choice(rare) for _ in range(args.queries)],
+            "two words": [f"{rng.choice(rare)} {rng.choice(vocabulary[:50])}"
+                          for _ in range(args.queries)],
+            "prefix": [rng.choice(rare)[:5] + "*"
+                       for _ in range(args.queries)],
+            "common word": [rng.choice(vocabulary[:10])
+                            for _ in range(args.queries // 10)],
+        }
+        for name, queries in cases.items():
+            report(name, time_searches(service, queries))
+
+        users = [f"user{rng.randrange(args.users)}"
+                 for _ in range(args.queries)]
+        latencies = []
+        for query, user in zip(cases["rare word"], users):
+            latencies += time_searches(service, [query], user)
+        report("rare word, one user", latencies)
+
+        connections.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Load test for the JSON API server.
+
+Starts the server on localhost against a temporary database, then runs
+client processes that each send requests over one kept alive connection:
+mostly task lookups, plus listings of the user's own tasks and a few new
+tasks. Reports requests/sec and p50/p99 latency.
+
+Enter "python -m benchmarks.bench_server" into console to run.
+"""
+import argparse
+import base64
+import http.client
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from task_manager.connection import ConnectionManager
+from task_manager.data_access import TaskRepository, UserRepository
+from task_manager.server import PooledHTTPServer
+from benchmarks.bench_async import seed
+
+
+def client(port, requests, task_count, user_count, client_id):
+    """
+    Sends requests over one connection as one of the seeded users.
+    Returns (latencies, errors).
+    """
+    rng = random.Random(client_id)
+    username = f"user{client_id % user_count}"
+    token = base64.b64encode(f"{username}:pwd".encode()).decode()
+    headers = {"Authorization": f"Basic {token}",
+               "Content-Type": "application/json"}
+    body = json.dumps({"title": "load test", "description": "bench",
+                       "due_date": "2099-01-01"})
+
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    latencies = []
+    errors = 0
+    for _ in range(requests):
+        choice = rng.random()
+        start = time.perf_counter()
+        if choice < 0.8:
+            connection.request("GET", f"/tasks/{rng.randint(1, task_count)}",
+                               headers=headers)
+        elif choice < 0.95:
+            connection.request("GET", "/tasks/mine?limit=20",
+                               headers=headers)
+        else:
+            connection.request("POST", "/tasks", body, headers)
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.status >= 400:
+            errors += 1
+
+    connection.close()
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--clients", type=int, default=8,
+                        help="concurrent client processes")
+    parser.add_argument("--requests", type=int, default=1000,
+                        help="requests per client")
+    parser.add_argument("--workers", type=int, default=16,
+                        help="server worker threads")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        connections = ConnectionManager(os.path.join(tmp, "bench.db"))
+        UserRepository(connections)
+        TaskRepository(connections)
+        seed(connections, args.tasks, args.users)
+
+        server = PooledHTTPServer(("127.0.0.1", 0), args.workers,
+                                  connections)
+        port = server.server_address[1]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        with ProcessPoolExecutor(max_workers=args.clients) as executor:
+            start = time.perf_counter()
+            results = list(executor.map(
+                client, [port] * args.clients,
+                [args.requests] * args.clients,
+                [args.tasks] * args.clients,
+                [args.users] * args.clients,
+                range(args.clients)))
+            elapsed = time.perf_counter() - start
+
+        server.shutdown()
+        server.server_close()
+
+    latencies = [latency for result in results for latency in result[0]]
+    errors = sum(result[1] for result in results)
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"{args.clients} clients x {args.requests} requests, "
+          f"{args.workers} server workers")
+    print(f"{len(latencies) / elapsed:,.0f} requests/sec, "
+          f"p50 {quantiles[49] * 1000:.2f} ms, "
+          f"p99 {quantiles[98] * 1000:.2f} ms, {errors} errors")
+
+
+if __name__ == "__main__":
+    main()
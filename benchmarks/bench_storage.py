@@ -0,0 +1,119 @@
+"""
+Benchmark of the storage profiles with several processes sharing one
+database file, as happens when more than one copy of the app is running.
+
+Writer processes keep adding tasks while reader processes keep looking
+tasks up and listing pages. Reports reads/sec, writes/sec and failed
+operations (such as "database is locked") for each profile.
+
+Enter "python -m benchmarks.bench_storage" into console to run.
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from task_manager.connection import ConnectionManager, STORAGE_PROFILES
+from task_manager.data_access import TaskRepository, UserRepository
+from benchmarks.bench_connections import seed
+
+
+def writer(database, profile, start, seconds):
+    """Adds tasks until the time is up. Returns (ops, failures)."""
+    connections = ConnectionManager(database, profile=profile)
+    repository = TaskRepository(connections)
+    ops = failures = 0
+
+    while time.time() < start:
+        time.sleep(0.001)
+
+    # Repository errors are printed, keep them out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        while time.time() < start + seconds:
+            task_id = repository.add_task("bench", "storage benchmark",
+                                          "2025-01-01", "2025-12-31",
+                                          "admin")
+            if task_id is None:
+                failures += 1
+            else:
+                ops += 1
+
+    connections.close_all()
+    return ops, failures
+
+
+def reader(database, profile, start, seconds, task_count):
+    """Reads tasks and pages until the time is up. Returns (ops, failures)."""
+    connections = ConnectionManager(database, profile=profile)
+    repository = TaskRepository(connections)
+    ops = failures = 0
+
+    while time.time() < start:
+        time.sleep(0.001)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        while time.time() < start + seconds:
+            task_id = ops % task_count + 1
+            if ops % 10 == 0:
+                result = repository.view_all_tasks_page(after_id=task_id)
+            else:
+                result = repository.get_task(task_id)
+            if result is None:
+                failures += 1
+            ops += 1
+
+    connections.close_all()
+    return ops - failures, failures
+
+
+def run_profile(profile, args):
+    """Runs the writers and readers against a fresh database."""
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, "bench.db")
+        connections = ConnectionManager(database, profile=profile)
+        UserRepository(connections)
+        TaskRepository(connections)
+        seed(connections, args.tasks)
+        connections.close_all()
+
+        workers = args.writers + args.readers
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Give every process time to start before the clock begins
+            start = time.time() + 1
+            writes = [executor.submit(writer, database, profile, start,
+                                      args.seconds)
+                      for _ in range(args.writers)]
+            reads = [executor.submit(reader, database, profile, start,
+                                     args.seconds, args.tasks)
+                     for _ in range(args.readers)]
+            write_ops, write_failures = map(sum, zip(
+                *(future.result() for future in writes)))
+            read_ops, read_failures = map(sum, zip(
+                *(future.result() for future in reads)))
+
+    print(f"{profile:>9}: {read_ops / args.seconds:>10,.0f} reads/sec "
+          f"{write_ops / args.seconds:>8,.0f} writes/sec "
+          f"{read_failures + write_failures:>6} failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--profiles", nargs="+",
+                        default=list(STORAGE_PROFILES),
+                        choices=list(STORAGE_PROFILES))
+    args = parser.parse_args()
+
+    print(f"{args.writers} writer and {args.readers} reader processes, "
+          f"{args.seconds:g} seconds per profile")
+    for profile in args.profiles:
+        run_profile(profile, args)
+
+
+if __name__ == "__main__":
+    main()
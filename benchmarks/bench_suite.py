@@ -0,0 +1,687 @@
+"""
+Benchmark suite for the repositories and services.
+
+For each size, seeds a temporary database with users and tasks from the
+deterministic generator in benchmarks.generate and times the methods of
+TaskRepository, UserRepository, ChangeLogRepository and their services,
+together with the import and export paths. Every case is warmed up, then
+run several times, and the results are written as JSON. Two result files
+can then be compared to find what got slower:
+
+    python -m benchmarks.bench_suite run -o before.json
+    (change the code)
+    python -m benchmarks.bench_suite run -o after.json
+    python -m benchmarks.bench_suite compare before.json after.json
+
+compare exits with status 1 when any case is slower by more than the
+threshold, or missing from the second file, so it can be used as a
+check. Use --sizes to pick the dataset sizes and --cases to only run
+cases whose name contains one of the given words. A full run takes
+about five minutes at 100,000 tasks and most of an hour at 1,000,000 on
+one core, mostly in the imports. validate_username and validate_user
+read from the keyboard and aren't timed.
+
+Enter "python -m benchmarks.bench_suite --help" into console for usage.
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from task_manager import data_access
+from task_manager.business_logic import (ChangeLogService, TaskService,
+                                         UserService, Task, User)
+from task_manager.connection import ConnectionManager
+from task_manager.data_access import (ChangeLogRepository, TaskRepository,
+                                      UserRepository)
+from benchmarks.generate import seed_database
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+
+# Calls per timed run for cases that touch a few rows. Cases that read or
+# write the whole dataset are called once per run.
+DEFAULT_NUMBER = 100
+DEFAULT_REPEAT = 5
+DEFAULT_WARMUP = 1
+
+# Fraction a case's median may grow by before compare calls it a regression
+DEFAULT_THRESHOLD = 0.10
+
+# The row by row imports take minutes at larger sizes, so are only timed
+# up to this many tasks
+ROW_IMPORT_LIMIT = 100000
+
+# Task titles whose words the search cases look for
+SEARCH_SAMPLE = 1000
+
+
+# ********** DATASET **********
+
+def seed_dataset(connections, task_count, seed):
+    """
+    Function: seed_dataset
+
+    Seeds one user for every 100 tasks (at least 10) and task_count tasks
+    with benchmarks.generate, so the same seed always gives the same
+    dataset.
+
+    Output:
+    - usernames: (list) the usernames added.
+    """
+    user_count = max(10, task_count // 100)
+    seed_database(connections, user_count, task_count, seed)
+    return [f"user{number}" for number in range(1, user_count + 1)]
+
+
+class Context:
+    """Services, repositories and row IDs shared by the cases of one size."""
+    def __init__(self, connections, size, usernames, tmp, rng):
+        self.connections = connections
+        self.size = size
+        self.usernames = usernames
+        self.tmp = tmp
+        self.rng = rng
+        self.task_repository = TaskRepository(connections)
+        self.user_repository = UserRepository(connections)
+        self.change_repository = ChangeLogRepository(connections)
+        self.task_service = TaskService(connections)
+        self.user_service = UserService(connections)
+        self.change_service = ChangeLogService(connections)
+        db = connections.get_connection()
+        # Tasks are completed and deleted at most once, so each case
+        # takes fresh IDs from these shared iterators
+        self.open_ids = iter([row[0] for row in db.execute(
+            "SELECT id FROM tasks WHERE isComplete = 0 ORDER BY id")])
+        self.delete_ids = iter(range(size, 0, -1))
+        self.user_ids = [row[0] for row in db.execute(
+            "SELECT id FROM user WHERE username != 'admin' ORDER BY id")]
+        self.passwords = dict(db.execute(
+            "SELECT username, password FROM user"))
+        self.words = sorted({
+            word for (title,) in db.execute(
+                "SELECT title FROM tasks ORDER BY id LIMIT ?",
+                (SEARCH_SAMPLE,))
+            for word in title.split()[:2]})
+        self.names = itertools.count()
+        self.tasks_file = os.path.join(tmp, "tasks.txt")
+        self.users_file = os.path.join(tmp, "users.txt")
+        self.changes_file = os.path.join(tmp, "changes.txt")
+
+    def task_id(self):
+        """
+        Function: task_id
+
+        Returns a random ID of a seeded task.
+        """
+        return self.rng.randrange(1, self.size + 1)
+
+    def username(self):
+        """
+        Function: username
+
+        Returns a random seeded username.
+        """
+        return self.rng.choice(self.usernames)
+
+    def word(self):
+        """
+        Function: word
+
+        Returns a random word of the task titles to search for.
+        """
+        return self.rng.choice(self.words)
+
+    def new_task(self):
+        """
+        Function: new_task
+
+        Returns a new Task for a random seeded user, not yet added.
+        """
+        return Task(title=f"bench {next(self.names)}", description="d",
+                    assigned_date="2025-06-01", due_date="2025-07-01",
+                    user=self.username())
+
+    def new_username(self):
+        """
+        Function: new_username
+
+        Returns a username no user has yet.
+        """
+        return f"bench{next(self.names)}"
+
+    def import_target(self, users=True):
+        """
+        Function: import_target
+
+        Returns a manager for a new database for an import to write into.
+
+        Input:
+        - users: (bool) copy the users of the dataset into it, so imported
+          tasks find their assignees.
+
+        Output:
+        - target: (ConnectionManager) manager of the new database.
+        """
+        path = os.path.join(self.tmp, f"import{next(self.names)}.db")
+        target = ConnectionManager(path)
+        UserRepository(target)
+        TaskRepository(target)
+        if not users:
+            return target
+        target_db = target.get_connection()
+        target_db.executemany(
+            "INSERT OR IGNORE INTO user(id, username, password, email, "
+            "isAdmin) VALUES(?, ?, ?, ?, ?)",
+            self.connections.get_connection().execute(
+                "SELECT id, username, password, email, isAdmin FROM user"))
+        target_db.commit()
+        return target
+
+
+# ********** CASES **********
+
+class Case:
+    """
+    One timed operation.
+
+    Attributes:
+    - name (str): "Class.method" of the method timed
+    - call (function): called as call(context, prepared) for each timing
+    - whole (bool): reads or writes the whole dataset, so it is called
+      once per run instead of DEFAULT_NUMBER times
+    - prepare (function): untimed, called as prepare(context) before each
+      call; its result is passed to call
+    - max_size (int): largest dataset the case is run on
+    """
+    __slots__ = ("name", "call", "whole", "prepare", "max_size")
+
+    def __init__(self, name, call, whole=False, prepare=None,
+                 max_size=None):
+        self.name = name
+        self.call = call
+        self.whole = whole
+        self.prepare = prepare
+        self.max_size = max_size
+
+
+def drain(iterator):
+    """Consumes a generator of tasks."""
+    for _ in iterator:
+        pass
+
+
+def export_then_import(path_name, export_name):
+    """Returns a prepare function that exports the source database to
+    path_name once and gives each import a new target database."""
+    def prepare(context):
+        path = getattr(context, path_name)
+        if not os.path.exists(path):
+            getattr(context.task_repository if export_name == "tasks"
+                    else context.user_repository,
+                    f"export_{export_name}")(path)
+        return context.import_target(users=export_name == "tasks")
+    return prepare
+
+
+def row_import(records):
+    """Times the row by row import of records, which always reads the
+    default file, so points it at the exported file for the run."""
+    def call(context, target):
+        name = "TASKS_FILE" if records == "tasks" else "USERS_FILE"
+        original = getattr(data_access, name)
+        setattr(data_access, name, getattr(context, f"{records}_file"))
+        try:
+            repository = (TaskRepository(target) if records == "tasks"
+                          else UserRepository(target))
+            getattr(repository, f"import_{records}")()
+        finally:
+            setattr(data_access, name, original)
+            target.close_all()
+    return call
+
+
+def bulk_import(records):
+    """Times the bulk import of records from the exported file."""
+    def call(context, target):
+        repository = (TaskRepository(target) if records == "tasks"
+                      else UserRepository(target))
+        getattr(repository, f"bulk_import_{records}")(
+            file_path=getattr(context, f"{records}_file"))
+        target.close_all()
+    return call
+
+
+def add_user(context):
+    """Adds a user for a delete case to remove, so the seeded users and
+    their tasks are left alone."""
+    return context.user_repository.add_user(context.new_username(), "pwd",
+                                            "bench@example.com")
+
+
+def touch_tasks(context):
+    """Changes a few tasks after a delta export, for the next one."""
+    context.task_repository.export_task_changes(context.changes_file)
+    for _ in range(100):
+        context.task_repository.update_task(
+            "touched", "d", "2025-08-01", context.username(),
+            context.task_id())
+
+
+def build_cases():
+    """Returns every case, in the order they are run. Cases that delete
+    rows come last so the others see the whole dataset."""
+    cases = []
+    for layer, attribute in (("TaskRepository", "task_repository"),
+                             ("TaskService", "task_service")):
+        def tasks(c, attribute=attribute):
+            return getattr(c, attribute)
+
+        cases += [
+            Case(f"{layer}.get_task",
+                 lambda c, _, t=tasks: t(c).get_task(c.task_id())),
+            Case(f"{layer}.get_my_tasks",
+                 lambda c, _, t=tasks: t(c).get_my_tasks(c.username())),
+            Case(f"{layer}.view_all_tasks",
+                 lambda c, _, t=tasks: t(c).view_all_tasks(), whole=True),
+            Case(f"{layer}.completed_tasks",
+                 lambda c, _, t=tasks: t(c).completed_tasks(), whole=True),
+            Case(f"{layer}.overdue_tasks",
+                 lambda c, _, t=tasks: t(c).overdue_tasks(), whole=True),
+            Case(f"{layer}.iter_all_tasks",
+                 lambda c, _, t=tasks: drain(t(c).iter_all_tasks()),
+                 whole=True),
+            Case(f"{layer}.iter_my_tasks",
+                 lambda c, _, t=tasks: drain(
+                     t(c).iter_my_tasks(c.username()))),
+            Case(f"{layer}.iter_completed_tasks",
+                 lambda c, _, t=tasks: drain(t(c).iter_completed_tasks()),
+                 whole=True),
+            Case(f"{layer}.iter_overdue_tasks",
+                 lambda c, _, t=tasks: drain(t(c).iter_overdue_tasks()),
+                 whole=True),
+            Case(f"{layer}.view_all_tasks_page",
+                 lambda c, _, t=tasks: t(c).view_all_tasks_page(
+                     c.task_id())),
+            Case(f"{layer}.get_my_tasks_page",
+                 lambda c, _, t=tasks: t(c).get_my_tasks_page(
+                     c.username())),
+            Case(f"{layer}.completed_tasks_page",
+                 lambda c, _, t=tasks: t(c).completed_tasks_page(
+                     c.task_id())),
+            Case(f"{layer}.overdue_tasks_page",
+                 lambda c, _, t=tasks: t(c).overdue_tasks_page()),
+            Case(f"{layer}.search_tasks",
+                 lambda c, _, t=tasks: t(c).search_tasks(c.word())),
+            Case(f"{layer}.task_stats",
+                 lambda c, _, t=tasks: t(c).task_stats()),
+        ]
+
+    cases += [
+        Case("TaskRepository.add_task",
+             lambda c, _: c.task_repository.add_task(
+                 "bench", "d", "2025-06-01", "2025-07-01", c.username())),
+        Case("TaskService.add_task",
+             lambda c, _: c.task_service.add_task(c.new_task())),
+        Case("TaskRepository.update_task",
+             lambda c, _: c.task_repository.update_task(
+                 "updated", "d", "2025-08-01", c.username(), c.task_id())),
+        Case("TaskService.update_task",
+             lambda c, _: c.task_service.update_task(Task(
+                 "updated", "d", "2025-06-01", "2025-08-01", c.username(),
+                 c.task_id()))),
+        Case("TaskRepository.mark_complete",
+             lambda c, _: c.task_repository.mark_complete(
+                 next(c.open_ids))),
+        Case("TaskService.mark_complete",
+             lambda c, _: c.task_service.mark_complete(next(c.open_ids))),
+        Case("TaskRepository.apply_batch",
+             lambda c, _: c.task_repository.apply_batch(
+                 [("add", ("bench", "d", "2025-06-01", "2025-07-01",
+                           c.username()))] * 10)),
+        Case("TaskService.apply_batch",
+             lambda c, _: c.task_service.apply_batch(
+                 [("add", c.new_task()) for _ in range(10)])),
+
+        Case("UserRepository.login",
+             lambda c, name: c.user_repository.login(name,
+                                                     c.passwords[name]),
+             prepare=Context.username),
+        Case("UserService.login",
+             lambda c, name: c.user_service.login(name, c.passwords[name]),
+             prepare=Context.username),
+        Case("UserRepository.assignee_exists",
+             lambda c, _: c.user_repository.assignee_exists(c.username())),
+        Case("UserService.assignee_exists",
+             lambda c, _: c.user_service.assignee_exists(c.username())),
+        Case("UserRepository.get_user",
+             lambda c, _: c.user_repository.get_user(
+                 c.rng.choice(c.user_ids))),
+        Case("UserService.get_user",
+             lambda c, _: c.user_service.get_user(
+                 c.rng.choice(c.user_ids))),
+        Case("UserRepository.view_all_users",
+             lambda c, _: c.user_repository.view_all_users(), whole=True),
+        Case("UserService.view_all_users",
+             lambda c, _: c.user_service.view_all_users(), whole=True),
+        Case("UserRepository.add_user",
+             lambda c, _: c.user_repository.add_user(
+                 c.new_username(), "pwd", "bench@example.com")),
+        Case("UserService.add_user",
+             lambda c, _: c.user_service.add_user(
+                 User(c.new_username(), "pwd", "bench@example.com"))),
+        Case("UserRepository.update_user",
+             lambda c, _: c.user_repository.update_user(
+                 *c.user_repository.get_user(c.rng.choice(c.user_ids))[:4])),
+        Case("UserService.update_user",
+             lambda c, _: c.user_service.update_user(
+                 c.user_service.get_user(c.rng.choice(c.user_ids)))),
+        Case("UserRepository.make_admin",
+             lambda c, _: c.user_repository.make_admin(
+                 c.rng.choice(c.user_ids))),
+        Case("UserService.make_admin",
+             lambda c, _: c.user_service.make_admin(
+                 c.rng.choice(c.user_ids))),
+
+        Case("ChangeLogRepository.changes_since",
+             lambda c, _: c.change_repository.changes_since(
+                 c.change_repository.latest_sequence() - 100, 100)),
+        Case("ChangeLogService.changes_since",
+             lambda c, _: c.change_service.changes_since(
+                 c.change_service.latest_sequence() - 100, 100)),
+        Case("ChangeLogRepository.latest_sequence",
+             lambda c, _: c.change_repository.latest_sequence()),
+        Case("ChangeLogRepository.save_checkpoint",
+             lambda c, _: c.change_repository.save_checkpoint(
+                 "bench", c.change_repository.latest_sequence())),
+        Case("ChangeLogRepository.get_checkpoint",
+             lambda c, _: c.change_repository.get_checkpoint("bench")),
+
+        Case("TaskRepository.export_tasks",
+             lambda c, _: c.task_repository.export_tasks(c.tasks_file),
+             whole=True),
+        Case("TaskRepository.export_task_changes",
+             lambda c, _: c.task_repository.export_task_changes(
+                 c.changes_file), whole=True, prepare=touch_tasks),
+        Case("TaskRepository.bulk_import_tasks", bulk_import("tasks"),
+             whole=True, prepare=export_then_import("tasks_file", "tasks")),
+        Case("TaskRepository.import_tasks", row_import("tasks"),
+             whole=True, prepare=export_then_import("tasks_file", "tasks"),
+             max_size=ROW_IMPORT_LIMIT),
+        Case("UserRepository.export_users",
+             lambda c, _: c.user_repository.export_users(c.users_file),
+             whole=True),
+        Case("UserRepository.bulk_import_users", bulk_import("users"),
+             whole=True, prepare=export_then_import("users_file", "users")),
+        Case("UserRepository.import_users", row_import("users"),
+             whole=True, prepare=export_then_import("users_file", "users"),
+             max_size=ROW_IMPORT_LIMIT),
+
+        Case("TaskRepository.delete_task",
+             lambda c, _: c.task_repository.delete_task(next(c.delete_ids))),
+        Case("TaskService.delete_task",
+             lambda c, _: c.task_service.delete_task(next(c.delete_ids))),
+        Case("UserRepository.delete_user",
+             lambda c, user_id: c.user_repository.delete_user(user_id),
+             prepare=add_user),
+        Case("UserService.delete_user",
+             lambda c, user_id: c.user_service.delete_user(user_id),
+             prepare=add_user),
+        Case("ChangeLogRepository.prune_changes",
+             lambda c, _: c.change_repository.prune_changes(), whole=True),
+    ]
+    return cases
+
+
+# ********** RUNNING **********
+
+def time_case(case, context, number, repeat, warmup):
+    """
+    Function: time_case
+
+    Warms a case up, then times repeat runs of number calls each.
+
+    Output:
+    - timing: (dict) seconds per call of the median, fastest and slowest
+      run, the standard deviation between runs, and the run settings.
+    """
+    runs = []
+    for run in range(warmup + repeat):
+        elapsed = 0.0
+        for _ in range(number):
+            prepared = case.prepare(context) if case.prepare else None
+            start = time.perf_counter()
+            case.call(context, prepared)
+            elapsed += time.perf_counter() - start
+        if run >= warmup:
+            runs.append(elapsed / number)
+    return {"median": statistics.median(runs), "min": min(runs),
+            "max": max(runs),
+            "stdev": statistics.stdev(runs) if len(runs) > 1 else 0.0,
+            "number": number, "repeat": repeat}
+
+
+def run_suite(sizes, number=DEFAULT_NUMBER, repeat=DEFAULT_REPEAT,
+              warmup=DEFAULT_WARMUP, names=None, seed=1, progress=None):
+    """
+    Function: run_suite
+
+    Runs every case, or those whose name contains one of names, against
+    a new database of each size.
+
+    Output:
+    - results: (dict) run details under "meta" and one entry per case and
+      size under "results".
+    """
+    cases = [case for case in build_cases()
+             if not names or any(name in case.name for name in names)]
+    results = []
+    for size in sizes:
+        rng = random.Random(seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            connections = ConnectionManager(os.path.join(tmp, "bench.db"))
+            UserRepository(connections)
+            TaskRepository(connections)
+            ChangeLogRepository(connections)
+            usernames = seed_dataset(connections, size, seed)
+            context = Context(connections, size, usernames, tmp, rng)
+
+            for case in cases:
+                if case.max_size and size > case.max_size:
+                    continue
+                with open(os.devnull, "w") as quiet, \
+                        contextlib.redirect_stdout(quiet):
+                    timing = time_case(case, context,
+                                       1 if case.whole else number,
+                                       repeat, warmup)
+                result = {"case": case.name, "size": size, **timing}
+                results.append(result)
+                if progress:
+                    progress(result)
+            connections.close_all()
+
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "sizes": sizes, "number": number, "repeat": repeat,
+            "warmup": warmup, "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare_results(before, after, threshold=DEFAULT_THRESHOLD):
+    """
+    Function: compare_results
+
+    Compares the median time per call of the cases in two result sets.
+    Cases only in after are new and left out.
+
+    Input:
+    - before, after: (dict) results from run_suite.
+    - threshold: (float) fraction a median may grow by before it counts
+      as a regression.
+
+    Output:
+    - rows: (list) (case, size, before, after, ratio, verdict) for each
+      case and size in before, where verdict is "regression", "faster",
+      "" or "missing" for a case that crashed or was removed. Missing
+      cases have None for after and ratio.
+    """
+    new = {(result["case"], result["size"]): result["median"]
+           for result in after["results"]}
+    rows = []
+    for result in before["results"]:
+        key = (result["case"], result["size"])
+        old = result["median"]
+        if key not in new:
+            rows.append((*key, old, None, None, "missing"))
+            continue
+        if old:
+            ratio = new[key] / old
+        else:
+            # Too fast to measure before, only slower if it now takes time
+            ratio = float("inf") if new[key] else 1.0
+        verdict = ("regression" if ratio > 1 + threshold
+                   else "faster" if ratio < 1 - threshold else "")
+        rows.append((*key, old, new[key], ratio, verdict))
+    return rows
+
+
+def format_seconds(seconds):
+    """Formats a time per call with a readable unit."""
+    if seconds >= 1:
+        return f"{seconds:8.2f} s "
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:8.2f} ms"
+    return f"{seconds * 1e6:8.1f} us"
+
+
+def print_result(result):
+    """
+    Function: print_result
+
+    Prints the timing of one case to stderr as the suite runs.
+
+    Input:
+    - result: (dict) one entry of the run_suite results.
+    """
+    print(f"{result['size']:>9,} {result['case']:<40} "
+          f"{format_seconds(result['median'])} "
+          f"(min {format_seconds(result['min']).strip()})", file=sys.stderr)
+
+
+def run_command(args):
+    """
+    Function: run_command
+
+    Runs the suite and writes the results as JSON to --output or stdout.
+
+    Input:
+    - args: (Namespace) parsed "run" arguments.
+
+    Output:
+    - status: (int) exit status, always 0.
+    """
+    results = run_suite(args.sizes, args.number, args.repeat, args.warmup,
+                        args.cases, args.seed, progress=print_result)
+    text = json.dumps(results, indent=2) + "\n"
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text)
+    else:
+        sys.stdout.write(text)
+    return 0
+
+
+def compare_command(args):
+    """
+    Function: compare_command
+
+    Prints the comparison of two result files, see compare_results.
+
+    Input:
+    - args: (Namespace) parsed "compare" arguments.
+
+    Output:
+    - status: (int) exit status, 1 if any case got slower or is missing
+      from the second file, otherwise 0.
+    """
+    with open(args.before, encoding="utf-8") as file:
+        before = json.load(file)
+    with open(args.after, encoding="utf-8") as file:
+        after = json.load(file)
+
+    rows = compare_results(before, after, args.threshold)
+    for case, size, old, new, ratio, verdict in rows:
+        if verdict == "missing":
+            print(f"{size:>9,} {case:<40} {format_seconds(old)} -> "
+                  f"missing")
+            continue
+        print(f"{size:>9,} {case:<40} {format_seconds(old)} -> "
+              f"{format_seconds(new)} {ratio:6.2f}x {verdict}")
+    regressions = sum(1 for row in rows if row[5] == "regression")
+    missing = sum(1 for row in rows if row[5] == "missing")
+    print(f"{len(rows)} cases compared, {regressions} regressions, "
+          f"{missing} missing (threshold {args.threshold:.0%})")
+    return 1 if regressions or missing else 0
+
+
+def main(argv=None):
+    """
+    Function: main
+
+    Runs the "run" or "compare" command.
+
+    Input:
+    - argv: (list) command line arguments, sys.argv by default.
+
+    Output:
+    - status: (int) exit status of the command.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.bench_suite",
+        description="Time the repositories and services, or compare two "
+                    "result files.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the suite")
+    run.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                     help="numbers of tasks to seed")
+    run.add_argument("--number", type=int, default=DEFAULT_NUMBER,
+                     help="calls per run of the cases touching few rows")
+    run.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    run.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+    run.add_argument("--cases", nargs="+",
+                     help="only run cases whose name contains one of these")
+    run.add_argument("--seed", type=int, default=1)
+    run.add_argument("-o", "--output", help="JSON file, stdout by default")
+    run.set_defaults(run=run_command)
+
+    compare = commands.add_parser(
+        "compare", help="compare two result files")
+    compare.add_argument("before")
+    compare.add_argument("after")
+    compare.add_argument("--threshold", type=float,
+                         default=DEFAULT_THRESHOLD,
+                         help="slowdown flagged as a regression, as a "
+                              "fraction")
+    compare.set_defaults(run=compare_command)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
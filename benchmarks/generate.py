@@ -0,0 +1,457 @@
+"""
+Deterministic synthetic data for load testing.
+
+Generates users and tasks from a seeded random number generator, so the
+same arguments always give exactly the same data. The data can be written
+as 'users.txt' and 'tasks.txt' in the format import_users/import_tasks
+and the bulk imports read, or inserted straight into a database.
+
+How the tasks are spread is set by a TaskShape:
+- tasks per user follow a Zipf like distribution, from even (skew 0) to a
+  few users holding most tasks (skew 1 and above).
+- assigned dates are spread evenly over span_days from start, and due
+  dates follow an exponential distribution after them, so most tasks are
+  due soon and a few much later.
+- complete is the fraction of completed tasks.
+- descriptions have an even spread of description_words words, taken
+  from a made up vocabulary where earlier words are more common, like
+  real text, so full text searches see both rare and common words.
+
+Titles and descriptions are cut from one long pre-drawn run of words
+instead of drawing every word separately, which keeps generation at
+several hundred thousand tasks per second.
+
+Direct seeding suspends the task and user triggers and drops the task
+indexes while it inserts, then rebuilds the indexes, the search index and
+the task counts in one pass each, all in a single transaction. Seeded
+rows are not added to the change log, as if the database had been loaded
+from a backup.
+
+Direct seeding falls short of the file writing rate. On one core, 1M
+tasks take about 4.7s to generate and 5.5s more to insert, roughly 100,000
+rows/sec. Rebuilding the indexes and counts takes about 5s and the full
+text search index another 20 to 25s, so the whole seed runs at 25,000 to
+30,000 rows/sec. The search index rebuild is sqlite's own FTS5 work, with prefix
+indexes on every token, and can't be left out without the triggers
+corrupting it on the next update. The summary times each phase
+separately.
+
+Enter "python -m benchmarks.generate --help" into console for usage.
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+from datetime import date
+from itertools import accumulate, islice
+from math import log
+from task_manager.connection import ConnectionManager
+from task_manager.data_access import (CSV_DIALECT, TASK_FILE_FIELDS,
+                                      USER_FILE_FIELDS, TaskRepository,
+                                      UserRepository)
+from task_manager.migrations import CHANGE_CLOCK
+from benchmarks.bench_search import make_vocabulary
+
+# Rows generated and inserted or written per batch
+BATCH_SIZE = 50000
+
+# Number of distinct words descriptions are made of
+VOCABULARY_SIZE = 5000
+
+# Length of the run of words titles and descriptions are cut from
+WORD_POOL_SIZE = 1 << 20
+
+# Fraction of generated users that are admins
+ADMIN_RATIO = 0.01
+
+
+class TaskShape:
+    """
+    How generated tasks are spread over users, dates and lengths.
+
+    Attributes:
+    - skew (float): Zipf exponent of tasks per user, 0 for an even spread
+    - start (date): first assigned date
+    - span_days (int): number of days assigned dates are spread over
+    - due_days (float): mean number of days from assigned to due date
+    - complete (float): fraction of tasks that are complete
+    - description_words (tuple): fewest and most words in a description
+    """
+    __slots__ = ("skew", "start", "span_days", "due_days", "complete",
+                 "description_words")
+
+    def __init__(self, skew=1.0, start=date(2025, 1, 1), span_days=730,
+                 due_days=30.0, complete=0.3, description_words=(5, 40)):
+        """Initialises the shape, checking the values make sense"""
+        if skew < 0 or span_days < 1 or due_days < 0:
+            raise ValueError("skew, span_days and due_days can't be "
+                             "negative.")
+        if not 0 <= complete <= 1:
+            raise ValueError("complete must be between 0 and 1.")
+        fewest, most = description_words
+        if not 1 <= fewest <= most:
+            raise ValueError("description_words must be (fewest, most) "
+                             "with 1 <= fewest <= most.")
+        self.skew = skew
+        self.start = start
+        self.span_days = span_days
+        self.due_days = due_days
+        self.complete = complete
+        self.description_words = description_words
+
+
+def check_counts(users, tasks):
+    """
+    Function: check_counts
+
+    Checks the numbers of users and tasks to generate.
+
+    Output:
+    - ValueError: raised if either is negative, or if there are tasks but
+      no users to assign them to.
+    """
+    if users < 0 or tasks < 0:
+        raise ValueError("users and tasks can't be negative.")
+    if tasks and not users:
+        raise ValueError("Tasks need at least one user to be assigned to.")
+
+
+def generate_users(count, rng):
+    """
+    Function: generate_users
+
+    Yields count users as (number, username, password, email, is admin)
+    tuples, numbered from 1.
+    """
+    for number in range(1, count + 1):
+        yield (number, f"user{number}", f"pass{rng.randrange(10 ** 6)}",
+               f"user{number}@example.com", rng.random() < ADMIN_RATIO)
+
+
+def generate_tasks(count, user_count, rng, shape=None):
+    """
+    Function: generate_tasks
+
+    Yields count tasks as (number, title, description, assigned day, due
+    day, is complete, user number) tuples. Days count from shape.start
+    and users are numbered from 1, as from generate_users.
+
+    Input:
+    - count: (int) number of tasks.
+    - user_count: (int) number of users to assign them to.
+    - rng: (random.Random) source of randomness.
+    - shape: (TaskShape) how the tasks are spread, TaskShape() by default.
+    """
+    check_counts(user_count, count)
+    shape = shape or TaskShape()
+    fewest, most = shape.description_words
+    vocabulary = make_vocabulary(VOCABULARY_SIZE, rng)
+    words = rng.choices(vocabulary, k=WORD_POOL_SIZE + most, cum_weights=list(
+        accumulate(1 / rank for rank in range(1, VOCABULARY_SIZE + 1))))
+    # Text of the whole run, and where each word of it starts
+    text = " ".join(words) + " "
+    starts = list(accumulate((len(word) + 1 for word in words), initial=0))
+
+    # Users are shuffled so the busiest aren't always the first ones
+    users = list(range(1, user_count + 1))
+    rng.shuffle(users)
+    user_weights = list(accumulate(1 / rank ** shape.skew
+                                   for rank in range(1, user_count + 1)))
+    lengths = most - fewest + 1
+    span_days = shape.span_days
+    due_days = shape.due_days
+    complete = shape.complete
+
+    # This loop is where generation spends its time, so everything it uses
+    # is a local name and random numbers are drawn as few times as
+    # possible: one 40 bit draw gives the two word positions and one 64 bit
+    # draw the description length, assigned day and completion. Due dates
+    # use the same formula as random.expovariate without the extra call.
+    word_bits = WORD_POOL_SIZE.bit_length() - 1
+    word_mask = WORD_POOL_SIZE - 1
+    complete_below = int(complete * (1 << 24))
+    getrandbits = rng.getrandbits
+    random_value = rng.random
+    number = 0
+    while number < count:
+        batch = min(BATCH_SIZE, count - number)
+        for user in rng.choices(users, cum_weights=user_weights, k=batch):
+            number += 1
+            words = getrandbits(2 * word_bits)
+            title = words >> word_bits
+            first = words & word_mask
+            bits = getrandbits(64)
+            last = first + fewest + (bits & 0xFFFF) % lengths
+            assigned = (bits >> 16 & 0xFFFFFF) % span_days
+            due = assigned + int(-log(1.0 - random_value()) * due_days)
+            yield (number,
+                   f"{text[starts[title]:starts[title + 2] - 1]} {number}",
+                   text[starts[first]:starts[last] - 1],
+                   assigned, due, bits >> 40 < complete_below, user)
+
+
+class DayNames(dict):
+    """
+    Formats day numbers counted from a start date, as 'YYYY-MM-DD' text or
+    as the YYYYMMDD integers stored in the database. Each day is only
+    formatted once, later lookups are plain dictionary hits.
+    """
+    def __init__(self, start, text):
+        """
+        Initialise the DayNames, empty until days are looked up.
+
+        Input:
+        - start: (date) the date of day 0.
+        - text: (bool) format days as 'YYYY-MM-DD' text, otherwise as
+          YYYYMMDD integers.
+        """
+        super().__init__()
+        self.start = start.toordinal()
+        self.text = text
+
+    def __missing__(self, day):
+        value = date.fromordinal(self.start + day)
+        value = (value.strftime("%Y-%m-%d") if self.text
+                 else value.year * 10000 + value.month * 100 + value.day)
+        self[day] = value
+        return value
+
+
+def write_files(directory, users, tasks, seed=1, shape=None,
+                dialect=CSV_DIALECT):
+    """
+    Function: write_files
+
+    Writes 'users.txt' and 'tasks.txt' with generated data, with a header
+    row, in the format the imports read. User IDs start at 2 as the
+    database always has the admin user with ID 1.
+
+    Input:
+    - directory: (str) where to write the files.
+    - users, tasks: (int) how many of each to generate.
+    - seed: (int) seed of the random number generator.
+    - shape: (TaskShape) how the tasks are spread.
+    - dialect: (str or csv.Dialect) CSV dialect to write.
+
+    Output:
+    - summary: (dict) the paths written, the row counts and seconds taken.
+    - ValueError: raised for counts check_counts refuses, before anything
+      is written.
+    """
+    check_counts(users, tasks)
+    start = time.perf_counter()
+    rng = random.Random(seed)
+    shape = shape or TaskShape()
+    users_path = os.path.join(directory, "users.txt")
+    tasks_path = os.path.join(directory, "tasks.txt")
+
+    with open(users_path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file, dialect)
+        writer.writerow(USER_FILE_FIELDS)
+        writer.writerows(
+            (number + 1, username, password, email,
+             "Yes" if admin else "No")
+            for number, username, password, email, admin
+            in generate_users(users, rng))
+
+    # Generated task fields are only letters, digits, spaces and dashes,
+    # so they never need quoting and the lines can be joined directly,
+    # about five times faster than csv.writer with the same output
+    days = DayNames(shape.start, text=True)
+    with open(tasks_path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file, dialect)
+        writer.writerow(TASK_FILE_FIELDS)
+        end = writer.dialect.lineterminator
+        join = writer.dialect.delimiter.join
+        file.writelines(
+            join((str(number), title, description, days[assigned],
+                  days[due], "Yes" if complete else "No", f"user{user}"))
+            + end
+            for number, title, description, assigned, due, complete, user
+            in generate_tasks(tasks, users, rng, shape))
+
+    return {"users_file": users_path, "tasks_file": tasks_path,
+            "users": users, "tasks": tasks,
+            "seconds": round(time.perf_counter() - start, 3)}
+
+
+def seed_database(connections, users, tasks, seed=1, shape=None):
+    """
+    Function: seed_database
+
+    Inserts generated users and tasks straight into a database, after any
+    rows it already holds. Generated usernames must not be taken yet.
+
+    Input:
+    - connections: (ConnectionManager) manager of the database to fill.
+    - users, tasks: (int) how many of each to generate.
+    - seed: (int) seed of the random number generator.
+    - shape: (TaskShape) how the tasks are spread.
+
+    Output:
+    - summary: (dict) the row counts, the seconds spent inserting,
+      rebuilding the indexes, triggers and counts, and rebuilding the
+      full text search index, and the seconds in total.
+    - ValueError: raised for counts check_counts refuses, before anything
+      is written.
+    """
+    check_counts(users, tasks)
+    start = time.perf_counter()
+    rng = random.Random(seed)
+    shape = shape or TaskShape()
+    # Makes sure the schema is up to date
+    UserRepository(connections)
+    TaskRepository(connections)
+    db = connections.get_connection()
+    cursor = db.cursor()
+
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        # Building an index once at the end is much faster than keeping
+        # it up to date row by row
+        suspended = cursor.execute(
+            """
+            SELECT type, name, sql FROM sqlite_master
+            WHERE (type = 'trigger' AND tbl_name IN ('tasks', 'user'))
+            OR (type = 'index' AND tbl_name = 'tasks' AND sql IS NOT NULL)
+            """
+        ).fetchall()
+        for kind, name, _ in suspended:
+            cursor.execute(f'DROP {kind.upper()} "{name}"')
+
+        cursor.executemany(
+            "INSERT INTO user(username, password, email, isAdmin) "
+            "VALUES(?, ?, ?, ?)",
+            (row[1:] for row in generate_users(users, rng)))
+        by_name = dict(cursor.execute("SELECT username, id FROM user"))
+        # Indexed by user number, which starts at 1
+        user_ids = [None] + [by_name[f"user{number}"]
+                             for number in range(1, users + 1)]
+        first_id, updated_at = cursor.execute(
+            f"SELECT IFNULL(MAX(id), 0) + 1, {CHANGE_CLOCK} FROM tasks"
+        ).fetchone()
+
+        days = DayNames(shape.start, text=False)
+        rows = ((first_id + number - 1, title, description, days[assigned],
+                 days[due], complete, user_ids[user], updated_at)
+                for number, title, description, assigned, due, complete,
+                user in generate_tasks(tasks, users, rng, shape))
+        while True:
+            batch = list(islice(rows, BATCH_SIZE))
+            if not batch:
+                break
+            cursor.executemany(
+                """
+                INSERT INTO tasks(id, title, description, assignedDate,
+                dueDate, isComplete, userId, updatedAt)
+                VALUES(?, ?, ?, ?, ?, ?, ?, ?)
+                """, batch)
+        inserted = time.perf_counter()
+
+        for _, _, sql in suspended:
+            cursor.execute(sql)
+        # Bring up to date what the suspended triggers maintain
+        cursor.execute("DELETE FROM task_counts")
+        cursor.execute(
+            """
+            INSERT INTO task_counts(userId, open, completed)
+            SELECT IFNULL(userId, 0), SUM(isComplete = 0),
+            SUM(isComplete != 0)
+            FROM tasks
+            GROUP BY IFNULL(userId, 0)
+            """
+        )
+        cursor.execute("DELETE FROM task_tombstones WHERE taskId >= ?",
+                       (first_id,))
+        indexed = time.perf_counter()
+        # The search index is also kept by the triggers, and is timed on
+        # its own as it takes most of the time
+        cursor.execute("INSERT INTO tasks_fts(tasks_fts) VALUES('rebuild')")
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+
+    end = time.perf_counter()
+    return {"users": users, "tasks": tasks,
+            "insert_seconds": round(inserted - start, 3),
+            "index_seconds": round(indexed - inserted, 3),
+            "search_seconds": round(end - indexed, 3),
+            "seconds": round(end - start, 3)}
+
+
+def main(argv=None):
+    """
+    Function: main
+
+    Writes the files or seeds the database as asked on the command line,
+    then prints the rows per second to stderr.
+
+    Input:
+    - argv: (list) command line arguments, sys.argv by default.
+
+    Output:
+    - status: (int) exit status, 0 on success. Invalid options exit with
+      status 2 through argparse.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.generate",
+        description="Generate users and tasks for load testing.")
+    parser.add_argument("target", choices=("files", "database"),
+                        help="write 'users.txt' and 'tasks.txt', or insert "
+                             "into a database")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--tasks", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--directory", default=".",
+                        help="where to write the files")
+    parser.add_argument("--database", default="generated.db",
+                        help="database file or 'file:' URI to fill")
+    parser.add_argument("--skew", type=float, default=1.0,
+                        help="Zipf exponent of tasks per user, 0 for even")
+    parser.add_argument("--start", type=date.fromisoformat,
+                        default=date(2025, 1, 1),
+                        help="first assigned date, YYYY-MM-DD")
+    parser.add_argument("--span-days", type=int, default=730,
+                        help="days the assigned dates are spread over")
+    parser.add_argument("--due-days", type=float, default=30.0,
+                        help="mean days from assigned to due date")
+    parser.add_argument("--complete", type=float, default=0.3,
+                        help="fraction of tasks completed")
+    parser.add_argument("--description-words", type=int, nargs=2,
+                        default=(5, 40), metavar=("FEWEST", "MOST"))
+    args = parser.parse_args(argv)
+
+    try:
+        check_counts(args.users, args.tasks)
+        shape = TaskShape(args.skew, args.start, args.span_days,
+                          args.due_days, args.complete,
+                          tuple(args.description_words))
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.target == "files":
+        summary = write_files(args.directory, args.users, args.tasks,
+                              args.seed, shape)
+    else:
+        connections = ConnectionManager(args.database, profile="fast")
+        summary = seed_database(connections, args.users, args.tasks,
+                                args.seed, shape)
+        connections.close_all()
+
+    rows = summary["users"] + summary["tasks"]
+    print(f"{summary['users']:,} users and {summary['tasks']:,} tasks in "
+          f"{summary['seconds']:.2f}s ({rows / summary['seconds']:,.0f} "
+          f"rows/sec)", file=sys.stderr)
+    if args.target == "database":
+        print(f"inserting {summary['insert_seconds']:.2f}s "
+              f"({rows / summary['insert_seconds']:,.0f} rows/sec), "
+              f"indexing {summary['index_seconds']:.2f}s, search index "
+              f"{summary['search_seconds']:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
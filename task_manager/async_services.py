@@ -0,0 +1,304 @@
+"""
+Asyncio versions of the Task Manager services.
+
+AsyncTaskService and AsyncUserService mirror TaskService and UserService
+for code running in an asyncio event loop. Every call runs the matching
+synchronous service method on a bounded pool of worker threads, so sqlite
+never blocks the event loop, and each worker thread uses its own
+connection from the ConnectionManager.
+
+Calls can be given a deadline with the service timeout or by wrapping them
+in asyncio.wait_for(). A cancelled call that hasn't started yet never runs,
+and one that is already running has its sqlite query interrupted.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from task_manager.business_logic import TaskService, UserService
+from task_manager.cache import CACHE_SIZE
+from task_manager.data_access import (CSV_DIALECT, ITER_BATCH_SIZE,
+                                      PAGE_SIZE, SEARCH_LIMIT)
+
+# Default number of worker threads running database calls for a service
+ASYNC_WORKERS = 4
+
+
+class _AsyncService:
+    """
+    Runs the methods of a synchronous service on a thread pool.
+    """
+    def __init__(self, service, connections, max_workers=ASYNC_WORKERS,
+                 timeout=None, executor=None):
+        """
+        Initialise the service.
+
+        Input:
+        - service: the synchronous service the calls are made on.
+        - connections: (ConnectionManager) manager used by the service.
+        - max_workers: (int) number of worker threads.
+        - timeout: (float) seconds each call may take, None for no limit.
+        - executor: (ThreadPoolExecutor) optional pool to share with other
+          services. It is not shut down by close().
+        """
+        self.service = service
+        self.connections = connections
+        self.timeout = timeout
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="task-manager-db")
+
+    async def _run(self, method, *args):
+        """
+        Runs method(*args) on a worker thread and returns its result.
+
+        If the call times out or is cancelled while it is running, the
+        worker's connection is interrupted so the query stops early instead
+        of keeping the thread busy.
+        """
+        lock = threading.Lock()
+        running = {}
+
+        def call():
+            db = self.connections.get_connection()
+            with lock:
+                running["db"] = db
+            try:
+                return method(*args)
+            finally:
+                with lock:
+                    running.clear()
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, call)
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            with lock:
+                if running:
+                    running["db"].interrupt()
+            raise
+
+    async def close(self):
+        """
+        Function: close
+
+        Waits for calls already running to finish, then stops the worker
+        threads. Calls that haven't started yet are cancelled.
+        """
+        if self._owns_executor:
+            await asyncio.get_running_loop().run_in_executor(
+                None, lambda: self.executor.shutdown(cancel_futures=True))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class AsyncTaskService(_AsyncService):
+    """
+    Asyncio version of TaskService. Each method returns the same result as
+    the TaskService method of the same name.
+    """
+    def __init__(self, connections=None, max_workers=ASYNC_WORKERS,
+                 timeout=None, executor=None, cache_size=CACHE_SIZE):
+        """
+        Initialise the AsyncTaskService with a TaskService. See
+        _AsyncService for the other arguments.
+        """
+        service = TaskService(connections, cache_size)
+        super().__init__(service, service.task_repository.connections,
+                         max_workers, timeout, executor)
+
+    async def add_task(self, task):
+        """Adds a new task to the database."""
+        return await self._run(self.service.add_task, task)
+
+    async def get_task(self, task_id):
+        """Retrieves a task in the database using the task_id."""
+        return await self._run(self.service.get_task, task_id)
+
+    async def get_my_tasks(self, user):
+        """Returns all tasks assigned to the logged in user."""
+        return await self._run(self.service.get_my_tasks, user)
+
+    async def view_all_tasks(self):
+        """Returns all tasks in the database."""
+        return await self._run(self.service.view_all_tasks)
+
+    async def completed_tasks(self):
+        """Returns all completed tasks."""
+        return await self._run(self.service.completed_tasks)
+
+    async def overdue_tasks(self):
+        """Returns all incomplete tasks past their due date."""
+        return await self._run(self.service.overdue_tasks)
+
+    async def view_all_tasks_page(self, after_id=0, limit=PAGE_SIZE):
+        """Returns one page of all tasks, after the task with ID after_id."""
+        return await self._run(self.service.view_all_tasks_page, after_id,
+                               limit)
+
+    async def get_my_tasks_page(self, user, after_id=0, limit=PAGE_SIZE):
+        """Returns one page of a user's tasks, after ID after_id."""
+        return await self._run(self.service.get_my_tasks_page, user,
+                               after_id, limit)
+
+    async def completed_tasks_page(self, after_id=0, limit=PAGE_SIZE):
+        """Returns one page of completed tasks, after ID after_id."""
+        return await self._run(self.service.completed_tasks_page, after_id,
+                               limit)
+
+    async def overdue_tasks_page(self, after_due_date=None, after_id=0,
+                                 limit=PAGE_SIZE):
+        """Returns one page of overdue tasks ordered by due date."""
+        return await self._run(self.service.overdue_tasks_page,
+                               after_due_date, after_id, limit)
+
+    async def iter_all_tasks(self, batch_size=ITER_BATCH_SIZE):
+        """
+        Async generator of all tasks. Tasks are read batch_size at a time
+        with the page methods, so no cursor is held open between batches.
+        """
+        after_id = 0
+        while True:
+            tasks = await self.view_all_tasks_page(after_id, batch_size)
+            for task in tasks:
+                yield task
+            if len(tasks) < batch_size:
+                return
+            after_id = tasks[-1].task_id
+
+    async def iter_my_tasks(self, user, batch_size=ITER_BATCH_SIZE):
+        """Async generator of the tasks assigned to user."""
+        after_id = 0
+        while True:
+            tasks = await self.get_my_tasks_page(user, after_id, batch_size)
+            for task in tasks:
+                yield task
+            if len(tasks) < batch_size:
+                return
+            after_id = tasks[-1].task_id
+
+    async def iter_completed_tasks(self, batch_size=ITER_BATCH_SIZE):
+        """Async generator of completed tasks."""
+        after_id = 0
+        while True:
+            tasks = await self.completed_tasks_page(after_id, batch_size)
+            for task in tasks:
+                yield task
+            if len(tasks) < batch_size:
+                return
+            after_id = tasks[-1].task_id
+
+    async def iter_overdue_tasks(self, batch_size=ITER_BATCH_SIZE):
+        """Async generator of overdue tasks ordered by due date."""
+        after_due_date, after_id = None, 0
+        while True:
+            tasks = await self.overdue_tasks_page(after_due_date, after_id,
+                                                  batch_size)
+            for task in tasks:
+                yield task
+            if len(tasks) < batch_size:
+                return
+            after_due_date, after_id = tasks[-1].due_date, tasks[-1].task_id
+
+    async def search_tasks(self, query, user=None, limit=SEARCH_LIMIT):
+        """Searches task titles and descriptions, best match first."""
+        return await self._run(self.service.search_tasks, query, user, limit)
+
+    async def task_stats(self):
+        """Returns the open, completed and total tasks for each user."""
+        return await self._run(self.service.task_stats)
+
+    async def update_task(self, task):
+        """Updates the details of a task."""
+        return await self._run(self.service.update_task, task)
+
+    async def mark_complete(self, task_id):
+        """Marks a task as complete."""
+        return await self._run(self.service.mark_complete, task_id)
+
+    async def delete_task(self, task_id):
+        """Deletes a task from the database."""
+        return await self._run(self.service.delete_task, task_id)
+
+    async def apply_batch(self, operations, owner=None):
+        """Applies many operations in a single transaction."""
+        return await self._run(self.service.apply_batch, operations, owner)
+
+    async def import_tasks(self, bulk=False, workers=1, dialect=CSV_DIALECT):
+        """Imports tasks from the 'tasks.txt' file."""
+        return await self._run(self.service.import_tasks, bulk, workers,
+                               dialect)
+
+    async def export_tasks(self, dialect=CSV_DIALECT):
+        """Exports all tasks to the 'tasks.txt' file."""
+        return await self._run(self.service.export_tasks, dialect)
+
+    async def export_task_changes(self, since=None, dialect=CSV_DIALECT):
+        """Exports the tasks changed since the last delta export."""
+        return await self._run(self.service.export_task_changes, since,
+                               dialect)
+
+
+class AsyncUserService(_AsyncService):
+    """
+    Asyncio version of UserService. Each method returns the same result as
+    the UserService method of the same name.
+    """
+    def __init__(self, connections=None, max_workers=ASYNC_WORKERS,
+                 timeout=None, executor=None, cache_size=CACHE_SIZE):
+        """
+        Initialise the AsyncUserService with a UserService. See
+        _AsyncService for the other arguments.
+        """
+        service = UserService(connections, cache_size)
+        super().__init__(service, service.user_repository.connections,
+                         max_workers, timeout, executor)
+
+    async def login(self, username, password):
+        """Checks a user's credentials."""
+        return await self._run(self.service.login, username, password)
+
+    async def view_all_users(self):
+        """Returns all users in the system."""
+        return await self._run(self.service.view_all_users)
+
+    async def add_user(self, user):
+        """Adds a new user to the system."""
+        return await self._run(self.service.add_user, user)
+
+    async def validate_user(self, prompt):
+        """Checks whether a username is already in use."""
+        return await self._run(self.service.validate_user, prompt)
+
+    async def assignee_exists(self, username):
+        """Checks that a user exists before assigning them a task."""
+        return await self._run(self.service.assignee_exists, username)
+
+    async def get_user(self, user_id):
+        """Returns the details of a user using the unique ID."""
+        return await self._run(self.service.get_user, user_id)
+
+    async def update_user(self, user):
+        """Updates a user's details."""
+        return await self._run(self.service.update_user, user)
+
+    async def make_admin(self, user_id):
+        """Grants admin privileges to a user."""
+        return await self._run(self.service.make_admin, user_id)
+
+    async def delete_user(self, user_id):
+        """Deletes a user from the system."""
+        return await self._run(self.service.delete_user, user_id)
+
+    async def import_users(self, bulk=False, workers=1, dialect=CSV_DIALECT):
+        """Imports users from the 'users.txt' file."""
+        return await self._run(self.service.import_users, bulk, workers,
+                               dialect)
+
+    async def export_users(self, dialect=CSV_DIALECT):
+        """Exports all users to the 'users.txt' file."""
+        return await self._run(self.service.export_users, dialect)
@@ -0,0 +1,244 @@
+"""
+Online backup and restore for Task Manager.
+
+Backups are page for page copies of the database made with the sqlite
+backup API while the application keeps running. The copy is taken from a
+single read transaction, so it is a consistent snapshot even while other
+connections write: in WAL mode writers carry on as normal and the backup
+never has to restart. Pages are copied a few at a time with a short sleep
+in between, so the backup doesn't hog the disk.
+
+Each backup is written to a temporary file, checked with
+'PRAGMA integrity_check' and only then renamed into place, so a finished
+backup file is always usable. Older backups beyond a set number are
+removed.
+"""
+import os
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from task_manager.connection import DEFAULT_DATABASE, default_manager
+from task_manager.migrations import migrate
+
+# Pages copied per backup step, 4 MiB with the default 4 KiB page size
+BACKUP_PAGES = 1024
+
+# Seconds to sleep between backup steps, letting other connections write
+BACKUP_SLEEP = 0.005
+
+# Number of backups kept by rotation
+BACKUP_KEEP = 7
+
+# Name of the backup directory, next to the database file. Backups of an
+# in-memory database go in the working directory.
+BACKUP_DIRECTORY = "backups"
+
+# Suffix of a backup that is still being written or checked
+PARTIAL_SUFFIX = ".partial"
+
+
+def backup_directory(database):
+    """Returns the default backup directory for a database file."""
+    return Path(database).resolve().parent / BACKUP_DIRECTORY
+
+
+def backup_name(database, when):
+    """
+    Returns the file name of a backup of database taken at when. Names
+    sort in the order the backups were taken.
+    """
+    return f"{Path(database).stem}-{when:%Y%m%d-%H%M%S-%f}.db"
+
+
+def list_backups(database, directory=None):
+    """
+    Function: list_backups
+
+    Returns the finished backups of a database, newest first.
+
+    Input:
+    - database: (str) path of the database file.
+    - directory: (str) backup directory, see backup_directory() for the
+      default.
+
+    Output:
+    - backups: (list) Path of each backup file.
+    """
+    directory = Path(directory or backup_directory(database))
+    if not directory.is_dir():
+        return []
+    return sorted(directory.glob(f"{Path(database).stem}-*.db"),
+                  reverse=True)
+
+
+def integrity_check(path):
+    """
+    Function: integrity_check
+
+    Checks a database file with 'PRAGMA integrity_check', opened read only
+    so a damaged file is never changed.
+
+    Input:
+    - path: (str) path of the database file.
+
+    Output:
+    - problems: (list) the problems found, empty if the file is sound.
+    """
+    uri = f"{Path(path).resolve().as_uri()}?mode=ro"
+    try:
+        db = sqlite3.connect(uri, uri=True)
+        try:
+            rows = db.execute("PRAGMA integrity_check").fetchall()
+        finally:
+            db.close()
+    except sqlite3.DatabaseError as e:
+        return [str(e)]
+    return [row[0] for row in rows if row[0] != "ok"]
+
+
+def rotate_backups(database, directory=None, keep=BACKUP_KEEP):
+    """
+    Function: rotate_backups
+
+    Removes all but the newest keep backups of a database.
+
+    Output:
+    - removed: (list) Path of each removed backup.
+    """
+    removed = list_backups(database, directory)[keep:]
+    for path in removed:
+        path.unlink()
+    return removed
+
+
+def backup_database(connections=None, directory=None, pages=BACKUP_PAGES,
+                    sleep=BACKUP_SLEEP, keep=BACKUP_KEEP, progress=None):
+    """
+    Function: backup_database
+
+    Copies the live database into a new, checked backup file and rotates
+    the old backups.
+
+    Input:
+    - connections: (ConnectionManager) manager of the database to back up,
+      the shared default manager if not given.
+    - directory: (str) where to put the backup, see backup_directory()
+      for the default. Created if it doesn't exist.
+    - pages: (int) pages copied per step, -1 to copy everything at once.
+    - sleep: (float) seconds to sleep between steps.
+    - keep: (int) number of backups to keep, None to keep them all.
+    - progress: (function) called as progress(status, remaining, total)
+      after each step, see sqlite3.Connection.backup.
+
+    Output:
+    - summary: (dict) the backup path, its size in pages, the seconds
+      taken and the paths of the backups removed by rotation.
+    - None: occurs if there is a sqlite3 error or the copy fails its
+      integrity check.
+    """
+    connections = connections or default_manager
+    database = connections.path or Path(DEFAULT_DATABASE)
+    directory = Path(directory or backup_directory(database))
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / backup_name(database, datetime.now())
+    partial = path.with_name(path.name + PARTIAL_SUFFIX)
+
+    start = time.perf_counter()
+    source = None
+    target = None
+    try:
+        source = connections.connect()
+        target = sqlite3.connect(partial)
+        # Hold one read transaction for the whole copy. Commits made by
+        # other connections meanwhile aren't seen, so the backup never
+        # restarts and is a snapshot of a single point in time.
+        source.execute("BEGIN")
+        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        source.backup(target, pages=pages, progress=progress, sleep=sleep)
+        source.rollback()
+        # A backup is a single self contained file, whatever the journal
+        # mode of the live database
+        target.execute("PRAGMA journal_mode = DELETE")
+        page_count = target.execute("PRAGMA page_count").fetchone()[0]
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+        page_count = None
+    finally:
+        for db in (source, target):
+            if db is not None:
+                db.close()
+
+    if page_count is None:
+        partial.unlink(missing_ok=True)
+        return None
+
+    problems = integrity_check(partial)
+    if problems:
+        partial.unlink()
+        print(f"Backup failed integrity check: {'; '.join(problems)}")
+        return None
+
+    os.replace(partial, path)
+    removed = (rotate_backups(database, directory, keep)
+               if keep is not None else [])
+    return {"backup": str(path), "pages": page_count,
+            "seconds": round(time.perf_counter() - start, 3),
+            "removed": [str(old) for old in removed]}
+
+
+def restore_database(backup_path, connections=None, pages=-1,
+                     sleep=BACKUP_SLEEP):
+    """
+    Function: restore_database
+
+    Replaces the contents of the live database with a backup. The backup
+    is checked first and left untouched. The restore is a single write
+    transaction, so other connections see either the old database or the
+    restored one. The restored database is then upgraded to the current
+    schema version if the backup was taken by an older release.
+
+    Input:
+    - backup_path: (str) path of the backup file.
+    - connections: (ConnectionManager) manager of the database to restore
+      into, the shared default manager if not given.
+    - pages, sleep: as for backup_database. Everything is copied in one
+      step by default.
+
+    Output:
+    - summary: (dict) the backup path, the number of pages restored and
+      the schema version afterwards.
+    - None: occurs if the backup is missing or damaged, or if there is a
+      sqlite3 error.
+    """
+    connections = connections or default_manager
+    if not Path(backup_path).is_file():
+        print(f"Backup not found: {backup_path}")
+        return None
+    problems = integrity_check(backup_path)
+    if problems:
+        print(f"Backup failed integrity check: {'; '.join(problems)}")
+        return None
+
+    # Opened first, so an in-memory database exists before the restore
+    live = connections.get_connection()
+    source = None
+    target = None
+    try:
+        source = sqlite3.connect(
+            f"{Path(backup_path).resolve().as_uri()}?mode=ro", uri=True)
+        # A separate connection, so every connection of the manager sees
+        # the restore as a change by someone else and drops cached data
+        target = connections.connect(timeout=30)
+        source.backup(target, pages=pages, sleep=sleep)
+        page_count = target.execute("PRAGMA page_count").fetchone()[0]
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+        return None
+    finally:
+        for db in (source, target):
+            if db is not None:
+                db.close()
+
+    return {"backup": str(backup_path), "pages": page_count,
+            "version": migrate(live)}
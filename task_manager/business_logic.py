@@ -4,7 +4,16 @@ Business logic layer for Task Manager.
 Creates services for managing tasks and users and provides the link between
 database and user interface.
 """
-from task_manager.data_access import TaskRepository, UserRepository
+import json
+import time
+from task_manager.cache import CACHE_SIZE, LRUCache
+from task_manager.data_access import (CHANGE_BATCH_SIZE, CSV_DIALECT,
+                                      ITER_BATCH_SIZE, PAGE_SIZE,
+                                      SEARCH_LIMIT, ChangeLogRepository,
+                                      TaskRepository, UserRepository)
+
+# Seconds tail() waits before polling the change log again when it is empty
+POLL_INTERVAL = 1.0
 
 
 class TaskService:
@@ -13,9 +22,15 @@ class TaskService:
 
     Coordniates with the TaskRepository to support CRUD for tasks.
     """
-    def __init__(self):
-        """Initialise the TaskService with a TaskRepository"""
-        self.task_repository = TaskRepository()
+    def __init__(self, connections=None, cache_size=CACHE_SIZE):
+        """
+        Initialise the TaskService with a TaskRepository. An optional
+        ConnectionManager can be given to use a different database.
+        Tasks looked up by ID are kept in an LRU cache of cache_size
+        entries, see cache.py.
+        """
+        self.task_repository = TaskRepository(connections)
+        self.cache = LRUCache(self.task_repository.connections, cache_size)
 
     def add_task(self, task):
         """
@@ -23,32 +38,31 @@ class TaskService:
         Calls 'add_task' function from the TaskRepository in data_access.py
         to handle interaction with the database.
         """
-        return self.task_repository.add_task(task.title,
-                                             task.description,
-                                             task.assigned_date,
-                                             task.due_date,
-                                             task.user
-                                             )
+        with self.cache.changing():
+            return self.task_repository.add_task(task.title,
+                                                 task.description,
+                                                 task.assigned_date,
+                                                 task.due_date,
+                                                 task.user
+                                                 )
 
     def get_task(self, task_id):
         """
-        Retrieves a task in the database using the task_id.
+        Retrieves a task in the database using the task_id. Results are
+        cached, so the returned task should not be modified in place.
         Calls 'get_task' function from the TaskRepository in data_access.py to
         handle interaction with the database.
         """
+        return self.cache.get(("task", task_id),
+                              lambda: self._load_task(task_id))
+
+    def _load_task(self, task_id):
+        """Reads a task from the database for the cache."""
         task = self.task_repository.get_task(task_id)
         if not task:
             return None
 
-        return Task(
-            task_id=task[0],
-            title=task[1],
-            description=task[2],
-            assigned_date=task[3],
-            due_date=task[4],
-            is_complete=task[5],
-            user=task[6],
-        )
+        return Task.from_row(task)
 
     def get_my_tasks(self, user):
         """
@@ -60,18 +74,7 @@ class TaskService:
         if not tasks:
             return []
 
-        return [
-            Task(
-                task_id=task[0],
-                title=task[1],
-                description=task[2],
-                assigned_date=task[3],
-                due_date=task[4],
-                is_complete=task[5],
-                user=task[6]
-            )
-            for task in tasks
-        ]
+        return [Task.from_row(task) for task in tasks]
 
     def view_all_tasks(self):
         """
@@ -84,18 +87,7 @@ class TaskService:
         if not tasks:
             return []
 
-        return [
-            Task(
-                task_id=task[0],
-                title=task[1],
-                description=task[2],
-                assigned_date=task[3],
-                due_date=task[4],
-                is_complete=task[5],
-                user=task[6]
-            )
-            for task in tasks
-        ]
+        return [Task.from_row(task) for task in tasks]
 
     def completed_tasks(self):
         """
@@ -108,18 +100,118 @@ class TaskService:
         if not tasks:
             return []
 
-        return [
-            Task(
-                task_id=task[0],
-                title=task[1],
-                description=task[2],
-                assigned_date=task[3],
-                due_date=task[4],
-                is_complete=task[5],
-                user=task[6]
-            )
-            for task in tasks
-        ]
+        return [Task.from_row(task) for task in tasks]
+
+    def iter_all_tasks(self, batch_size=ITER_BATCH_SIZE):
+        """
+        Yields all tasks one at a time instead of building a list, so very
+        large result sets can be processed in bounded memory. Rows are read
+        from the database batch_size at a time.
+        Calls 'iter_all_tasks' function from the TaskRepository in
+        data_access.py to handle interaction with the database.
+        """
+        tasks = self.task_repository.iter_all_tasks(batch_size)
+
+        yield from map(Task.from_row, tasks)
+
+    def iter_my_tasks(self, user, batch_size=ITER_BATCH_SIZE):
+        """
+        Yields the tasks assigned to the user one at a time.
+        Calls 'iter_my_tasks' function from the TaskRepository in
+        data_access.py to handle interaction with the database.
+        """
+        tasks = self.task_repository.iter_my_tasks(user, batch_size)
+
+        yield from map(Task.from_row, tasks)
+
+    def iter_completed_tasks(self, batch_size=ITER_BATCH_SIZE):
+        """
+        Yields completed tasks one at a time.
+        Calls 'iter_completed_tasks' function from the TaskRepository in
+        data_access.py to handle interaction with the database.
+        """
+        tasks = self.task_repository.iter_completed_tasks(batch_size)
+
+        yield from map(Task.from_row, tasks)
+
+    def iter_overdue_tasks(self, batch_size=ITER_BATCH_SIZE):
+        """
+        Yields overdue tasks one at a time.
+        Calls 'iter_overdue_tasks' function from the TaskRepository in
+        data_access.py to handle interaction with the database.
+        """
+        tasks = self.task_repository.iter_overdue_tasks(batch_size)
+
+        yield from map(Task.from_row, tasks)
+
+    def view_all_tasks_page(self, after_id=0, limit=PAGE_SIZE):
+        """
+        Returns one page of all tasks for admins, starting after the task
+        with ID after_id.
+        Calls 'view_all_tasks_page' function from the TaskRepository in
+        data_access.py to handle interaction with the database.
+        """
+        tasks = self.task_repository.view_all_tasks_page(after_id, limit)
+
+        return [Task.from_row(task) for task in tasks]
+
+    def get_my_tasks_page(self, user, after_id=0, limit=PAGE_SIZE):
+        """
+        Returns one page of the tasks assigned to the logged in user,
+        starting after the task with ID after_id.
+        Calls 'get_my_tasks_page' function from the TaskRepository in
+        data_access.py to handle interaction with the database.
+        """
+        tasks = self.task_repository.get_my_tasks_page(user, after_id, limit)
+
+        return [Task.from_row(task) for task in tasks]
+
+    def completed_tasks_page(self, after_id=0, limit=PAGE_SIZE):
+        """
+        Returns one page of completed tasks for admins, starting after the
+        task with ID after_id.
+        Calls 'completed_tasks_page' function from the TaskRepository in
+        data_access.py to handle interaction with the database.
+        """
+        tasks = self.task_repository.completed_tasks_page(after_id, limit)
+
+        return [Task.from_row(task) for task in tasks]
+
+    def overdue_tasks_page(self, after_due_date=None, after_id=0,
+                           limit=PAGE_SIZE):
+        """
+        Returns one page of overdue tasks for admins ordered by due date,
+        starting after the task with the given due date and ID.
+        Calls 'overdue_tasks_page' function from the TaskRepository in
+        data_access.py to handle interaction with the database.
+        """
+        tasks = self.task_repository.overdue_tasks_page(after_due_date,
+                                                        after_id, limit)
+
+        return [Task.from_row(task) for task in tasks]
+
+    def search_tasks(self, query, user=None, limit=SEARCH_LIMIT):
+        """
+        Searches task titles and descriptions, best match first. Every word
+        in the query has to match and words ending in '*' match as a
+        prefix. When user is given only their tasks are searched.
+        Calls 'search_tasks' function from the TaskRepository in
+        data_access.py to handle interaction with the database.
+        """
+        tasks = self.task_repository.search_tasks(query, user, limit)
+
+        return [Task.from_row(task) for task in tasks]
+
+    def task_stats(self):
+        """
+        Allows admins to view the number of open, completed and total tasks
+        for each user.
+        Calls 'task_stats' function from the TaskRepository in data_access.py
+        to handle interaction with the database.
+        """
+        stats = self.task_repository.task_stats()
+
+        return [TaskStats.from_row(row) for row in stats]
 
     def update_task(self, task):
         """
@@ -129,11 +221,12 @@ class TaskService:
         Calls 'update_task' function from the TaskRepository in data_access.py
         to handle interaction with the database.
         """
-        return self.task_repository.update_task(task.title,
-                                                task.description,
-                                                task.due_date,
-                                                task.user,
-                                                task.task_id)
+        with self.cache.changing(("task", task.task_id)):
+            return self.task_repository.update_task(task.title,
+                                                    task.description,
+                                                    task.due_date,
+                                                    task.user,
+                                                    task.task_id)
 
     def mark_complete(self, task_id):
         """
@@ -142,7 +235,8 @@ class TaskService:
         Calls 'mark_complete' function from the TaskRepository in data_access.py
         to handle interaction with the database.
         """
-        return self.task_repository.mark_complete(task_id)
+        with self.cache.changing(("task", task_id)):
+            return self.task_repository.mark_complete(task_id)
 
     def overdue_tasks(self):
         """
@@ -156,18 +250,7 @@ class TaskService:
         if not tasks:
             return []
 
-        return [
-            Task(
-                task_id=task[0],
-                title=task[1],
-                description=task[2],
-                assigned_date=task[3],
-                due_date=task[4],
-                is_complete=task[5],
-                user=task[6]
-            )
-            for task in tasks
-        ]
+        return [Task.from_row(task) for task in tasks]
 
     def delete_task(self, task_id):
         """
@@ -175,26 +258,68 @@ class TaskService:
         Calls 'delete_task' function from the TaskRepository in
         data_access.py to handle interaction with the database.
         """
-        return self.task_repository.delete_task(task_id)
+        with self.cache.changing(("task", task_id)):
+            return self.task_repository.delete_task(task_id)
+
+    def apply_batch(self, operations, owner=None):
+        """
+        Applies many add, complete and delete operations in a single
+        transaction. operations are ("add", Task), ("complete", task_id) or
+        ("delete", task_id) tuples. When owner is given only tasks assigned
+        to that user can be completed.
+        Calls 'apply_batch' function from the TaskRepository in
+        data_access.py to handle interaction with the database.
+        """
+        rows = []
+        keys = []
+        for action, value in operations:
+            if action == "add":
+                value = (value.title, value.description, value.assigned_date,
+                         value.due_date, value.user)
+            else:
+                keys.append(("task", value))
+            rows.append((action, value))
+
+        with self.cache.changing(*keys):
+            return self.task_repository.apply_batch(rows, owner)
 
-    def import_tasks(self):
+    def import_tasks(self, bulk=False, workers=1, dialect=CSV_DIALECT):
         """
         Allows admins to import task data into the database. New tasks can
         be added, existing tasks are skipped as they're updated using the
-        'update_task' function.
-        Calls 'import_tasks' function from the TaskRepository in
-        data_access.py to handle interaction with the database.
+        'update_task' function. Setting bulk to True uses the high
+        throughput import for large files, which returns a summary of the
+        import. workers sets how many processes parse the file in bulk mode
+        and dialect the CSV dialect of the file.
+        Calls 'import_tasks' or 'bulk_import_tasks' function from the
+        TaskRepository in data_access.py to handle interaction with the
+        database.
         """
-        self.task_repository.import_tasks()
+        if bulk:
+            return self.task_repository.bulk_import_tasks(workers=workers,
+                                                          dialect=dialect)
+
+        self.task_repository.import_tasks(dialect)
 
-    def export_tasks(self):
+    def export_tasks(self, dialect=CSV_DIALECT):
         """
         Allows admins to export all task data from the database into a
-        text file called 'tasks.txt'.
+        CSV file called 'tasks.txt'.
         Calls 'export_tasks' function from the TaskRepository in
         data_access.py to handle interaction with the database.
         """
-        self.task_repository.export_tasks()
+        return self.task_repository.export_tasks(dialect=dialect)
+
+    def export_task_changes(self, since=None, dialect=CSV_DIALECT):
+        """
+        Allows admins to export only the tasks added, changed or deleted
+        since the last delta export into 'task_changes.txt', returning a
+        summary of the export.
+        Calls 'export_task_changes' function from the TaskRepository in
+        data_access.py to handle interaction with the database.
+        """
+        return self.task_repository.export_task_changes(since=since,
+                                                        dialect=dialect)
 
 
 class Task:
@@ -209,7 +334,13 @@ class Task:
     - due_date (str): Deadline for task to be completed
     - is_complete (str): Status of the task completion
     - user (str): Username of the task assignee
+
+    Uses __slots__ so each task is stored compactly without a per object
+    dictionary.
     """
+    __slots__ = ("task_id", "title", "description", "assigned_date",
+                 "due_date", "is_complete", "user")
+
     def __init__(self, title, description, assigned_date, due_date, user,
                  task_id=None, is_complete="No"):
         """Initialises task object"""
@@ -221,6 +352,48 @@ class Task:
         self.is_complete = is_complete  # Defaults to 'No' for new tasks.
         self.user = user
 
+    @classmethod
+    def from_row(cls, row):
+        """
+        Builds a task directly from a tasks table row, in column order:
+        (id, title, description, assignedDate, dueDate, isComplete, user).
+        Skips __init__ to avoid the keyword argument overhead per row.
+        """
+        task = cls.__new__(cls)
+        (task.task_id, task.title, task.description, task.assigned_date,
+         task.due_date, task.is_complete, task.user) = row
+        return task
+
+    def to_dict(self):
+        """Returns the task as a dictionary, for JSON and CSV output."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class TaskStats:
+    """
+    Task counts for one user.
+
+    Attributes:
+    - user (str): Username of the task assignee
+    - open (int): Number of tasks not yet complete
+    - completed (int): Number of completed tasks
+    - total (int): Number of tasks assigned to the user
+    """
+    __slots__ = ("user", "open", "completed", "total")
+
+    @classmethod
+    def from_row(cls, row):
+        """
+        Builds the stats from a (user, open, completed, total) row.
+        """
+        stats = cls.__new__(cls)
+        stats.user, stats.open, stats.completed, stats.total = row
+        return stats
+
+    def to_dict(self):
+        """Returns the stats as a dictionary, for JSON and CSV output."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
 
 class UserService:
     """
@@ -228,9 +401,15 @@ class UserService:
 
     Coordniates with the UserRepository to support CRUD for users.
     """
-    def __init__(self):
-        """Initialise the TaskService with a TaskRepository"""
-        self.user_repository = UserRepository()
+    def __init__(self, connections=None, cache_size=CACHE_SIZE):
+        """
+        Initialise the UserService with a UserRepository. An optional
+        ConnectionManager can be given to use a different database.
+        Users looked up by ID and username are kept in an LRU cache of
+        cache_size entries, see cache.py.
+        """
+        self.user_repository = UserRepository(connections)
+        self.cache = LRUCache(self.user_repository.connections, cache_size)
 
     def login(self, username, password):
         """
@@ -251,16 +430,7 @@ class UserService:
         if not users:
             return []
 
-        return [
-            User(
-                user_id=user[0],
-                username=user[1],
-                password=user[2],
-                email=user[3],
-                is_admin=user[4],
-            )
-            for user in users
-        ]
+        return [User.from_row(user) for user in users]
 
     def add_user(self, user):
         """
@@ -268,8 +438,10 @@ class UserService:
         Calls 'add_user' function from the UserRepository in data_access.py to
         handle interaction with the database.
         """
-        return self.user_repository.add_user(user.username, user.password,
-                                             user.email)
+        with self.cache.changing():
+            return self.user_repository.add_user(user.username,
+                                                 user.password,
+                                                 user.email)
 
     def validate_user(self, prompt):
         """
@@ -287,25 +459,38 @@ class UserService:
         Calls 'lassignee_exists' function from the UserRepository in
         data_access.py to handle interaction with the database.
         """
-        return self.user_repository.assignee_exists(username)
+        return self.cache.get(
+            ("username", username),
+            lambda: self.user_repository.assignee_exists(username))
 
     def get_user(self, user_id):
         """
-        Returns the datails of a user using the unique ID.
+        Returns the datails of a user using the unique ID. Results are
+        cached, so the returned user should not be modified in place.
         Calls 'get_user' function from the UserRepository in data_access.py to
         handle interaction with the database."""
+        return self.cache.get(("user", user_id),
+                              lambda: self._load_user(user_id))
+
+    def _load_user(self, user_id):
+        """Reads a user from the database for the cache."""
         user = self.user_repository.get_user(user_id)
 
         if not user:
             return None
 
-        return User(
-            user_id=user[0],
-            username=user[1],
-            password=user[2],
-            email=user[3],
-            is_admin=[4],
-        )
+        return User.from_row(user)
+
+    def _username_keys(self, user_id):
+        """
+        Cache keys to invalidate when a user changes, including the
+        username it currently has in the database.
+        """
+        keys = [("user", user_id)]
+        user = self.user_repository.get_user(user_id)
+        if user:
+            keys.append(("username", user[1]))
+        return keys
 
     def update_user(self, user):
         """
@@ -313,10 +498,12 @@ class UserService:
         Calls 'update_user' function from the UserRepository in data_access.py
         to handle interaction with the database.
         """
-        return self.user_repository.update_user(user.user_id,
-                                                user.username,
-                                                user.password,
-                                                user.email)
+        keys = self._username_keys(user.user_id)
+        with self.cache.changing(("username", user.username), *keys):
+            return self.user_repository.update_user(user.user_id,
+                                                    user.username,
+                                                    user.password,
+                                                    user.email)
 
     def make_admin(self, user_id):
         """
@@ -324,7 +511,8 @@ class UserService:
         Calls 'make_admin' function from the UserRepository in data_access.py
         to handle interaction with the database.
         """
-        return self.user_repository.make_admin(user_id)
+        with self.cache.changing(("user", user_id)):
+            return self.user_repository.make_admin(user_id)
 
     def delete_user(self, user_id):
         """
@@ -332,24 +520,34 @@ class UserService:
         Calls 'delete_user' function from the UserRepository in data_access.py
         to handle interaction with the database.
         """
-        return self.user_repository.delete_user(user_id)
+        with self.cache.changing(*self._username_keys(user_id)):
+            return self.user_repository.delete_user(user_id)
 
-    def import_users(self):
+    def import_users(self, bulk=False, workers=1, dialect=CSV_DIALECT):
         """
         Allows admins to import users from a 'users.txt' file. A new user can
-        be added to the system using this.
-        Calls 'import_users' function from the UserRepository in data_access.py
-        to handle interaction with the database.
+        be added to the system using this. Setting bulk to True uses the high
+        throughput import for large files, parsed by workers processes, which
+        returns a summary of the import. dialect is the CSV dialect of the
+        file.
+        Calls 'import_users' or 'bulk_import_users' function from the
+        UserRepository in data_access.py to handle interaction with the
+        database.
         """
-        self.user_repository.import_users()
+        if bulk:
+            return self.user_repository.bulk_import_users(workers=workers,
+                                                          dialect=dialect)
+
+        self.user_repository.import_users(dialect)
 
-    def export_users(self):
+    def export_users(self, dialect=CSV_DIALECT):
         """
-        Allows admins to export all users in the system to a 'users.txt' file.
+        Allows admins to export all users in the system to a 'users.txt' CSV
+        file.
         Calls 'export_users' function from the UserRepository in data_access.py
         to handle interaction with the database.
         """
-        self.user_repository.export_users()
+        return self.user_repository.export_users(dialect=dialect)
 
 
 class User:
@@ -362,7 +560,12 @@ class User:
     - password (str): User's password
     - email (str): User's email address
     - is_admin (str): Identfies if user has admin access or not
+
+    Uses __slots__ so each user is stored compactly without a per object
+    dictionary.
     """
+    __slots__ = ("user_id", "username", "password", "email", "is_admin")
+
     def __init__(self, username, password, email,
                  user_id=None, is_admin="No"):
         """Initialises user object"""
@@ -371,3 +574,148 @@ class User:
         self.password = password
         self.email = email
         self.is_admin = is_admin  # Defaults to 'No' for new users
+
+    @classmethod
+    def from_row(cls, row):
+        """
+        Builds a user directly from a user table row, in column order:
+        (id, username, password, email, isAdmin).
+        """
+        user = cls.__new__(cls)
+        (user.user_id, user.username, user.password, user.email,
+         user.is_admin) = row
+        return user
+
+    def to_dict(self):
+        """
+        Returns the user as a dictionary, for JSON and CSV output. The
+        password is left out.
+        """
+        return {"user_id": self.user_id, "username": self.username,
+                "email": self.email, "is_admin": self.is_admin}
+
+
+class ChangeLogService:
+    """
+    Provides the change log to consumers that keep other systems in step
+    with the database.
+
+    Every insert, update and delete of a task or user is logged by
+    triggers in the same transaction as the change, see migrations.py.
+    Consumers read the log in sequence order and save a checkpoint so they
+    can carry on where they left off after a restart.
+    """
+    def __init__(self, connections=None):
+        """
+        Initialise the ChangeLogService with a ChangeLogRepository. An
+        optional ConnectionManager can be given to use a different database.
+        """
+        self.change_repository = ChangeLogRepository(connections)
+
+    def changes_since(self, sequence=0, limit=CHANGE_BATCH_SIZE):
+        """
+        Returns up to limit changes logged after sequence, oldest first.
+        Calls 'changes_since' function from the ChangeLogRepository in
+        data_access.py to handle interaction with the database.
+        """
+        rows = self.change_repository.changes_since(sequence, limit)
+        return [Change.from_row(row) for row in rows]
+
+    def latest_sequence(self):
+        """Returns the sequence number of the newest change."""
+        return self.change_repository.latest_sequence()
+
+    def get_checkpoint(self, consumer):
+        """Returns the last sequence number saved by a consumer."""
+        return self.change_repository.get_checkpoint(consumer)
+
+    def save_checkpoint(self, consumer, sequence):
+        """Saves the last sequence number a consumer has handled."""
+        return self.change_repository.save_checkpoint(consumer, sequence)
+
+    def prune_changes(self):
+        """
+        Deletes the changes every consumer has already handled, returning
+        how many were deleted.
+        """
+        return self.change_repository.prune_changes()
+
+    def tail(self, after=None, consumer=None, batch_size=CHANGE_BATCH_SIZE,
+             poll_interval=POLL_INTERVAL, follow=True, stop=None):
+        """
+        Function: tail
+
+        Yields changes in sequence order as they are logged.
+
+        With a consumer, reading starts after its saved checkpoint and the
+        checkpoint is moved on once every change of a batch has been
+        yielded. A consumer that stops part way through a batch sees the
+        rest of it again, so each change is delivered at least once.
+
+        Input:
+        - after: (int) sequence number to start after. Defaults to the
+          consumer's checkpoint, or 0 without a consumer.
+        - consumer: (str) name to save checkpoints under.
+        - batch_size: (int) number of changes read per query.
+        - poll_interval: (float) seconds to wait when there are no new
+          changes.
+        - follow: (bool) keep waiting for new changes. When False the
+          generator ends once the log has been read.
+        - stop: (threading.Event) ends the generator when set, and wakes
+          it up early while it is waiting.
+
+        Output:
+        - changes: (Change) generator of changes.
+        """
+        if after is None:
+            after = self.get_checkpoint(consumer) if consumer else 0
+
+        while not (stop and stop.is_set()):
+            changes = self.changes_since(after, batch_size)
+            for change in changes:
+                yield change
+            if changes:
+                after = changes[-1].sequence
+                if consumer:
+                    self.save_checkpoint(consumer, after)
+            if len(changes) == batch_size:
+                continue
+            if not follow:
+                return
+            if stop:
+                stop.wait(poll_interval)
+            else:
+                time.sleep(poll_interval)
+
+
+class Change:
+    """
+    One logged change to a task or user.
+
+    Attributes:
+    - sequence (int): Position of the change in the log
+    - table (str): 'tasks' or 'user'
+    - row_id (int): ID of the changed task or user
+    - operation (str): 'insert', 'update' or 'delete'
+    - changed_at (int): Time of the change, in milliseconds since the epoch
+    - data (dict): The row after the change, or before it for deletes, in
+      the same form as Task.to_dict() and User.to_dict()
+    """
+    __slots__ = ("sequence", "table", "row_id", "operation", "changed_at",
+                 "data")
+
+    @classmethod
+    def from_row(cls, row):
+        """
+        Builds a change from a change_log row, in column order:
+        (sequence, tableName, rowId, operation, changedAt, data).
+        """
+        change = cls.__new__(cls)
+        (change.sequence, change.table, change.row_id, change.operation,
+         change.changed_at, data) = row
+        change.data = json.loads(data) if data else None
+        return change
+
+    def to_dict(self):
+        """Returns the change as a dictionary, for JSON output."""
+        return {name: getattr(self, name) for name in self.__slots__}
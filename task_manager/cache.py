@@ -0,0 +1,166 @@
+"""
+Read-through LRU cache used by the service layer.
+
+Caches single record lookups such as get_task and get_user so repeated
+lookups of the same ID don't go back to the database. Services invalidate
+the entries they change, and changes made through any other connection,
+including other processes, are detected with 'PRAGMA data_version'.
+"""
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Default maximum number of entries kept by each cache
+CACHE_SIZE = 1024
+
+
+class LRUCache:
+    """
+    Bounded least recently used cache with hit and miss counters.
+
+    Before every lookup the cache checks whether the database has changed
+    other than through the owning service:
+    - 'PRAGMA data_version' changes when another connection (another thread
+      or process) commits.
+    - the connection's total_changes grows when something else using the
+      same connection writes, such as another service.
+    Either clears the whole cache. Writes made by the owning service are
+    wrapped in changing(), which only drops the affected keys.
+    """
+    def __init__(self, connections, maxsize=CACHE_SIZE):
+        """
+        Initialise the cache.
+
+        Input:
+        - connections: (ConnectionManager) manager of the database the
+          cached values come from.
+        - maxsize: (int) maximum number of entries. 0 disables caching.
+        """
+        self.connections = connections
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped whenever entries are removed, so a value loaded before an
+        # invalidation is never stored after it
+        self._generation = 0
+        # Last seen (data_version, total_changes) of each thread's connection
+        self._local = threading.local()
+
+    def _database_state(self, db):
+        """Returns the values used to detect changes to the database."""
+        data_version = db.execute("PRAGMA data_version").fetchone()[0]
+        return data_version, db.total_changes
+
+    def _check_for_changes(self):
+        """Clears the cache if the database changed behind its back."""
+        db = self.connections.get_connection()
+        state = self._database_state(db)
+
+        # A thread's first lookup can't tell what changed before it, so it
+        # starts from an empty cache.
+        if (getattr(self._local, "connection", None) is not db
+                or self._local.state != state):
+            self.clear()
+
+        self._local.connection = db
+        self._local.state = state
+
+    def get(self, key, load):
+        """
+        Function: get
+
+        Returns the cached value for key, or calls load() to read it from
+        the database and caches the result. None results are not cached so
+        new records are found as soon as they are added.
+
+        Input:
+        - key: (tuple) cache key, such as ("task", task_id).
+        - load: (function) reads the value from the database.
+
+        Output:
+        - value: the cached or loaded value.
+        """
+        if self.maxsize <= 0:
+            return load()
+
+        self._check_for_changes()
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            generation = self._generation
+
+        value = load()
+        if value is None:
+            return None
+
+        with self._lock:
+            if generation != self._generation:
+                return value
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, *keys):
+        """
+        Function: invalidate
+
+        Removes the given keys from the cache.
+        """
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    @contextmanager
+    def changing(self, *keys):
+        """
+        Function: changing
+
+        Context manager wrapped around a write made by the owning service.
+        Any earlier outside changes are checked for first, then the given
+        keys are invalidated once the write is done and the write is
+        recorded as seen, so it doesn't clear the whole cache.
+
+        Input:
+        - keys: cache keys affected by the write.
+        """
+        if self.maxsize > 0:
+            self._check_for_changes()
+        try:
+            yield
+        finally:
+            self.invalidate(*keys)
+            db = self.connections.get_connection()
+            if getattr(self._local, "connection", None) is db:
+                # Own writes don't change data_version, only total_changes
+                data_version = self._local.state[0]
+                self._local.state = (data_version, db.total_changes)
+
+    def clear(self):
+        """Removes every entry."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Function: stats
+
+        Output:
+        - (dict) hits, misses, current size and maxsize of the cache.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
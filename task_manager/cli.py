@@ -0,0 +1,605 @@
+"""
+Command line interface for Task Manager.
+
+Runs task operations without the interactive menu so they can be scripted.
+Results are written to stdout as JSON, one object per line, and messages
+go to stderr. Credentials come from --username/--password or the
+TASK_MANAGER_USERNAME/TASK_MANAGER_PASSWORD environment variables.
+
+The changes command writes the change log as JSON lines. With --consumer
+it carries on from where that consumer last stopped, and with --follow it
+keeps waiting for new changes until interrupted.
+
+The backup command copies the live database into a checked, rotated
+backup file without stopping the application, and restore copies one back.
+
+The batch command reads add, complete and delete operations from stdin,
+as newline delimited JSON or CSV, and applies all of them in a single
+transaction. For example:
+
+    {"op": "add", "title": "t", "description": "d",
+     "due_date": "2030-01-01", "user": "admin"}
+    {"op": "complete", "task_id": 7}
+
+Enter "python -m task_manager.cli --help" into console for usage.
+"""
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+from datetime import date
+from task_manager.backup import (BACKUP_KEEP, BACKUP_PAGES, BACKUP_SLEEP,
+                                 backup_database, restore_database)
+from task_manager.business_logic import (ChangeLogService, TaskService,
+                                         UserService, Task)
+from task_manager.connection import (DATABASE_ENV, DEFAULT_DATABASE,
+                                     ConnectionManager, configured_database)
+from task_manager.data_access import CSV_DIALECT
+from task_manager.import_pipeline import DEFAULT_WORKERS
+from task_manager.utilities import date_validation
+
+USERNAME_ENV = "TASK_MANAGER_USERNAME"
+PASSWORD_ENV = "TASK_MANAGER_PASSWORD"
+
+# Columns of a CSV batch, the first row of the input must name them
+BATCH_FIELDS = ("op", "task_id", "title", "description", "due_date", "user")
+
+
+class CliError(Exception):
+    """An error reported on stderr, exiting with status."""
+    def __init__(self, message, status=1):
+        super().__init__(message)
+        self.status = status
+
+
+class CliSession:
+    """The services, logged in user and output stream of one command."""
+    def __init__(self, task_service, user_service, role, username, out):
+        self.task_service = task_service
+        self.user_service = user_service
+        self.role = role
+        self.username = username
+        self.out = out
+
+    def write(self, value):
+        """Writes value to the output as one line of JSON."""
+        self.out.write(json.dumps(value) + "\n")
+
+    def require_admin(self):
+        """Stops standard users running admin only commands."""
+        if self.role != "admin":
+            raise CliError("Only admins can do this.")
+
+
+def new_task(session, title, description, due_date, user=None):
+    """
+    Function: new_task
+
+    Builds a new task assigned today, checking the same rules as the menu.
+
+    Input:
+    - title, description: (str) task details, must not be empty.
+    - due_date: (str) due date in 'YYYY-MM-DD' format, not in the past.
+    - user: (str) assignee, the logged in user when not given.
+
+    Output:
+    - task: (Task) the new task.
+    - ValueError: raised if any of the details are invalid.
+    """
+    if not title or not description:
+        raise ValueError("Title and description are required.")
+
+    assigned_date = date.today()
+    due = date_validation(due_date or "")
+    if due < assigned_date:
+        raise ValueError("Due date cannot be before assigned date.")
+
+    assignee = session.user_service.assignee_exists(user or session.username)
+    if not assignee:
+        raise ValueError(f"User {user} does not exist.")
+
+    return Task(title=title, description=description,
+                assigned_date=assigned_date.strftime("%Y-%m-%d"),
+                due_date=due.strftime("%Y-%m-%d"), user=assignee)
+
+
+def changeable_task(session, task_id):
+    """Returns a task the logged in user is allowed to complete."""
+    task = session.task_service.get_task(task_id)
+    if not task:
+        raise CliError(f"Task {task_id} does not exist.")
+    if session.role == "user" and session.username != task.user:
+        raise CliError("Users only allowed to edit own tasks.")
+    if task.is_complete == "Yes":
+        raise CliError(f"Task {task_id} already completed.")
+    return task
+
+
+# ********** COMMANDS **********
+
+def add_command(args, session):
+    """
+    Function: add_command
+
+    Adds a task, assigned to the logged in user unless --user is
+    given, and writes the new task.
+
+    Input:
+    - args: (Namespace) parsed command line arguments.
+    - session: (CliSession) services, logged in user and output.
+
+    Output:
+    - CliError: raised if the task is invalid or can't be added.
+    """
+    try:
+        task = new_task(session, args.title, args.description,
+                        args.due_date, args.user)
+    except ValueError as e:
+        raise CliError(str(e))
+
+    task_id = session.task_service.add_task(task)
+    if not task_id:
+        raise CliError("Failed to add task.")
+    session.write(session.task_service.get_task(task_id).to_dict())
+
+
+def get_command(args, session):
+    """
+    Function: get_command
+
+    Writes the task with the given ID.
+
+    Input:
+    - args: (Namespace) parsed command line arguments.
+    - session: (CliSession) services, logged in user and output.
+
+    Output:
+    - CliError: raised if the task doesn't exist.
+    """
+    task = session.task_service.get_task(args.task_id)
+    if not task:
+        raise CliError(f"Task {args.task_id} does not exist.")
+    session.write(task.to_dict())
+
+
+def list_command(args, session):
+    """
+    Function: list_command
+
+    Writes the tasks in a scope: mine, or all, completed or overdue for
+    admins. Tasks are streamed one line at a time, so any number can be
+    listed.
+
+    Input:
+    - args: (Namespace) parsed command line arguments.
+    - session: (CliSession) services, logged in user and output.
+
+    Output:
+    - CliError: raised if a standard user asks for another scope.
+    """
+    task_service = session.task_service
+    if args.scope == "mine":
+        tasks = task_service.iter_my_tasks(session.username)
+    else:
+        session.require_admin()
+        tasks = {
+            "all": task_service.iter_all_tasks,
+            "completed": task_service.iter_completed_tasks,
+            "overdue": task_service.iter_overdue_tasks,
+        }[args.scope]()
+
+    for task in tasks:
+        session.write(task.to_dict())
+
+
+def complete_command(args, session):
+    """
+    Function: complete_command
+
+    Marks a task complete and writes it. Standard users can only
+    complete their own tasks.
+
+    Input:
+    - args: (Namespace) parsed command line arguments.
+    - session: (CliSession) services, logged in user and output.
+
+    Output:
+    - CliError: raised if the task doesn't exist, isn't theirs or is
+      already complete.
+    """
+    changeable_task(session, args.task_id)
+    if not session.task_service.mark_complete(args.task_id):
+        raise CliError(f"Task {args.task_id} not updated.")
+    session.write(session.task_service.get_task(args.task_id).to_dict())
+
+
+def delete_command(args, session):
+    """
+    Function: delete_command
+
+    Deletes a task and writes its ID. Admins only.
+
+    Input:
+    - args: (Namespace) parsed command line arguments.
+    - session: (CliSession) services, logged in user and output.
+
+    Output:
+    - CliError: raised if the task doesn't exist.
+    """
+    session.require_admin()
+    if not session.task_service.delete_task(args.task_id):
+        raise CliError(f"Task {args.task_id} not deleted.")
+    session.write({"deleted": args.task_id})
+
+
+def import_command(args, session):
+    """
+    Function: import_command
+
+    Imports 'tasks.txt' or 'users.txt'. The bulk import writes its
+    summary. Admins only.
+
+    Input:
+    - args: (Namespace) parsed command line arguments.
+    - session: (CliSession) services, logged in user and output.
+
+    Output:
+    - CliError: raised if the bulk import fails.
+    """
+    session.require_admin()
+    service = (session.task_service if args.records == "tasks"
+               else session.user_service)
+    import_records = getattr(service, f"import_{args.records}")
+
+    summary = import_records(bulk=args.bulk, workers=args.workers,
+                             dialect=args.dialect)
+    if args.bulk:
+        if summary is None:
+            raise CliError(f"Failed to import {args.records}.")
+        session.write(summary)
+    else:
+        session.write({"imported": args.records})
+
+
+def export_command(args, session):
+    """
+    Function: export_command
+
+    Exports all tasks or users, or with --changes only the tasks
+    changed since the last delta export, and writes the count or summary.
+    Admins only.
+
+    Input:
+    - args: (Namespace) parsed command line arguments.
+    - session: (CliSession) services, logged in user and output.
+
+    Output:
+    - CliError: raised if the export fails.
+    """
+    session.require_admin()
+    service = (session.task_service if args.records == "tasks"
+               else session.user_service)
+    if args.changes:
+        if args.records != "tasks":
+            raise CliError("Only tasks have delta exports.")
+        summary = service.export_task_changes(dialect=args.dialect)
+        if summary is None:
+            raise CliError("Failed to export task changes.")
+        session.write(summary)
+        return
+
+    count = getattr(service, f"export_{args.records}")(dialect=args.dialect)
+    if count is None:
+        raise CliError(f"Failed to export {args.records}.")
+    session.write({"exported": count})
+
+
+def changes_command(args, session):
+    """
+    Function: changes_command
+
+    Writes the change log from --after or the consumer's checkpoint.
+    With --follow it keeps waiting for new changes, flushing after each
+    one, until interrupted. Admins only.
+
+    Input:
+    - args: (Namespace) parsed command line arguments.
+    - session: (CliSession) services, logged in user and output.
+
+    Output:
+    - CliError: raised for standard users.
+    """
+    session.require_admin()
+    service = ChangeLogService(session.task_service.task_repository
+                               .connections)
+    try:
+        for change in service.tail(after=args.after, consumer=args.consumer,
+                                   follow=args.follow):
+            session.write(change.to_dict())
+            if args.follow:
+                session.out.flush()
+    except KeyboardInterrupt:
+        pass
+
+
+def backup_command(args, session):
+    """
+    Function: backup_command
+
+    Backs up the live database with backup_database and writes the
+    summary. Admins only.
+
+    Input:
+    - args: (Namespace) parsed command line arguments.
+    - session: (CliSession) services, logged in user and output.
+
+    Output:
+    - CliError: raised if the backup fails.
+    """
+    session.require_admin()
+    summary = backup_database(session.task_service.task_repository
+                              .connections, args.directory, args.pages,
+                              args.sleep, args.keep)
+    if summary is None:
+        raise CliError("Backup failed.")
+    session.write(summary)
+
+
+def restore_command(args, session):
+    """
+    Function: restore_command
+
+    Restores the database from a backup file with restore_database and
+    writes the summary. Admins only.
+
+    Input:
+    - args: (Namespace) parsed command line arguments.
+    - session: (CliSession) services, logged in user and output.
+
+    Output:
+    - CliError: raised if the backup is missing or damaged, or the
+      restore fails.
+    """
+    session.require_admin()
+    summary = restore_database(args.backup, session.task_service
+                               .task_repository.connections)
+    if summary is None:
+        raise CliError(f"Failed to restore {args.backup}.")
+    session.write(summary)
+
+
+def read_batch(lines, batch_format):
+    """Yields (line number, operation dict) from the batch input."""
+    if batch_format == "csv":
+        reader = csv.DictReader(lines)
+        missing = set(BATCH_FIELDS[:2]) - set(reader.fieldnames or ())
+        if missing:
+            raise CliError("CSV header must include: "
+                           + ", ".join(BATCH_FIELDS))
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            operation = json.loads(line)
+        except ValueError:
+            operation = None
+        if not isinstance(operation, dict):
+            raise CliError(f"Line {number}: not a JSON object.")
+        yield number, operation
+
+
+def parse_operation(session, operation):
+    """Turns one batch input record into an apply_batch operation."""
+    action = operation.get("op")
+    if action == "add":
+        return action, new_task(session, operation.get("title"),
+                                operation.get("description"),
+                                operation.get("due_date"),
+                                operation.get("user"))
+    if action not in ("complete", "delete"):
+        raise ValueError("op must be add, complete or delete.")
+    if action == "delete" and session.role != "admin":
+        raise ValueError("Only admins can delete tasks.")
+
+    try:
+        return action, int(operation.get("task_id"))
+    except (TypeError, ValueError):
+        raise ValueError("task_id must be a whole number.")
+
+
+def batch_command(args, session):
+    """
+    Function: batch_command
+
+    Reads operations from stdin, validates every one of them first, then
+    applies them all in a single transaction and writes a summary.
+    Nothing is changed if any operation is invalid.
+
+    Input:
+    - args: (Namespace) parsed command line arguments.
+    - session: (CliSession) services, logged in user and output.
+
+    Output:
+    - CliError: raised if any operation is invalid or the batch fails.
+    """
+    numbers = []
+    operations = []
+    errors = 0
+    for number, operation in read_batch(args.input, args.format):
+        try:
+            operations.append(parse_operation(session, operation))
+            numbers.append(number)
+        except ValueError as e:
+            errors += 1
+            print(f"Line {number}: {e}", file=sys.stderr)
+
+    if errors:
+        raise CliError(f"{errors} invalid operation(s), no changes made.")
+
+    owner = None if session.role == "admin" else session.username
+    results = session.task_service.apply_batch(operations, owner)
+    if results is None:
+        raise CliError("Batch failed, no changes made.")
+
+    summary = {"operations": len(results), "added": 0, "completed": 0,
+               "deleted": 0, "unchanged_lines": []}
+    for number, (action, _), result in zip(numbers, operations, results):
+        if action == "add":
+            summary["added"] += 1
+        elif result:
+            summary[f"{action}d"] += 1
+        else:
+            summary["unchanged_lines"].append(number)
+    session.write(summary)
+
+
+def build_parser():
+    """Returns the argument parser for the command line interface."""
+    parser = argparse.ArgumentParser(
+        prog="python -m task_manager.cli",
+        description="Run Task Manager operations without the menu.")
+    parser.add_argument("-u", "--username",
+                        default=os.environ.get(USERNAME_ENV),
+                        help=f"defaults to ${USERNAME_ENV}")
+    parser.add_argument("-p", "--password",
+                        default=os.environ.get(PASSWORD_ENV),
+                        help=f"defaults to ${PASSWORD_ENV}, which is safer "
+                             f"as flags are visible to other users")
+    parser.add_argument("--database", default=configured_database(),
+                        help=f"sqlite database file or 'file:' URI, "
+                             f"defaults to ${DATABASE_ENV} or "
+                             f"'{DEFAULT_DATABASE}'")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="add a task")
+    add.add_argument("--title", required=True)
+    add.add_argument("--description", required=True)
+    add.add_argument("--due-date", required=True, help="YYYY-MM-DD")
+    add.add_argument("--user", help="assignee, defaults to yourself")
+    add.set_defaults(run=add_command)
+
+    for name, run, text in (("get", get_command, "show a task"),
+                            ("complete", complete_command,
+                             "mark a task complete"),
+                            ("delete", delete_command, "delete a task")):
+        command = commands.add_parser(name, help=text)
+        command.add_argument("task_id", type=int)
+        command.set_defaults(run=run)
+
+    listing = commands.add_parser("list", help="list tasks")
+    listing.add_argument("scope", nargs="?", default="mine",
+                         choices=("mine", "all", "completed", "overdue"))
+    listing.set_defaults(run=list_command)
+
+    import_records = commands.add_parser(
+        "import", help="import 'tasks.txt' or 'users.txt'")
+    import_records.add_argument("records", choices=("tasks", "users"))
+    import_records.add_argument("--bulk", action="store_true",
+                                help="use the bulk import for large files")
+    import_records.add_argument("--workers", type=int,
+                                default=DEFAULT_WORKERS)
+    import_records.add_argument("--dialect", choices=csv.list_dialects(),
+                                default=CSV_DIALECT,
+                                help="CSV dialect of the file")
+    import_records.set_defaults(run=import_command)
+
+    export = commands.add_parser(
+        "export", help="export to 'tasks.txt' or 'users.txt'")
+    export.add_argument("records", choices=("tasks", "users"))
+    export.add_argument("--dialect", choices=csv.list_dialects(),
+                        default=CSV_DIALECT, help="CSV dialect to write")
+    export.add_argument("--changes", action="store_true",
+                        help="only export tasks changed since the last "
+                             "delta export, to 'task_changes.txt'")
+    export.set_defaults(run=export_command)
+
+    changes = commands.add_parser(
+        "changes", help="write the task and user change log")
+    changes.add_argument("--after", type=int,
+                         help="sequence number to start after, defaults to "
+                              "the consumer's checkpoint or the beginning")
+    changes.add_argument("--consumer",
+                         help="save a checkpoint under this name")
+    changes.add_argument("--follow", action="store_true",
+                         help="keep waiting for new changes")
+    changes.set_defaults(run=changes_command)
+
+    backup = commands.add_parser(
+        "backup", help="back up the database while it is in use")
+    backup.add_argument("--directory",
+                        help="defaults to 'backups' next to the database")
+    backup.add_argument("--keep", type=int, default=BACKUP_KEEP,
+                        help="number of backups to keep")
+    backup.add_argument("--pages", type=int, default=BACKUP_PAGES,
+                        help="pages copied per step, -1 for all at once")
+    backup.add_argument("--sleep", type=float, default=BACKUP_SLEEP,
+                        help="seconds to pause between steps")
+    backup.set_defaults(run=backup_command)
+
+    restore = commands.add_parser(
+        "restore", help="replace the database with a backup")
+    restore.add_argument("backup", help="backup file to restore")
+    restore.set_defaults(run=restore_command)
+
+    batch = commands.add_parser(
+        "batch", help="apply operations from stdin in one transaction")
+    batch.add_argument("--format", choices=("ndjson", "csv"),
+                       default="ndjson")
+    batch.set_defaults(run=batch_command, input=None)
+
+    return parser
+
+
+def main(argv=None, stdin=None, stdout=None):
+    """
+    Function: main
+
+    Runs one command line command.
+
+    Input:
+    - argv: (list) command line arguments, sys.argv by default.
+    - stdin, stdout: streams for the batch input and the JSON output.
+
+    Output:
+    - status: (int) exit status, 0 on success.
+    """
+    args = build_parser().parse_args(argv)
+    out = stdout or sys.stdout
+    args.input = stdin or sys.stdin
+    connections = ConnectionManager(args.database)
+
+    # Messages printed by the services go to stderr, stdout is only JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            task_service = TaskService(connections)
+            user_service = UserService(connections)
+            user_login = None
+            if args.username and args.password is not None:
+                user_login = user_service.login(args.username,
+                                                args.password)
+            if not user_login:
+                raise CliError("Invalid login. Give --username and "
+                               "--password or set "
+                               f"{USERNAME_ENV} and {PASSWORD_ENV}.", 2)
+
+            role, username = user_login
+            session = CliSession(task_service, user_service, role, username,
+                                 out)
+            args.run(args, session)
+        except CliError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return e.status
+        finally:
+            connections.close_all()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
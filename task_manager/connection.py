@@ -0,0 +1,276 @@
+"""
+Connection management for Task Manager.
+
+Provides long lived, per thread sqlite connections that are shared by the
+TaskRepository and UserRepository instead of opening a new connection for
+every database call.
+
+The database is given to each ConnectionManager as one of:
+- a file path, such as "taskManager.db".
+- a sqlite "file:" URI, such as "file:tasks.db?mode=ro" or
+  "file:shared?mode=memory&cache=shared".
+- ":memory:", a private in-memory database for fast, throwaway runs.
+The shared default manager uses $TASK_MANAGER_DATABASE, or
+DEFAULT_DATABASE when it isn't set.
+"""
+import atexit
+import itertools
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+DEFAULT_DATABASE = "taskManager.db"
+
+# Environment variable naming the database of the default manager
+DATABASE_ENV = "TASK_MANAGER_DATABASE"
+
+MEMORY_DATABASE = ":memory:"
+
+# Numbers the in-memory databases, so each manager gets its own
+_memory_ids = itertools.count(1)
+
+# Number of prepared statements each connection keeps compiled. sqlite3's own
+# default is 128 which comfortably covers every query in the repositories.
+DEFAULT_CACHED_STATEMENTS = 128
+
+# Storage profiles: the pragmas applied to every new connection.
+# - journal_mode WAL lets readers carry on while another connection or
+#   process writes, instead of being blocked by the rollback journal.
+# - busy_timeout (ms) makes a connection wait for a lock rather than fail
+#   straight away with "database is locked".
+# - synchronous FULL syncs every commit to disk. NORMAL only syncs at WAL
+#   checkpoints, which is much faster and still never corrupts the
+#   database, but the last commits can be lost on power failure.
+# - cache_size is in pages, or KiB when negative. mmap_size is in bytes.
+# "rollback" is the sqlite default behaviour, kept for comparison.
+STORAGE_PROFILES = {
+    "durable": {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16000,
+        "mmap_size": 0,
+        "temp_store": "MEMORY",
+    },
+    "fast": {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+    "rollback": {
+        "busy_timeout": 5000,
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+    },
+}
+
+DEFAULT_PROFILE = "durable"
+
+# Pragmas a profile may set, in the order they are applied. busy_timeout
+# comes first so switching journal mode waits for other connections.
+PROFILE_PRAGMAS = ("busy_timeout", "journal_mode", "synchronous",
+                   "cache_size", "mmap_size", "temp_store")
+
+
+def resolve_profile(profile):
+    """
+    Function: resolve_profile
+
+    Returns the pragmas for a storage profile given by name, or checks a
+    profile given as a dictionary of pragmas.
+
+    Input:
+    - profile: (str or dict) name in STORAGE_PROFILES or pragma values.
+
+    Output:
+    - pragmas: (dict) pragma names and values.
+    - ValueError: raised for unknown profiles, pragmas or invalid values.
+    """
+    if isinstance(profile, str):
+        if profile not in STORAGE_PROFILES:
+            raise ValueError(f"Unknown storage profile: {profile}. "
+                             f"Choose from {', '.join(STORAGE_PROFILES)}.")
+        return STORAGE_PROFILES[profile]
+
+    for name, value in profile.items():
+        if name not in PROFILE_PRAGMAS:
+            raise ValueError(f"Unsupported pragma in profile: {name}")
+        # Pragmas can't take parameters, so only allow plain values
+        if not (isinstance(value, int)
+                or (isinstance(value, str) and value.isalnum())):
+            raise ValueError(f"Invalid value for {name}: {value!r}")
+    return profile
+
+
+def configured_database():
+    """Returns the database named by $TASK_MANAGER_DATABASE, or the
+    default database file when it isn't set."""
+    return os.environ.get(DATABASE_ENV) or DEFAULT_DATABASE
+
+
+class ConnectionManager:
+    """
+    Hands out one sqlite connection per thread for a single database.
+
+    Connections are opened the first time a thread asks for one and are then
+    reused for every following call on that thread, so the database file, the
+    schema and the prepared statement cache are only built once per thread.
+    All connections are tracked so they can be closed at shutdown.
+
+    An in-memory database only lasts while a connection to it is open, so
+    the manager keeps one extra connection open until close_all(). Each
+    ":memory:" manager gets its own database, shared by all its threads.
+    It uses sqlite's memdb VFS rather than a shared cache, so connections
+    wait for each other's locks like they do on a file instead of failing
+    with "database table is locked".
+    """
+    def __init__(self, database=DEFAULT_DATABASE,
+                 cached_statements=DEFAULT_CACHED_STATEMENTS,
+                 profile=DEFAULT_PROFILE):
+        """
+        Initialise the ConnectionManager.
+
+        Input:
+        - database: (str) Path of the sqlite database file, a "file:" URI
+          or ":memory:".
+        - cached_statements: (int) Size of the prepared statement cache
+          for each connection.
+        - profile: (str or dict) Storage profile applied to each connection,
+          a name from STORAGE_PROFILES or a dictionary of pragmas.
+        """
+        self.database = os.fspath(database)
+        self.cached_statements = cached_statements
+        self.pragmas = resolve_profile(profile)
+        if self.database == MEMORY_DATABASE:
+            self._target = f"file:/task_manager_{next(_memory_ids)}?vfs=memdb"
+        else:
+            self._target = self.database
+        self._uri = self._target.startswith("file:")
+        query = urlsplit(self._target).query if self._uri else ""
+        self.in_memory = ("mode=memory" in query or "vfs=memdb" in query
+                          or self.database == MEMORY_DATABASE)
+        self._keep_alive = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = set()
+
+    @property
+    def path(self):
+        """
+        The database file as a Path, or None for in-memory databases.
+        """
+        if self.in_memory:
+            return None
+        if self._uri:
+            return Path(unquote(urlsplit(self._target).path))
+        return Path(self.database)
+
+    def connect(self, timeout=5.0):
+        """
+        Function: connect
+
+        Opens a new connection to the database that the manager doesn't
+        track or configure, for tools such as the backup that need a
+        connection of their own.
+
+        Output:
+        - db: (sqlite3.Connection) the new connection.
+        """
+        return sqlite3.connect(self._target, timeout=timeout, uri=self._uri,
+                               cached_statements=self.cached_statements,
+                               check_same_thread=False)
+
+    def _connect(self):
+        """
+        Opens a new connection to the database.
+
+        check_same_thread is disabled so that close_all() can close
+        connections opened by other threads during shutdown. Each connection
+        is still only used by the thread that opened it. The storage profile
+        pragmas are applied before the connection is handed out. Foreign
+        keys are always enforced, whatever the profile, as the schema relies
+        on them to keep tasks pointing at existing users.
+        """
+        if self.in_memory:
+            with self._lock:
+                if self._keep_alive is None:
+                    self._keep_alive = self.connect()
+        db = self.connect()
+        try:
+            db.execute("PRAGMA foreign_keys = ON")
+            for name in PROFILE_PRAGMAS:
+                if name in self.pragmas:
+                    db.execute(f"PRAGMA {name} = {self.pragmas[name]}")
+        except sqlite3.Error:
+            db.close()
+            raise
+        return db
+
+    def get_connection(self):
+        """
+        Function: get_connection
+
+        Returns the connection owned by the calling thread, opening it on
+        first use.
+
+        Output:
+        - db: (sqlite3.Connection) connection for the current thread.
+        """
+        db = getattr(self._local, "connection", None)
+        if db is None:
+            db = self._connect()
+            self._local.connection = db
+            with self._lock:
+                self._connections.add(db)
+        return db
+
+    def close_connection(self):
+        """
+        Function: close_connection
+
+        Closes the connection owned by the calling thread, if it has one.
+        Worker threads should call this before they finish.
+        """
+        db = getattr(self._local, "connection", None)
+        if db is None:
+            return
+
+        self._local.connection = None
+        with self._lock:
+            self._connections.discard(db)
+        db.close()
+
+    def close_all(self):
+        """
+        Function: close_all
+
+        Closes every connection opened by this manager. Any uncommitted
+        changes are rolled back. An in-memory database is discarded.
+        Called automatically at interpreter exit for the default manager.
+        """
+        with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()
+            if self._keep_alive is not None:
+                connections.append(self._keep_alive)
+                self._keep_alive = None
+
+        for db in connections:
+            try:
+                db.rollback()
+                db.close()
+            except sqlite3.Error as e:
+                print(f"Error closing connection: {e}")
+
+        # Threads holding a closed connection open a new one on next use
+        self._local = threading.local()
+
+
+# Shared manager used by the repositories unless they are given their own
+default_manager = ConnectionManager(configured_database())
+atexit.register(default_manager.close_all)
@@ -3,10 +3,19 @@ Data access layer for Task Manager.
 
 Handles interaction with the data base for CRUD operations.
 """
+import csv
+import os
 import sqlite3
 import re
-from datetime import datetime
+import time
+from collections import Counter
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import chain, islice
 from pathlib import Path
+from task_manager.connection import default_manager
+from task_manager.import_pipeline import parallel_parse
+from task_manager.migrations import CHANGE_CLOCK, migrate
 
 # Build absolute paths to data files based on module's location.
 # This to to ensure that 'users.txt' and 'tasks/txt' are found indenpendent
@@ -14,6 +23,323 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent
 USERS_FILE = BASE_DIR / "users.txt"
 TASKS_FILE = BASE_DIR / "tasks.txt"
+TASK_CHANGES_FILE = BASE_DIR / "task_changes.txt"
+
+# Dates are stored as YYYYMMDD integers and Yes/No flags as 1/0 (see
+# migrations.py). These column lists convert them back to the 'YYYY-MM-DD'
+# and 'Yes'/'No' values used by the rest of the application, so rows keep
+# the same shape as the table columns. Tasks store their assignee's user ID
+# (see migrations.py), so the username is read from TASK_TABLES.
+TASK_COLUMNS = """
+    tasks.id, title, description,
+    printf('%04d-%02d-%02d', assignedDate / 10000,
+           assignedDate / 100 % 100, assignedDate % 100),
+    printf('%04d-%02d-%02d', dueDate / 10000,
+           dueDate / 100 % 100, dueDate % 100),
+    CASE isComplete WHEN 1 THEN 'Yes' ELSE 'No' END,
+    user.username
+"""
+
+# Tasks joined to their assignee. Unassigned tasks have a NULL username.
+TASK_TABLES = "tasks LEFT JOIN user ON user.id = tasks.userId"
+
+# User ID of the username given as a parameter, found through the unique
+# username index before the tasks are read.
+ASSIGNEE_ID = "(SELECT id FROM user WHERE username = ?)"
+
+USER_COLUMNS = """
+    id, username, password, email,
+    CASE isAdmin WHEN 1 THEN 'Yes' ELSE 'No' END
+"""
+
+
+def date_to_int(value):
+    """
+    Function: date_to_int
+
+    Converts a 'YYYY-MM-DD' date string to the YYYYMMDD integer stored in
+    the database.
+    """
+    return int(value.strip().replace("-", ""))
+
+
+def flag_to_int(value):
+    """
+    Function: flag_to_int
+
+    Converts a 'Yes'/'No' flag to the 1/0 integer stored in the database.
+    """
+    return 1 if value == "Yes" else 0
+
+
+# Number of rows parsed, inserted and committed together by the bulk import
+BULK_CHUNK_SIZE = 50000
+
+# Reasons a row can be skipped by the bulk import
+SKIP_FORMAT = "incorrect format"
+SKIP_DATE = "incorrect date format"
+SKIP_USER = "user does not exist"
+SKIP_ID = "invalid ID format"
+SKIP_EMAIL = "incorrect email format"
+SKIP_ID_IN_USE = "ID in use by another user"
+SKIP_USERNAME_IN_USE = "username used by another ID"
+
+# Default number of tasks returned by the paged listings
+PAGE_SIZE = 20
+
+# Rows fetched at a time by the iter_* listings
+ITER_BATCH_SIZE = 1000
+
+# Same check as utilities.validate_email
+EMAIL_PATTERN = re.compile(r"[^@]+@[^@]+\.[^@]+")
+
+# Rows fetched per batch and file buffer size used by the exports
+EXPORT_BATCH_SIZE = 5000
+EXPORT_BUFFER_SIZE = 1024 * 1024
+
+# Suffix of an export file that is still being written. It replaces the
+# previous export only once the whole file has been written.
+EXPORT_PARTIAL_SUFFIX = ".partial"
+
+# Header rows of 'tasks.txt' and 'users.txt'. Files exported before headers
+# were added start straight with data, and are still read.
+TASK_FILE_FIELDS = ["task_id", "title", "description", "assigned_date",
+                    "due_date", "is_complete", "user"]
+USER_FILE_FIELDS = ["user_id", "username", "password", "email", "is_admin"]
+
+# Header row of the delta export. Deleted tasks are written as tombstones:
+# only task_id, updated_at (when it was deleted) and deleted are filled in.
+TASK_CHANGE_FIELDS = TASK_FILE_FIELDS + ["updated_at", "deleted"]
+
+
+class FileDialect(csv.excel):
+    """
+    CSV dialect of 'tasks.txt' and 'users.txt'. Fields containing commas,
+    quotes or newlines are quoted so they survive a round trip. Lines end
+    in a plain newline like the original files, and spaces after a comma
+    are ignored as the original imports stripped them.
+    """
+    lineterminator = "\n"
+    skipinitialspace = True
+
+
+csv.register_dialect("task_manager", FileDialect)
+
+# Dialect used by the imports and exports unless another is given, either
+# a name from csv.list_dialects() or a csv.Dialect subclass
+CSV_DIALECT = "task_manager"
+
+# Default number of results returned by search_tasks
+SEARCH_LIMIT = 20
+
+# Default number of changes returned by changes_since
+CHANGE_BATCH_SIZE = 1000
+
+# A word in a search, optionally followed by '*' for a prefix search
+SEARCH_TERM = re.compile(r"(\w+)(\*?)")
+
+
+@lru_cache(maxsize=4096)
+def parse_date(value):
+    """
+    Function: parse_date
+
+    Validates a 'YYYY-MM-DD' date and returns it as a YYYYMMDD integer.
+    Zero padded dates are checked directly, which is much faster than
+    strptime. Anything else falls back to strptime so the same dates are
+    accepted as before. Imports repeat the same dates many times, so
+    results are cached.
+
+    Input:
+    - value: (str) date to validate.
+
+    Output:
+    - (int) YYYYMMDD integer.
+    - ValueError: raised if the date is not valid.
+    """
+    if len(value) == 10 and value[4] == "-" and value[7] == "-":
+        digits = value[:4] + value[5:7] + value[8:]
+        if digits.isdigit():
+            # Raises ValueError for dates such as 2025-02-30
+            date(int(value[:4]), int(value[5:7]), int(value[8:]))
+            return int(digits)
+
+    return date_to_int(datetime.strptime(value, "%Y-%m-%d").strftime(
+        "%Y-%m-%d"))
+
+
+def parse_task_rows(records, usernames):
+    """
+    Function: parse_task_rows
+
+    Validates and parses rows read from 'tasks.txt' using the same rules
+    as import_tasks, without touching the database.
+
+    Input:
+    - records: (iterable) lists of fields read by the csv reader.
+    - usernames: (dict) user ID of each username in the database.
+
+    Output:
+    - rows: (list) tuples ready to insert into the tasks table.
+    - skipped: (Counter) number of rows skipped for each reason.
+    """
+    rows = []
+    skipped = Counter()
+
+    for task in records:
+        if not task:
+            continue
+
+        if len(task) != 7:
+            skipped[SKIP_FORMAT] += 1
+            continue
+
+        try:
+            task_id = int(task[0])
+        except ValueError:
+            skipped[SKIP_FORMAT] += 1
+            continue
+
+        try:
+            assigned_date = parse_date(task[3])
+            due_date = parse_date(task[4])
+        except ValueError:
+            skipped[SKIP_DATE] += 1
+            continue
+
+        # Unassigned tasks are exported with an empty user
+        user_id = usernames.get(task[6]) if task[6] else None
+        if task[6] and user_id is None:
+            skipped[SKIP_USER] += 1
+            continue
+
+        rows.append((task_id, task[1], task[2], assigned_date, due_date,
+                     flag_to_int(task[5].capitalize()), user_id))
+
+    return rows, skipped
+
+
+def parse_user_rows(records):
+    """
+    Function: parse_user_rows
+
+    Validates and parses rows read from 'users.txt' using the same rules
+    as import_users. Checking IDs and usernames against existing users
+    needs the database, so that is left to the caller.
+
+    Input:
+    - records: (iterable) lists of fields read by the csv reader.
+
+    Output:
+    - rows: (list) tuples ready to insert into the user table.
+    - skipped: (Counter) number of rows skipped for each reason.
+    """
+    rows = []
+    skipped = Counter()
+
+    for user in records:
+        if not user:
+            continue
+
+        if len(user) != 5:
+            skipped[SKIP_FORMAT] += 1
+            continue
+
+        try:
+            user_id = int(user[0])
+        except ValueError:
+            skipped[SKIP_ID] += 1
+            continue
+
+        email = user[3]
+        if not EMAIL_PATTERN.match(email):
+            skipped[SKIP_EMAIL] += 1
+            continue
+
+        rows.append((user_id, user[1], user[2], email,
+                     flag_to_int(user[4].capitalize())))
+
+    return rows, skipped
+
+
+def fts_query(text):
+    """
+    Function: fts_query
+
+    Turns search text typed by a user into an FTS5 query. Every word has to
+    match, and a word ending in '*' matches any word starting with it. Each
+    word is quoted, so punctuation and FTS5 keywords such as OR or NOT
+    can't cause syntax errors.
+
+    Input:
+    - text: (str) the search text.
+
+    Output:
+    - query: (str) FTS5 query, empty if the text has no words.
+    """
+    return " ".join(f'"{word}"{star}'
+                    for word, star in SEARCH_TERM.findall(text))
+
+
+def iter_rows(cursor, batch_size):
+    """
+    Function: iter_rows
+
+    Yields the rows of an executed query one at a time, fetching them from
+    the database in batches of batch_size.
+    """
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def export_partial_path(file_path):
+    """
+    Function: export_partial_path
+
+    Returns the path an export to file_path is written to before it is
+    renamed into place, so a failed export never truncates the previous one.
+    """
+    return Path(f"{file_path}{EXPORT_PARTIAL_SUFFIX}")
+
+
+def read_chunks(rows, chunk_size):
+    """
+    Function: read_chunks
+
+    Yields lists of up to chunk_size rows from a csv reader or lines from
+    an open file.
+    """
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def read_records(file, fields, dialect=CSV_DIALECT):
+    """
+    Function: read_records
+
+    Returns a csv reader over an open import file, positioned after the
+    header row. Files without a header, such as those exported before
+    headers were written, are read from their first row.
+
+    Input:
+    - file: (file) import file opened with newline="".
+    - fields: (list) expected header, TASK_FILE_FIELDS or USER_FILE_FIELDS.
+    - dialect: (str or csv.Dialect) CSV dialect of the file.
+
+    Output:
+    - rows: (iterator) lists of fields, one per record.
+    """
+    reader = csv.reader(file, dialect)
+    first = next(reader, None)
+    if first is None or first == fields:
+        return reader
+    return chain([first], reader)
 
 
 class TaskRepository:
@@ -22,48 +348,35 @@ class TaskRepository:
 
     Handles database CRUD operations for tasks.
     """
-    def __init__(self):
+    def __init__(self, connections=None):
         """
         Initialise the Task Repository
 
         Ensures the 'tasks' table exists in the database by calling
         the _create_table() method when a new TaskRepository is created.
-        """
 
+        Input:
+        - connections: (ConnectionManager) Optional manager to get database
+          connections from. The shared default manager is used if not given.
+        """
+        self.connections = connections or default_manager
         self._create_table()
 
     def _create_table(self):
         """
-        Creates the tasks table, if it does not exist, when called by
-        the __init__ function.
+        Creates or upgrades the database schema, including the tasks table,
+        when called by the __init__ function. See migrations.py.
         """
         try:
-            # Create database called tasks
-            db = sqlite3.connect("taskManager.db")
+            # Get the shared connection for this thread
+            db = self.connections.get_connection()
 
-            # Create a cursor object
-            cursor = db.cursor()
-
-            # Check for tasks table and create if it does not exist
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS
-                tasks(id INTEGER PRIMARY KEY, title TEXT, description TEXT,
-                assignedDate TEXT, dueDate TEXT, isComplete TEXt DEFAULT "No",
-                user TEXT)
-                """
-            )
-
-            # Commit the changes
-            db.commit()
+            # Apply any schema migrations the database hasn't had yet
+            migrate(db)
 
         # Catch and exceptions
         except sqlite3.Error as e:
-            db.rollback()
             print(f"Error creating table: {e}")
-        finally:
-            # Close the db connection
-            db.close()
 
     # ********** Task functions **********
     def add_task(self, title, description, assigned_date, due_date, user):
@@ -79,21 +392,25 @@ class TaskRepository:
         - assigned_date: (str) Date the task was created. Date is set to task
           creation date automatically.
         - due_date: (str) Date the task needs to be completed by.
-        - user: (str) Task assignee.
+        - user: (str) Task assignee, None to leave the task unassigned.
 
         Output:
         - cursor.lastrowid: returns the id of new task if added
-        - None: occurs if a sqlite3 error happens
+        - None: occurs if the assignee doesn't exist or a sqlite3 error
+          happens
         """
         try:
-            db = sqlite3.connect("taskManager.db")
+            db = self.connections.get_connection()
             cursor = db.cursor()
+            if not self._assignee_exists(cursor, user):
+                return None
             cursor.execute(
-                """
+                f"""
                 INSERT INTO tasks(title, description, assignedDate, dueDate,
-                user)
-                VALUES(?, ?, ?, ?, ?)
-                """, (title, description, assigned_date, due_date, user)
+                userId, updatedAt)
+                VALUES(?, ?, ?, ?, {ASSIGNEE_ID}, {CHANGE_CLOCK})
+                """, (title, description, date_to_int(assigned_date),
+                      date_to_int(due_date), user)
             )
             # Commit the changes
             db.commit()
@@ -110,9 +427,20 @@ class TaskRepository:
             db.rollback()
             print(f"Database error: {e}")
             return None
-        finally:
-            # Close the db connection
-            db.close()
+
+    def _assignee_exists(self, cursor, user):
+        """
+        Returns True if user is an existing username or None (unassigned),
+        otherwise prints a message and returns False. Without this check
+        ASSIGNEE_ID would silently leave the task unassigned.
+        """
+        if user is None:
+            return True
+        cursor.execute("SELECT 1 FROM user WHERE username = ?", (user,))
+        if cursor.fetchone() is None:
+            print(f"User '{user}' does not exist.")
+            return False
+        return True
 
     def get_task(self, task_id):
         """
@@ -137,18 +465,17 @@ class TaskRepository:
         - None: occurs if the task is not found.
         """
 
-        db = sqlite3.connect("taskManager.db")
+        db = self.connections.get_connection()
         cursor = db.cursor()
         cursor.execute(
-            """
-            SELECT *
-            FROM tasks
-            WHERE id = ?
+            f"""
+            SELECT {TASK_COLUMNS}
+            FROM {TASK_TABLES}
+            WHERE tasks.id = ?
             """,
             (task_id,),
         )
         task = cursor.fetchone()
-        db.close()
 
         if task is None:
             return None
@@ -169,18 +496,17 @@ class TaskRepository:
         - tasks: returns all tasks assigned to user
         - None: occurs if no tasks are found
         """
-        db = sqlite3.connect("taskManager.db")
+        db = self.connections.get_connection()
         cursor = db.cursor()
         cursor.execute(
-            """
-            SELECT *
-            FROM tasks
-            WHERE user = ?
+            f"""
+            SELECT {TASK_COLUMNS}
+            FROM {TASK_TABLES}
+            WHERE userId = {ASSIGNEE_ID}
             """,
             (user,),
         )
         tasks = cursor.fetchall()
-        db.close()
 
         if not tasks:
             return []
@@ -197,16 +523,15 @@ class TaskRepository:
         Output:
         - tasks: returns all tasks no matter who they're assigned to
         """
-        db = sqlite3.connect("taskManager.db")
+        db = self.connections.get_connection()
         cursor = db.cursor()
         cursor.execute(
-            """
-            SELECT *
-            FROM tasks
+            f"""
+            SELECT {TASK_COLUMNS}
+            FROM {TASK_TABLES}
             """
         )
         tasks = cursor.fetchall()
-        db.close()
 
         if tasks is None:
             return []
@@ -224,24 +549,318 @@ class TaskRepository:
         - completed_tasks: returns all tasks marked as complete no matter
           the assignee.
         """
-        is_complete = "Yes"
-        db = sqlite3.connect("taskManager.db")
+        is_complete = 1
+        db = self.connections.get_connection()
         cursor = db.cursor()
         cursor.execute(
-            """
-            SELECT *
-            FROM tasks
+            f"""
+            SELECT {TASK_COLUMNS}
+            FROM {TASK_TABLES}
             WHERE isComplete = ?
             """, (is_complete,)
         )
         completed_tasks = cursor.fetchall()
-        db.close()
 
         if completed_tasks is None:
             return []
 
         return completed_tasks
 
+    # ********** Lazy listings **********
+    # Generators returning the same rows as the list versions, read from the
+    # cursor in batches so large results never need to fit in memory.
+    def iter_all_tasks(self, batch_size=ITER_BATCH_SIZE):
+        """
+        Function: iter_all_tasks
+
+        Yields every task one at a time. Available to admins only.
+
+        Input:
+        - batch_size: (int) number of rows fetched from the database at once.
+        """
+        db = self.connections.get_connection()
+        cursor = db.cursor()
+        cursor.execute(
+            f"""
+            SELECT {TASK_COLUMNS}
+            FROM {TASK_TABLES}
+            """
+        )
+        yield from iter_rows(cursor, batch_size)
+
+    def iter_my_tasks(self, user, batch_size=ITER_BATCH_SIZE):
+        """
+        Function: iter_my_tasks
+
+        Yields the tasks assigned to a user one at a time.
+
+        Input:
+        - user: (str) Username of the logged in user.
+        - batch_size: (int) number of rows fetched from the database at once.
+        """
+        db = self.connections.get_connection()
+        cursor = db.cursor()
+        cursor.execute(
+            f"""
+            SELECT {TASK_COLUMNS}
+            FROM {TASK_TABLES}
+            WHERE userId = {ASSIGNEE_ID}
+            """,
+            (user,),
+        )
+        yield from iter_rows(cursor, batch_size)
+
+    def iter_completed_tasks(self, batch_size=ITER_BATCH_SIZE):
+        """
+        Function: iter_completed_tasks
+
+        Yields completed tasks one at a time. Available to admins only.
+
+        Input:
+        - batch_size: (int) number of rows fetched from the database at once.
+        """
+        db = self.connections.get_connection()
+        cursor = db.cursor()
+        cursor.execute(
+            f"""
+            SELECT {TASK_COLUMNS}
+            FROM {TASK_TABLES}
+            WHERE isComplete = 1
+            """
+        )
+        yield from iter_rows(cursor, batch_size)
+
+    def iter_overdue_tasks(self, batch_size=ITER_BATCH_SIZE):
+        """
+        Function: iter_overdue_tasks
+
+        Yields overdue tasks one at a time. Available to admins only.
+
+        Input:
+        - batch_size: (int) number of rows fetched from the database at once.
+        """
+        db = self.connections.get_connection()
+        cursor = db.cursor()
+        cursor.execute(
+            f"""
+            SELECT {TASK_COLUMNS}
+            FROM {TASK_TABLES}
+            WHERE dueDate < CAST(strftime('%Y%m%d', 'now') AS INTEGER)
+            AND isComplete = 0
+            """
+        )
+        yield from iter_rows(cursor, batch_size)
+
+    # ********** Paged listings **********
+    # Keyset pagination: each page starts after the last row of the previous
+    # page instead of using OFFSET, so every page costs the same however far
+    # into the table it is.
+    def view_all_tasks_page(self, after_id=0, limit=PAGE_SIZE):
+        """
+        Function: view_all_tasks_page
+
+        Returns one page of all tasks in ID order. Available to admins only.
+
+        Input:
+        - after_id: (int) ID of the last task on the previous page, 0 for the
+          first page.
+        - limit: (int) maximum number of tasks to return.
+
+        Output:
+        - tasks: list of up to limit tasks with an ID after after_id.
+        """
+        db = self.connections.get_connection()
+        cursor = db.cursor()
+        cursor.execute(
+            f"""
+            SELECT {TASK_COLUMNS}
+            FROM {TASK_TABLES}
+            WHERE tasks.id > ?
+            ORDER BY tasks.id
+            LIMIT ?
+            """, (after_id, limit)
+        )
+        return cursor.fetchall()
+
+    def get_my_tasks_page(self, user, after_id=0, limit=PAGE_SIZE):
+        """
+        Function: get_my_tasks_page
+
+        Returns one page of the tasks assigned to a user in ID order.
+
+        Input:
+        - user: (str) Username of the logged in user.
+        - after_id: (int) ID of the last task on the previous page, 0 for the
+          first page.
+        - limit: (int) maximum number of tasks to return.
+
+        Output:
+        - tasks: list of up to limit tasks with an ID after after_id.
+        """
+        db = self.connections.get_connection()
+        cursor = db.cursor()
+        cursor.execute(
+            f"""
+            SELECT {TASK_COLUMNS}
+            FROM {TASK_TABLES}
+            WHERE userId = {ASSIGNEE_ID} AND tasks.id > ?
+            ORDER BY tasks.id
+            LIMIT ?
+            """, (user, after_id, limit)
+        )
+        return cursor.fetchall()
+
+    def completed_tasks_page(self, after_id=0, limit=PAGE_SIZE):
+        """
+        Function: completed_tasks_page
+
+        Returns one page of completed tasks in ID order. Available to admins
+        only.
+
+        Input:
+        - after_id: (int) ID of the last task on the previous page, 0 for the
+          first page.
+        - limit: (int) maximum number of tasks to return.
+
+        Output:
+        - tasks: list of up to limit tasks with an ID after after_id.
+        """
+        db = self.connections.get_connection()
+        cursor = db.cursor()
+        cursor.execute(
+            f"""
+            SELECT {TASK_COLUMNS}
+            FROM {TASK_TABLES}
+            WHERE isComplete = 1 AND tasks.id > ?
+            ORDER BY tasks.id
+            LIMIT ?
+            """, (after_id, limit)
+        )
+        return cursor.fetchall()
+
+    def overdue_tasks_page(self, after_due_date=None, after_id=0,
+                           limit=PAGE_SIZE):
+        """
+        Function: overdue_tasks_page
+
+        Returns one page of overdue tasks ordered by due date, oldest first,
+        then ID. Available to admins only.
+
+        Input:
+        - after_due_date: (str) due date of the last task on the previous
+          page, None for the first page.
+        - after_id: (int) ID of the last task on the previous page.
+        - limit: (int) maximum number of tasks to return.
+
+        Output:
+        - tasks: list of up to limit tasks after the given due date and ID.
+        - ValueError: raised if after_due_date is not a valid date.
+        """
+        after_due = 0
+        if after_due_date:
+            try:
+                after_due = parse_date(after_due_date.strip())
+            except ValueError:
+                raise ValueError(
+                    "after_due_date must be a date in YYYY-MM-DD format."
+                ) from None
+        db = self.connections.get_connection()
+        cursor = db.cursor()
+        cursor.execute(
+            f"""
+            SELECT {TASK_COLUMNS}
+            FROM {TASK_TABLES}
+            WHERE dueDate < CAST(strftime('%Y%m%d', 'now') AS INTEGER)
+            AND isComplete = 0
+            AND (dueDate, tasks.id) > (?, ?)
+            ORDER BY dueDate, tasks.id
+            LIMIT ?
+            """, (after_due, after_id, limit)
+        )
+        return cursor.fetchall()
+
+    def task_stats(self):
+        """
+        Function: task_stats
+
+        Returns the number of open, completed and total tasks for each user
+        with tasks. Reads the trigger maintained task_counts table, so the
+        cost depends on the number of users, not the number of tasks.
+        Unassigned tasks are counted under ''. Available to admins only.
+
+        Output:
+        - stats: list of (user, open, completed, total) rows ordered by
+          username.
+        """
+        db = self.connections.get_connection()
+        cursor = db.cursor()
+        cursor.execute(
+            """
+            SELECT IFNULL(user.username, ''), open, completed,
+                   open + completed
+            FROM task_counts LEFT JOIN user ON user.id = task_counts.userId
+            ORDER BY 1
+            """
+        )
+        return cursor.fetchall()
+
+    def search_tasks(self, query, user=None, limit=SEARCH_LIMIT):
+        """
+        Function: search_tasks
+
+        Full text search over task titles and descriptions using the
+        tasks_fts index. Results are ranked best match first (bm25).
+
+        Input:
+        - query: (str) search text, see fts_query.
+        - user: (str) only search the tasks assigned to this user.
+        - limit: (int) maximum number of tasks to return.
+
+        Output:
+        - tasks: list of up to limit matching tasks, best match first.
+        """
+        match = fts_query(query)
+        if not match:
+            return []
+
+        db = self.connections.get_connection()
+        cursor = db.cursor()
+        if user is None:
+            # FTS5 finds the top results itself when ORDER BY rank and
+            # LIMIT are on the full text query
+            cursor.execute(
+                f"""
+                WITH hits AS (
+                    SELECT rowid AS task_id, rank AS score
+                    FROM tasks_fts
+                    WHERE tasks_fts MATCH ?
+                    ORDER BY rank
+                    LIMIT ?
+                )
+                SELECT {TASK_COLUMNS}
+                FROM hits JOIN tasks ON tasks.id = hits.task_id
+                LEFT JOIN user ON user.id = tasks.userId
+                ORDER BY hits.score
+                """, (match, limit)
+            )
+        else:
+            cursor.execute(
+                f"""
+                WITH hits AS (
+                    SELECT rowid AS task_id, rank AS score
+                    FROM tasks_fts
+                    WHERE tasks_fts MATCH ?
+                )
+                SELECT {TASK_COLUMNS}
+                FROM hits JOIN tasks ON tasks.id = hits.task_id
+                LEFT JOIN user ON user.id = tasks.userId
+                WHERE tasks.userId = {ASSIGNEE_ID}
+                ORDER BY hits.score
+                LIMIT ?
+                """, (match, user, limit)
+            )
+        return cursor.fetchall()
+
     def update_task(self, title, description, due_date, user, task_id):
         """
         Function: update_task
@@ -255,23 +874,28 @@ class TaskRepository:
         - title: (str) current or new title of the task.
         - description: (str) current or new description of the task.
         - due_date: (str) current or updated due date in "%d/%m/%Y" format.
-        - user: (str) current or updated task assignee.
+        - user: (str) current or updated task assignee, None for an
+          unassigned task.
         - task_id: (int) ID of the task to update.
 
         Output:
         - cursor.rowcount: if more than 0 the update was completed
           else it failed
+        - False: occurs if the assignee doesn't exist
         - None: occurs if there is a sqlite3 error or update failed
         """
         try:
-            db = sqlite3.connect("taskManager.db")
+            db = self.connections.get_connection()
             cursor = db.cursor()
+            if not self._assignee_exists(cursor, user):
+                return False
             cursor.execute(
-                '''
+                f'''
                 UPDATE tasks
-                SET title = ?, description = ?, dueDate = ?, user = ?
+                SET title = ?, description = ?, dueDate = ?,
+                userId = {ASSIGNEE_ID}, updatedAt = {CHANGE_CLOCK}
                 WHERE id = ?''',
-                (title, description, due_date, user, task_id)
+                (title, description, date_to_int(due_date), user, task_id)
             )
             db.commit()
             return cursor.rowcount > 0
@@ -287,8 +911,6 @@ class TaskRepository:
             db.rollback()
             print(f"Database error: {e}")
             return None
-        finally:
-            db.close()
 
     def mark_complete(self, task_id):
         """
@@ -305,13 +927,13 @@ class TaskRepository:
         - None: occurs if there is a sqlite3 error
         """
         try:
-            is_complete = "Yes"
-            db = sqlite3.connect("taskManager.db")
+            is_complete = 1
+            db = self.connections.get_connection()
             cursor = db.cursor()
             cursor.execute(
-                '''
+                f'''
                 UPDATE tasks
-                SET isComplete = ?
+                SET isComplete = ?, updatedAt = {CHANGE_CLOCK}
                 WHERE id = ?
                 ''',
                 (is_complete, task_id)
@@ -330,8 +952,6 @@ class TaskRepository:
             db.rollback()
             print(f"Database error: {e}")
             return None
-        finally:
-            db.close()
 
     def overdue_tasks(self):
         """
@@ -344,17 +964,17 @@ class TaskRepository:
         - overdue_tasks: returns all overdue tasks.
         - None: occurs when there are no overdue tasks
         """
-        db = sqlite3.connect("taskManager.db")
+        db = self.connections.get_connection()
         cursor = db.cursor()
         cursor.execute(
-            """
-            SELECT *
-            FROM tasks
-            WHERE dueDate < DATE("now") AND isComplete = "No"
+            f"""
+            SELECT {TASK_COLUMNS}
+            FROM {TASK_TABLES}
+            WHERE dueDate < CAST(strftime('%Y%m%d', 'now') AS INTEGER)
+            AND isComplete = 0
             """
         )
         overdue_tasks = cursor.fetchall()
-        db.close()
 
         if overdue_tasks is None:
             return []
@@ -376,7 +996,7 @@ class TaskRepository:
         - None: occurs if there is a sqlite3 error
         """
         try:
-            db = sqlite3.connect("taskManager.db")
+            db = self.connections.get_connection()
             cursor = db.cursor()
             cursor.execute(
                 '''
@@ -398,10 +1018,80 @@ class TaskRepository:
             db.rollback()
             print(f"Database error: {e}")
             return None
-        finally:
-            db.close()
 
-    def import_tasks(self):
+    def apply_batch(self, operations, owner=None):
+        """
+        Function: apply_batch
+
+        Applies add, complete and delete operations in order within a single
+        transaction, so thousands of changes only cost one commit. If any
+        operation hits a sqlite3 error none of them are applied.
+
+        Input:
+        - operations: (iterable) of (action, values) tuples:
+            - ("add", (title, description, assigned_date, due_date, user))
+            - ("complete", task_id)
+            - ("delete", task_id)
+        - owner: (str) when given, only tasks assigned to this user can be
+          completed.
+
+        Output:
+        - results: (list) one result per operation, the new task ID for
+          "add" and True or False for whether the task was changed for the
+          others. Already completed tasks aren't changed.
+        - None: occurs if there is a sqlite3 error
+        - ValueError: raised for an unknown action or an add assigned to a
+          user that doesn't exist, with none of the operations applied.
+        """
+        db = self.connections.get_connection()
+        cursor = db.cursor()
+        results = []
+
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for action, values in operations:
+                if action == "add":
+                    title, description, assigned_date, due_date, user = values
+                    if not self._assignee_exists(cursor, user):
+                        raise ValueError(f"User {user} does not exist.")
+                    cursor.execute(
+                        f"""
+                        INSERT INTO tasks(title, description, assignedDate,
+                        dueDate, userId, updatedAt)
+                        VALUES(?, ?, ?, ?, {ASSIGNEE_ID}, {CHANGE_CLOCK})
+                        """, (title, description, date_to_int(assigned_date),
+                              date_to_int(due_date), user)
+                    )
+                    results.append(cursor.lastrowid)
+                    continue
+
+                if action == "complete":
+                    cursor.execute(
+                        f"""
+                        UPDATE tasks
+                        SET isComplete = 1, updatedAt = {CHANGE_CLOCK}
+                        WHERE id = ? AND isComplete = 0
+                        AND (? IS NULL OR userId = {ASSIGNEE_ID})
+                        """, (values, owner, owner)
+                    )
+                elif action == "delete":
+                    cursor.execute("DELETE FROM tasks WHERE id = ?",
+                                   (values,))
+                else:
+                    raise ValueError(f"Unknown batch action: {action}")
+                results.append(cursor.rowcount > 0)
+
+            db.commit()
+            return results
+        except sqlite3.DatabaseError as e:
+            db.rollback()
+            print(f"Database error: {e}")
+            return None
+        except BaseException:
+            db.rollback()
+            raise
+
+    def import_tasks(self, dialect=CSV_DIALECT):
         """
         Function: import_tasks
 
@@ -409,59 +1099,65 @@ class TaskRepository:
         tasks are skipped, as they're updated using'update_task'. New tasks
         can be added if they meet validation rules. Tasks with invalid dates
         or where user doesn't exist are skipped, with a message printed to
-        the console for each task that is skipped. Available to admins only.
+        the console for each task that is skipped. Tasks with an empty user
+        are imported unassigned. Available to admins only.
+        The file is read as CSV, see read_records.
+
+        Input:
+        - dialect: (str or csv.Dialect) CSV dialect of the file.
 
         Output:
         - None: occurs if there is a sqlite3 error
         """
-        db = sqlite3.connect("taskManager.db")
+        db = self.connections.get_connection()
         cursor = db.cursor()
 
         try:
-            with open(TASKS_FILE, "r", encoding="utf-8") as file:
+            with open(TASKS_FILE, "r", encoding="utf-8",
+                      newline="") as file:
                 print("New tasks will be added to the database.")
                 print("Please note, option '4. Update tasks' to update "
                       "existing tasks.\n")
-                for line in file:
-                    if not line.strip():
+                for task in read_records(file, TASK_FILE_FIELDS, dialect):
+                    if not task:
                         continue
 
                     try:
-                        task = line.strip().split(",")
-
                         if len(task) != 7:
-                            print(f"{line.strip()} skipped due to incorrect"
-                                  f" format.")
+                            print(f"{','.join(task)} skipped due to "
+                                  f"incorrect format.")
                             continue
 
-                        task_id = int(task[0].strip())
-                        title = task[1].strip()
-                        description = task[2].strip()
-                        assigned_date = task[3].strip()
-                        due_date = task[4].strip()
-                        is_complete = task[5].strip().capitalize()
-                        user = task[6].strip()
+                        task_id = int(task[0])
+                        (title, description, assigned_date, due_date,
+                         is_complete, user) = task[1:]
+                        is_complete = is_complete.capitalize()
 
                         try:
-                            assigned_date = datetime.strptime(
-                                assigned_date.strip(), "%Y-%m-%d").strftime(
-                                    "%Y-%m-%d")
-                            due_date = datetime.strptime(
-                                due_date.strip(), "%Y-%m-%d").strftime(
-                                    "%Y-%m-%d")
+                            assigned_date = date_to_int(datetime.strptime(
+                                assigned_date, "%Y-%m-%d").strftime(
+                                    "%Y-%m-%d"))
+                            due_date = date_to_int(datetime.strptime(
+                                due_date, "%Y-%m-%d").strftime(
+                                    "%Y-%m-%d"))
                         except ValueError:
                             print(f"Task {task_id} skipped: Incorrect "
                                   f"date format")
                             continue
 
-                        cursor.execute(
-                            '''
-                            SELECT id FROM user
-                            WHERE username = ?
-                            ''', (user.strip(), )
-                        )
+                        if user:
+                            cursor.execute(
+                                '''
+                                SELECT id FROM user
+                                WHERE username = ?
+                                ''', (user, )
+                            )
 
-                        user_exist = cursor.fetchone()
+                            user_exist = cursor.fetchone()
+                        else:
+                            # Unassigned tasks are exported with an empty
+                            # user
+                            user_exist = (None, )
 
                         if not user_exist:
                             print(f"Task {task_id} skipped: {user} "
@@ -470,14 +1166,16 @@ class TaskRepository:
 
                         try:
                             cursor.execute(
-                                '''
+                                f'''
                                 INSERT INTO tasks(id, title, description,
-                                assignedDate, dueDate, isComplete, user)
-                                VALUES (?, ?, ?, ?, ?, ?, ?)
+                                assignedDate, dueDate, isComplete, userId,
+                                updatedAt)
+                                VALUES (?, ?, ?, ?, ?, ?, ?, {CHANGE_CLOCK})
                                 ON CONFLICT(id) DO NOTHING
                                 ''', (task_id, title, description,
                                       assigned_date, due_date,
-                                      is_complete, user)
+                                      flag_to_int(is_complete),
+                                      user_exist[0])
                             )
 
                         except sqlite3.IntegrityError as e:
@@ -494,12 +1192,11 @@ class TaskRepository:
                             return None
 
                     except ValueError:
-                        print(f"{line.strip()} skipped due to "
+                        print(f"{','.join(task)} skipped due to "
                               f"incorrect format.")
                         continue
 
                 db.commit()
-                db.close()
                 print("Tasks Imported.")
 
         except FileNotFoundError:
@@ -509,49 +1206,347 @@ class TaskRepository:
             print(f"Error: No permission to read {TASKS_FILE}.")
         except UnicodeDecodeError:
             print(f"Error: Could not decode {TASKS_FILE} (encoding issue).")
+        except csv.Error as e:
+            db.rollback()
+            print(f"Error: Could not read {TASKS_FILE}: {e}")
         except sqlite3.OperationalError as e:
+            db.rollback()
             print(f"Database operational error: {e}")
         except sqlite3.DatabaseError as e:
+            db.rollback()
+            print(f"Database error: {e}")
+
+    def bulk_import_tasks(self, chunk_size=BULK_CHUNK_SIZE,
+                          file_path=TASKS_FILE, workers=1,
+                          dialect=CSV_DIALECT):
+        """
+        Function: bulk_import_tasks
+
+        High throughput version of import_tasks for large files. Valid
+        usernames are loaded once, the file is split into rows by the csv
+        reader, rows are validated in chunks and each chunk is inserted
+        with a single executemany and committed as one transaction. Skipped
+        rows are reported as a summary at the end instead of one message
+        per row. Available to admins only.
+        With more than one worker, chunks are validated in a process pool
+        (see import_pipeline.py) while this process writes them in file
+        order, giving the same result as a sequential import.
+
+        Input:
+        - chunk_size: (int) number of rows handled per transaction.
+        - file_path: (Path) file to import, 'tasks.txt' by default.
+        - workers: (int) number of processes validating rows.
+        - dialect: (str or csv.Dialect) CSV dialect of the file.
+
+        Output:
+        - summary: (dict) with keys:
+            - "added": (int) number of new tasks added
+            - "existing": (int) number of tasks skipped as they already exist
+            - "skipped": (Counter) number of invalid rows for each reason
+            - "seconds": (float) time taken
+            - "rows_per_second": (float) lines processed per second
+        - None: occurs if the file can't be read or a sqlite3 error happens
+        """
+        db = self.connections.get_connection()
+        cursor = db.cursor()
+        start = time.perf_counter()
+        added = 0
+        existing = 0
+        skipped = Counter()
+
+        try:
+            with open(file_path, "r", encoding="utf-8",
+                      newline="") as file:
+                cursor.execute("SELECT username, id FROM user")
+                usernames = dict(cursor.fetchall())
+
+                chunks = read_chunks(
+                    read_records(file, TASK_FILE_FIELDS, dialect),
+                    chunk_size)
+                if workers > 1:
+                    results = parallel_parse(parse_task_rows, chunks,
+                                             workers, (usernames,))
+                else:
+                    results = (parse_task_rows(records, usernames)
+                               for records in chunks)
+
+                for rows, chunk_skipped in results:
+                    skipped.update(chunk_skipped)
+
+                    cursor.executemany(
+                        f"""
+                        INSERT INTO tasks(id, title, description,
+                        assignedDate, dueDate, isComplete, userId,
+                        updatedAt)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, {CHANGE_CLOCK})
+                        ON CONFLICT(id) DO NOTHING
+                        """, rows
+                    )
+                    db.commit()
+                    added += cursor.rowcount
+                    existing += len(rows) - cursor.rowcount
+
+        except FileNotFoundError:
+            print(f"File '{file_path}' not found. Please create file or "
+                  "export tasks first.")
+            return None
+        except PermissionError:
+            print(f"Error: No permission to read {file_path}.")
+            return None
+        except UnicodeDecodeError:
+            db.rollback()
+            print(f"Error: Could not decode {file_path} (encoding issue).")
+            return None
+        except csv.Error as e:
+            db.rollback()
+            print(f"Error: Could not read {file_path}: {e}")
+            return None
+        except sqlite3.DatabaseError as e:
+            db.rollback()
             print(f"Database error: {e}")
+            return None
 
-    def export_tasks(self):
+        summary = import_summary(added, existing, skipped, start)
+        print_import_summary(summary, "Tasks")
+        return summary
+
+    def export_tasks(self, file_path=TASKS_FILE, dialect=CSV_DIALECT):
         """
         Function: export_tasks
 
         Exports all tasks from the database to a 'tasks.txt' file. Available to
         admin users only.
+        Rows are streamed from the database in batches into a buffered file,
+        so memory use doesn't grow with the number of tasks. The export runs
+        in a single read transaction so it sees a consistent snapshot while
+        other processes keep writing. The file is CSV with a
+        TASK_FILE_FIELDS header row, written under a temporary name and
+        renamed over file_path only once the export has succeeded.
+
+        Input:
+        - file_path: (Path) file to export to, 'tasks.txt' by default.
+        - dialect: (str or csv.Dialect) CSV dialect to write.
+
+        Output:
+        - count: (int) number of tasks exported.
+        - None: occurs if the file can't be written or a sqlite3 error happens
         """
-        db = sqlite3.connect("taskManager.db")
+        db = self.connections.get_connection()
         cursor = db.cursor()
-        cursor.execute(
-            '''
-            SELECT * FROM tasks
-            '''
-        )
-        tasks = cursor.fetchall()
+        partial = export_partial_path(file_path)
+        count = 0
 
         try:
-            with open(TASKS_FILE, "w", encoding="utf-8") as file:
-                for task in tasks:
-                    (task_id, title, description, assigned_date, due_date,
-                     is_complete, user) = task
+            with open(partial, "w", encoding="utf-8", newline="",
+                      buffering=EXPORT_BUFFER_SIZE) as file:
+                writer = csv.writer(file, dialect)
+                writer.writerow(TASK_FILE_FIELDS)
+                cursor.execute("BEGIN")
+                cursor.execute(
+                    f'''
+                    SELECT {TASK_COLUMNS} FROM {TASK_TABLES}
+                    '''
+                )
+                while True:
+                    tasks = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                    if not tasks:
+                        break
+
+                    writer.writerows(tasks)
+                    count += len(tasks)
 
-                    line = (f"{task_id},{title},{description},{assigned_date},"
-                            f"{due_date},{is_complete},{user}")
-
-                    file.write(line+"\n")
+            db.commit()
+            os.replace(partial, file_path)
             print(f"All tasks exported successfully. Total: "
-                  f"{len(tasks)} tasks.")
+                  f"{count} tasks.")
+            return count
+        except FileNotFoundError:
+            print(f"Error: File not found {file_path}")
+        except PermissionError:
+            print(f"Error: No permission to write {file_path}")
+        except csv.Error as e:
+            print(f"Error: Could not write {file_path}: {e}")
+        except sqlite3.OperationalError as e:
+            print(f"Database operational error: {e}")
+        except sqlite3.DatabaseError as e:
+            print(f"Database error: {e}")
+        finally:
+            # End the read transaction if the export failed part way, and
+            # leave any previous export in place
+            if db.in_transaction:
+                db.rollback()
+            partial.unlink(missing_ok=True)
+        return None
+
+    def export_task_changes(self, file_path=TASK_CHANGES_FILE, since=None,
+                            dialect=CSV_DIALECT):
+        """
+        Function: export_task_changes
+
+        Delta version of export_tasks. Writes only the tasks added or
+        changed since the last successful export to the same file, and a
+        tombstone for each task deleted since then, so the cost depends on
+        the number of changes rather than the number of tasks. Available to
+        admins only.
+        Changes are found through tasks.updatedAt and task_tombstones (see
+        migrations.py), read in a single transaction. The watermark, the
+        highest change time that transaction could see, is stored in
+        export_watermarks once the file has been written, so a failed
+        export is simply repeated by the next one.
+
+        Input:
+        - file_path: (Path) file to export to, 'task_changes.txt' by
+          default. Each file keeps its own watermark.
+        - since: (int) export the changes after this change time instead of
+          the stored watermark. -1 exports every task.
+        - dialect: (str or csv.Dialect) CSV dialect to write.
+
+        Output:
+        - summary: (dict) with keys:
+            - "changed": (int) number of added or changed tasks written
+            - "deleted": (int) number of tombstones written
+            - "watermark": (int) change time the next export starts after
+        - None: occurs if the file can't be written or a sqlite3 error happens
+        """
+        db = self.connections.get_connection()
+        cursor = db.cursor()
+        name = str(file_path)
+        partial = export_partial_path(file_path)
+        changed = 0
+        deleted = 0
+
+        try:
+            with open(partial, "w", encoding="utf-8", newline="",
+                      buffering=EXPORT_BUFFER_SIZE) as file:
+                writer = csv.writer(file, dialect)
+                writer.writerow(TASK_CHANGE_FIELDS)
+                cursor.execute("BEGIN")
+                if since is None:
+                    cursor.execute(
+                        """
+                        SELECT watermark FROM export_watermarks
+                        WHERE name = ?
+                        """, (name,)
+                    )
+                    row = cursor.fetchone()
+                    since = row[0] if row else -1
+
+                cursor.execute(
+                    """
+                    SELECT MAX(?,
+                        (SELECT IFNULL(MAX(updatedAt), 0) FROM tasks),
+                        (SELECT IFNULL(MAX(deletedAt), 0)
+                         FROM task_tombstones))
+                    """, (since,)
+                )
+                watermark = cursor.fetchone()[0]
+
+                cursor.execute(
+                    f"""
+                    SELECT {TASK_COLUMNS}, tasks.updatedAt, 'No'
+                    FROM {TASK_TABLES}
+                    WHERE tasks.updatedAt > ?
+                    ORDER BY tasks.updatedAt
+                    """, (since,)
+                )
+                while True:
+                    tasks = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                    if not tasks:
+                        break
+
+                    writer.writerows(tasks)
+                    changed += len(tasks)
+
+                cursor.execute(
+                    """
+                    SELECT taskId, NULL, NULL, NULL, NULL, NULL, NULL,
+                           deletedAt, 'Yes'
+                    FROM task_tombstones
+                    WHERE deletedAt > ?
+                    ORDER BY deletedAt
+                    """, (since,)
+                )
+                while True:
+                    tombstones = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                    if not tombstones:
+                        break
+
+                    writer.writerows(tombstones)
+                    deleted += len(tombstones)
+
+                db.commit()
+
+            os.replace(partial, file_path)
+            cursor.execute(
+                """
+                INSERT INTO export_watermarks(name, watermark)
+                VALUES(?, ?)
+                ON CONFLICT(name) DO UPDATE SET watermark = excluded.watermark
+                """, (name, watermark)
+            )
+            db.commit()
+            print(f"Task changes exported successfully. Changed: "
+                  f"{changed}, deleted: {deleted}.")
+            return {"changed": changed, "deleted": deleted,
+                    "watermark": watermark}
         except FileNotFoundError:
-            print(f"Error: File not found {TASKS_FILE}")
+            print(f"Error: File not found {file_path}")
         except PermissionError:
-            print(f"Error: No permission to write {TASKS_FILE}")
+            print(f"Error: No permission to write {file_path}")
+        except csv.Error as e:
+            print(f"Error: Could not write {file_path}: {e}")
         except sqlite3.OperationalError as e:
             print(f"Database operational error: {e}")
         except sqlite3.DatabaseError as e:
             print(f"Database error: {e}")
         finally:
-            db.close()
+            if db.in_transaction:
+                db.rollback()
+            partial.unlink(missing_ok=True)
+        return None
+
+
+def import_summary(added, existing, skipped, start):
+    """
+    Function: import_summary
+
+    Builds the summary returned by a bulk import.
+
+    Input:
+    - added: (int) number of rows added.
+    - existing: (int) number of rows that already existed.
+    - skipped: (Counter) number of invalid lines for each reason.
+    - start: (float) time.perf_counter() when the import started.
+    """
+    seconds = time.perf_counter() - start
+    total = added + existing + sum(skipped.values())
+    return {
+        "added": added,
+        "existing": existing,
+        "skipped": skipped,
+        "seconds": seconds,
+        "rows_per_second": total / seconds if seconds else 0.0,
+    }
+
+
+def print_import_summary(summary, label):
+    """
+    Function: print_import_summary
+
+    Prints the summary returned by a bulk import. label is "Tasks" or
+    "Users".
+    """
+    print(f"{label} Imported. Added: {summary['added']}, already existed: "
+          f"{summary['existing']}.")
+
+    skipped = summary["skipped"]
+    if skipped:
+        print(f"Skipped {sum(skipped.values())} lines:")
+        for reason, count in sorted(skipped.items()):
+            print(f"- {reason}: {count}")
+
+    print(f"Took {summary['seconds']:.2f}s "
+          f"({summary['rows_per_second']:,.0f} rows/sec).")
 
 
 class UserRepository:
@@ -560,37 +1555,35 @@ class UserRepository:
 
     Handles database CRUD operations for users
     """
-    def __init__(self):
+    def __init__(self, connections=None):
         """
         Initialise the User Repository
 
         Ensures the 'user' table exists in the database by calling
         the _create_table() method when a new UserRepository is created.
+
+        Input:
+        - connections: (ConnectionManager) Optional manager to get database
+          connections from. The shared default manager is used if not given.
         """
+        self.connections = connections or default_manager
         self._create_table()
 
     def _create_table(self):
         """
-        Creates the user table, if it does not exist, when called by
-        the __init__ function. It then adds 'admin' user to the database so the
-        system can be accessed.
+        Creates or upgrades the database schema, including the user table,
+        when called by the __init__ function. It then adds 'admin' user to the
+        database so the system can be accessed.
         """
         try:
-            # Create database called tasks
-            db = sqlite3.connect("taskManager.db")
+            # Get the shared connection for this thread
+            db = self.connections.get_connection()
 
             # Create a cursor object
             cursor = db.cursor()
 
-            # Check for table called users and create if it does not exist
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS
-                user(id INTEGER PRIMARY KEY, username TEXT UNIQUE,
-                password TEXT,
-                email TEXT, isAdmin TEXT DEFAULT "No")
-                """
-            )
+            # Apply any schema migrations the database hasn't had yet
+            migrate(db)
 
             # Check count of users and if 0 add admin user
             cursor.execute(
@@ -607,7 +1600,7 @@ class UserRepository:
                 username = "admin"
                 password = "admin"
                 email = "test@test.com"
-                is_admin = "Yes"
+                is_admin = 1
 
                 try:
                     cursor.execute(
@@ -634,9 +1627,6 @@ class UserRepository:
         except sqlite3.Error as e:
             db.rollback()
             print(f"Error creating table: {e}")
-        finally:
-            # Close the db connection
-            db.close()
 
     # User functions
     def login(self, username, password):
@@ -653,20 +1643,21 @@ class UserRepository:
 
         Output:
         - role: (str) Returns the users role on successful login,
-          which determines menu options.
+          which determines menu options, together with the username of the
+          logged in user.
+        - None: occurs if the username or password is wrong.
         """
-        db = sqlite3.connect("taskManager.db")
+        db = self.connections.get_connection()
         cursor = db.cursor()
         cursor.execute(
-            '''
-            SELECT *
+            f'''
+            SELECT {USER_COLUMNS}
             FROM user
             WHERE username = ?
             ''', (username,)
         )
 
         user = cursor.fetchone()
-        db.close()
 
         if user is None:
             return None
@@ -681,7 +1672,7 @@ class UserRepository:
         else:
             print("Incorrect password.")
             return None
-        return role, stored_password
+        return role, user[1]
 
     def view_all_users(self):
         """
@@ -693,16 +1684,15 @@ class UserRepository:
         Output:
         - users: returns all active users.
         """
-        db = sqlite3.connect("taskManager.db")
+        db = self.connections.get_connection()
         cursor = db.cursor()
         cursor.execute(
-            '''
-            SELECT *
+            f'''
+            SELECT {USER_COLUMNS}
             FROM user
             '''
         )
         users = cursor.fetchall()
-        db.close()
 
         if not users:
             return []
@@ -726,7 +1716,7 @@ class UserRepository:
           user table.
         """
         try:
-            db = sqlite3.connect("taskManager.db")
+            db = self.connections.get_connection()
             cursor = db.cursor()
             cursor.execute(
                 '''
@@ -748,8 +1738,6 @@ class UserRepository:
             db.rollback()
             print(f"Database error: {e}")
             return None
-        finally:
-            db.close()
 
     def validate_username(self, prompt):
         """
@@ -767,17 +1755,16 @@ class UserRepository:
         """
         while True:
             username = input(prompt)
-            db = sqlite3.connect("taskManager.db")
+            db = self.connections.get_connection()
             cursor = db.cursor()
             cursor.execute(
-                '''
-                SELECT *
+                f'''
+                SELECT {USER_COLUMNS}
                 FROM user
                 WHERE username = ?
                 ''', (username,)
             )
             user = cursor.fetchone()
-            db.close()
             if user:
                 print("Username already exists. Please choose again")
                 continue
@@ -798,17 +1785,16 @@ class UserRepository:
         - username: (str) The existing username if found.
         - None: If the username does not exist.
         """
-        db = sqlite3.connect("taskManager.db")
+        db = self.connections.get_connection()
         cursor = db.cursor()
         cursor.execute(
-            '''
-            SELECT *
+            f'''
+            SELECT {USER_COLUMNS}
             FROM user
             WHERE username = ?
             ''', (username,)
         )
         user = cursor.fetchone()
-        db.close()
         if not user:
             return None
 
@@ -832,17 +1818,16 @@ class UserRepository:
             -   "admin": (str) Yes or No depeing on if user is an admin or not
         - None: If no user is found with the entered ID.
         """
-        db = sqlite3.connect("taskManager.db")
+        db = self.connections.get_connection()
         cursor = db.cursor()
         cursor.execute(
-            '''
-            SELECT *
+            f'''
+            SELECT {USER_COLUMNS}
             FROM user
             WHERE id = ?
             ''', (user_id,)
         )
         user = cursor.fetchone()
-        db.close()
 
         if user is None:
             return None
@@ -855,7 +1840,8 @@ class UserRepository:
 
         This function updates the details of an existing user in the database.
         Users can choose what they need to update. If a field  doesn't need
-        updating the existing data is retained.
+        updating the existing data is retained. Tasks refer to users by ID,
+        so a renamed user keeps their tasks.
         Available to admins only.
 
         Input:
@@ -868,7 +1854,7 @@ class UserRepository:
         - cursor.rowcount: If > 0 update was completed else it failed.
         """
         try:
-            db = sqlite3.connect("taskManager.db")
+            db = self.connections.get_connection()
             cursor = db.cursor()
             cursor.execute(
                 '''
@@ -891,8 +1877,6 @@ class UserRepository:
             db.rollback()
             print(f"Database error: {e}")
             return None
-        finally:
-            db.close()
 
     def make_admin(self, user_id):
         """
@@ -908,8 +1892,8 @@ class UserRepository:
         - cursor.rowcount: If > 0 update was completed else it failed.
         """
         try:
-            is_admin = "Yes"
-            db = sqlite3.connect("taskManager.db")
+            is_admin = 1
+            db = self.connections.get_connection()
             cursor = db.cursor()
             cursor.execute(
                 '''
@@ -932,14 +1916,14 @@ class UserRepository:
             db.rollback()
             print(f"Database error: {e}")
             return None
-        finally:
-            db.close()
 
     def delete_user(self, user_id):
         """
         Function: delete_user
 
         This function deletes a user from the database by their ID.
+        The foreign key on tasks.userId unassigns the user's tasks as part
+        of the same statement.
         Available to admins only.
 
         Input:
@@ -950,7 +1934,7 @@ class UserRepository:
           the deletion failed.
         """
         try:
-            db = sqlite3.connect("taskManager.db")
+            db = self.connections.get_connection()
             cursor = db.cursor()
             cursor.execute(
                 '''
@@ -972,10 +1956,8 @@ class UserRepository:
             db.rollback()
             print(f"Database error: {e}")
             return None
-        finally:
-            db.close()
 
-    def import_users(self):
+    def import_users(self, dialect=CSV_DIALECT):
         """
         Function: import_users
 
@@ -986,32 +1968,33 @@ class UserRepository:
         Any updates are skipped as well as updates handled in separate
         function.
         Available to admins only.
+        The file is read as CSV, see read_records.
+
+        Input:
+        - dialect: (str or csv.Dialect) CSV dialect of the file.
         """
-        db = sqlite3.connect("taskManager.db")
+        db = self.connections.get_connection()
         cursor = db.cursor()
 
         try:
-            with open(USERS_FILE, "r", encoding="utf-8") as file:
+            with open(USERS_FILE, "r", encoding="utf-8",
+                      newline="") as file:
                 print("New users will be added to the system.")
                 print("Please note, option '14. Update users' "
                       "to update existing users\n")
-                for line in file:
-                    if not line.strip():
+                for user in read_records(file, USER_FILE_FIELDS, dialect):
+                    if not user:
                         continue
 
                     try:
-                        user = line.strip().split(",")
-
                         if len(user) != 5:
-                            print(f"{line.strip()} skipped due to"
+                            print(f"{','.join(user)} skipped due to"
                                   f" incorrect format.")
                             continue
 
-                        user_id = int(user[0].strip())
-                        username = user[1].strip()
-                        password = user[2].strip()
-                        email = user[3].strip()
-                        is_admin = user[4].strip().capitalize()
+                        user_id = int(user[0])
+                        username, password, email, is_admin = user[1:]
+                        is_admin = is_admin.capitalize()
 
                         # Validate email address, skip line where not valid
                         if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
@@ -1058,7 +2041,7 @@ class UserRepository:
                                 VALUES (?, ?, ?, ?, ?)
                                 ON CONFLICT(id) DO NOTHING
                                 """, (user_id, username, password, email,
-                                      is_admin)
+                                      flag_to_int(is_admin))
                             )
 
                         except sqlite3.IntegrityError as e:
@@ -1075,11 +2058,10 @@ class UserRepository:
                             return None
 
                     except ValueError:
-                        print(f"{line.strip()} skipped. Invalid ID format")
+                        print(f"{','.join(user)} skipped. Invalid ID format")
                         continue
 
                 db.commit()
-                db.close()
                 print("Users Imported.")
 
         except FileNotFoundError:
@@ -1089,46 +2071,338 @@ class UserRepository:
             print(f"Error: No permission to read {USERS_FILE}.")
         except UnicodeDecodeError:
             print("Error: Could not decode 'users.txt' (encoding issue).")
+        except csv.Error as e:
+            db.rollback()
+            print(f"Error: Could not read {USERS_FILE}: {e}")
         except sqlite3.OperationalError as e:
+            db.rollback()
             print(f"Database operational error: {e}")
         except sqlite3.DatabaseError as e:
+            db.rollback()
+            print(f"Database error: {e}")
+
+    def bulk_import_users(self, chunk_size=BULK_CHUNK_SIZE,
+                          file_path=USERS_FILE, workers=1,
+                          dialect=CSV_DIALECT):
+        """
+        Function: bulk_import_users
+
+        High throughput version of import_users for large files, working
+        the same way as TaskRepository.bulk_import_tasks. Rows are
+        validated in chunks, in a process pool when workers is more than
+        one. ID and username conflicts are then checked here against the
+        existing users, which are loaded once, and each chunk is inserted
+        with a single executemany. Available to admins only.
+
+        Input:
+        - chunk_size: (int) number of rows handled per transaction.
+        - file_path: (Path) file to import, 'users.txt' by default.
+        - workers: (int) number of processes validating rows.
+        - dialect: (str or csv.Dialect) CSV dialect of the file.
+
+        Output:
+        - summary: (dict) see TaskRepository.bulk_import_tasks.
+        - None: occurs if the file can't be read or a sqlite3 error happens
+        """
+        db = self.connections.get_connection()
+        cursor = db.cursor()
+        start = time.perf_counter()
+        added = 0
+        existing = 0
+        skipped = Counter()
+
+        try:
+            with open(file_path, "r", encoding="utf-8",
+                      newline="") as file:
+                cursor.execute("SELECT id, username FROM user")
+                ids = dict(cursor.fetchall())
+                usernames = {username: user_id
+                             for user_id, username in ids.items()}
+
+                chunks = read_chunks(
+                    read_records(file, USER_FILE_FIELDS, dialect),
+                    chunk_size)
+                if workers > 1:
+                    results = parallel_parse(parse_user_rows, chunks,
+                                             workers)
+                else:
+                    results = (parse_user_rows(records)
+                               for records in chunks)
+
+                for rows, chunk_skipped in results:
+                    skipped.update(chunk_skipped)
+
+                    # Same conflict rules as import_users, including users
+                    # added earlier in this import
+                    new_rows = []
+                    for row in rows:
+                        user_id, username = row[0], row[1]
+                        if user_id in ids and ids[user_id] != username:
+                            skipped[SKIP_ID_IN_USE] += 1
+                        elif (username in usernames
+                              and usernames[username] != user_id):
+                            skipped[SKIP_USERNAME_IN_USE] += 1
+                        elif user_id in ids:
+                            existing += 1
+                        else:
+                            ids[user_id] = username
+                            usernames[username] = user_id
+                            new_rows.append(row)
+
+                    cursor.executemany(
+                        """
+                        INSERT INTO user(id, username, password, email,
+                        isAdmin)
+                        VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT(id) DO NOTHING
+                        """, new_rows
+                    )
+                    db.commit()
+                    added += cursor.rowcount
+
+        except FileNotFoundError:
+            print(f"File '{file_path}' not found. Please create file or "
+                  "export users first.")
+            return None
+        except PermissionError:
+            print(f"Error: No permission to read {file_path}.")
+            return None
+        except UnicodeDecodeError:
+            db.rollback()
+            print(f"Error: Could not decode {file_path} (encoding issue).")
+            return None
+        except csv.Error as e:
+            db.rollback()
+            print(f"Error: Could not read {file_path}: {e}")
+            return None
+        except sqlite3.DatabaseError as e:
+            db.rollback()
             print(f"Database error: {e}")
+            return None
 
-    def export_users(self):
+        summary = import_summary(added, existing, skipped, start)
+        print_import_summary(summary, "Users")
+        return summary
+
+    def export_users(self, file_path=USERS_FILE, dialect=CSV_DIALECT):
         """
         Function: export_users
 
         This function exports all user records from the database into a
         'users.txt' file.
         Available to admins only.
+        Like export_tasks, rows are streamed in batches into a buffered CSV
+        file, with a USER_FILE_FIELDS header row, inside a single read
+        transaction.
+
+        Input:
+        - file_path: (Path) file to export to, 'users.txt' by default.
+        - dialect: (str or csv.Dialect) CSV dialect to write.
+
+        Output:
+        - count: (int) number of users exported.
+        - None: occurs if the file can't be written or a sqlite3 error happens
         """
-        db = sqlite3.connect("taskManager.db")
+        db = self.connections.get_connection()
         cursor = db.cursor()
-        cursor.execute(
-            '''
-            SELECT * FROM user
-            '''
-        )
-        users = cursor.fetchall()
+        partial = export_partial_path(file_path)
+        count = 0
 
         try:
-            with open(USERS_FILE, "w", encoding="utf-8") as file:
-                for user in users:
-                    user_id, username, password, email, is_admin = user
-
-                    line = (f"{user_id},{username},{password},{email},"
-                            f"{is_admin}")
-
-                    file.write(line+"\n")
+            with open(partial, "w", encoding="utf-8", newline="",
+                      buffering=EXPORT_BUFFER_SIZE) as file:
+                writer = csv.writer(file, dialect)
+                writer.writerow(USER_FILE_FIELDS)
+                cursor.execute("BEGIN")
+                cursor.execute(
+                    f'''
+                    SELECT {USER_COLUMNS} FROM user
+                    '''
+                )
+                while True:
+                    users = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                    if not users:
+                        break
+
+                    writer.writerows(users)
+                    count += len(users)
 
-            db.close()
+            db.commit()
+            os.replace(partial, file_path)
             print(f"All users exported successfully. Total: "
-                  f"{len(users)} users.")
+                  f"{count} users.")
+            return count
         except FileNotFoundError:
-            print("Error: File 'users.txt' not found")
+            print(f"Error: File not found {file_path}")
         except PermissionError:
-            print(f"Error: No permission to write {USERS_FILE}")
+            print(f"Error: No permission to write {file_path}")
+        except csv.Error as e:
+            print(f"Error: Could not write {file_path}: {e}")
         except sqlite3.OperationalError as e:
             print(f"Database operational error: {e}")
         except sqlite3.DatabaseError as e:
             print(f"Database error: {e}")
+        finally:
+            # End the read transaction if the export failed part way, and
+            # leave any previous export in place
+            if db.in_transaction:
+                db.rollback()
+            partial.unlink(missing_ok=True)
+        return None
+
+
+class ChangeLogRepository:
+    """
+    Data access layer for the change log.
+
+    Reads the trigger maintained change_log table (see migrations.py) and
+    stores consumer checkpoints.
+    """
+    def __init__(self, connections=None):
+        """
+        Initialise the Change Log Repository
+
+        Input:
+        - connections: (ConnectionManager) Optional manager to get database
+          connections from. The shared default manager is used if not given.
+        """
+        self.connections = connections or default_manager
+        self._create_table()
+
+    def _create_table(self):
+        """
+        Creates or upgrades the database schema, including the change_log
+        table, when called by the __init__ function. See migrations.py.
+        """
+        try:
+            migrate(self.connections.get_connection())
+        except sqlite3.Error as e:
+            print(f"Error creating table: {e}")
+
+    def changes_since(self, sequence=0, limit=CHANGE_BATCH_SIZE):
+        """
+        Function: changes_since
+
+        Returns the changes logged after a sequence number, oldest first.
+        Seeks straight to the sequence, so the cost depends on the number
+        of changes returned, not the size of the log.
+
+        Input:
+        - sequence: (int) sequence number of the last change already read,
+          0 to start from the beginning.
+        - limit: (int) maximum number of changes to return.
+
+        Output:
+        - changes: list of (sequence, table, row ID, operation, changed at,
+          JSON data) rows.
+        """
+        db = self.connections.get_connection()
+        cursor = db.cursor()
+        cursor.execute(
+            """
+            SELECT sequence, tableName, rowId, operation, changedAt, data
+            FROM change_log
+            WHERE sequence > ?
+            ORDER BY sequence
+            LIMIT ?
+            """, (sequence, limit)
+        )
+        return cursor.fetchall()
+
+    def latest_sequence(self):
+        """
+        Function: latest_sequence
+
+        Returns the sequence number of the newest change, 0 if none were
+        ever logged. Consumers that only want new changes start from here.
+        """
+        db = self.connections.get_connection()
+        cursor = db.cursor()
+        cursor.execute(
+            """
+            SELECT IFNULL((SELECT seq FROM sqlite_sequence
+                           WHERE name = 'change_log'), 0)
+            """
+        )
+        return cursor.fetchone()[0]
+
+    def get_checkpoint(self, consumer):
+        """
+        Function: get_checkpoint
+
+        Returns the sequence number a consumer last saved, 0 if it has
+        never saved one.
+
+        Input:
+        - consumer: (str) name of the consumer.
+        """
+        db = self.connections.get_connection()
+        cursor = db.cursor()
+        cursor.execute(
+            """
+            SELECT sequence FROM change_checkpoints
+            WHERE consumer = ?
+            """, (consumer,)
+        )
+        row = cursor.fetchone()
+        return row[0] if row else 0
+
+    def save_checkpoint(self, consumer, sequence):
+        """
+        Function: save_checkpoint
+
+        Durably records that a consumer has handled every change up to and
+        including sequence.
+
+        Input:
+        - consumer: (str) name of the consumer.
+        - sequence: (int) sequence number of the last change handled.
+
+        Output:
+        - True: the checkpoint was saved.
+        - None: occurs if there is a sqlite3 error
+        """
+        try:
+            db = self.connections.get_connection()
+            cursor = db.cursor()
+            cursor.execute(
+                """
+                INSERT INTO change_checkpoints(consumer, sequence)
+                VALUES(?, ?)
+                ON CONFLICT(consumer) DO UPDATE SET sequence = excluded.sequence
+                """, (consumer, sequence)
+            )
+            db.commit()
+            return True
+        except sqlite3.DatabaseError as e:
+            db.rollback()
+            print(f"Database error: {e}")
+            return None
+
+    def prune_changes(self):
+        """
+        Function: prune_changes
+
+        Deletes the changes every consumer with a checkpoint has already
+        handled. Nothing is deleted while there are no checkpoints.
+
+        Output:
+        - count: (int) number of changes deleted.
+        - None: occurs if there is a sqlite3 error
+        """
+        try:
+            db = self.connections.get_connection()
+            cursor = db.cursor()
+            cursor.execute(
+                """
+                DELETE FROM change_log
+                WHERE sequence <= (SELECT MIN(sequence)
+                                   FROM change_checkpoints)
+                """
+            )
+            db.commit()
+            return cursor.rowcount
+        except sqlite3.DatabaseError as e:
+            db.rollback()
+            print(f"Database error: {e}")
+            return None
@@ -0,0 +1,63 @@
+"""
+Multi-core parse and validate pipeline for the bulk imports.
+
+Chunks of rows read from an import file are parsed and validated by a pool
+of worker processes. Results come back in file order to a single writer in
+the calling process, so the database ends up exactly as a sequential
+import would leave it.
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Used when no worker count is given
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# Extra arguments passed to the parse function in each worker process.
+# Set once per worker by _init_worker so large values such as the set of
+# valid usernames are not sent with every chunk.
+_worker_args = ()
+
+
+def _init_worker(args):
+    """Stores the extra parse arguments in a newly started worker."""
+    global _worker_args
+    _worker_args = args
+
+
+def _parse_chunk(parse_lines, lines):
+    """Parses one chunk of lines inside a worker process."""
+    return parse_lines(lines, *_worker_args)
+
+
+def parallel_parse(parse_lines, chunks, workers=DEFAULT_WORKERS, args=()):
+    """
+    Function: parallel_parse
+
+    Runs parse_lines over each chunk of lines in a process pool and yields
+    the results in the same order as the chunks. Only a few chunks per
+    worker are in flight at a time so memory stays bounded however large
+    the file is.
+
+    Input:
+    - parse_lines: (function) module level function called as
+      parse_lines(lines, *args). It must be picklable.
+    - chunks: (iterable) lists of lines to parse.
+    - workers: (int) number of worker processes.
+    - args: (tuple) extra arguments for parse_lines, sent once per worker.
+
+    Output:
+    - generator of parse_lines results, in chunk order.
+    """
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(args,)) as executor:
+        pending = deque()
+        for lines in chunks:
+            pending.append(executor.submit(_parse_chunk, parse_lines, lines))
+
+            # Keep the workers busy without reading the whole file ahead
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
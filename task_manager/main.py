@@ -4,9 +4,23 @@ Entry point for Task Manager application.
 Initialises the system and starts the user interface.
 
 Enter "python -m task_manager.main" into console to run application.
+Add "--output json" (or csv, table, details) to choose how listings are
+displayed, and "--database" to use a database other than the default.
 """
+import argparse
+from task_manager.connection import (DATABASE_ENV, ConnectionManager,
+                                     configured_database)
+from task_manager.rendering import DEFAULT_OUTPUT, OUTPUT_MODES
 from task_manager.user_interface import start_application
 
 
 if __name__ == "__main__":
-    start_application()
+    parser = argparse.ArgumentParser(description="Task Manager")
+    parser.add_argument("--output", choices=OUTPUT_MODES,
+                        default=DEFAULT_OUTPUT,
+                        help="how task and user listings are displayed")
+    parser.add_argument("--database", default=configured_database(),
+                        help=f"sqlite database file or 'file:' URI, "
+                             f"defaults to ${DATABASE_ENV}")
+    args = parser.parse_args()
+    start_application(args.output, ConnectionManager(args.database))
@@ -0,0 +1,541 @@
+"""
+Schema migrations for Task Manager.
+
+The schema version of a database is stored in 'PRAGMA user_version'. Each
+entry in MIGRATIONS upgrades the schema by one version, so existing
+'taskManager.db' files are upgraded in place the next time the app starts.
+"""
+import sqlite3
+
+# Value stored in tasks.updatedAt and task_tombstones.deletedAt: the current
+# time in milliseconds since the epoch, but always above every value already
+# stored. Writers take the write lock before working it out, so a change
+# committed after an export read the tables always gets a higher value than
+# anything that export saw, even if it started earlier or the clock went
+# back. Bulk writes can run a little ahead of the real time as a result.
+CHANGE_CLOCK = """
+    MAX(CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER),
+        (SELECT IFNULL(MAX(updatedAt), 0) + 1 FROM tasks),
+        (SELECT IFNULL(MAX(deletedAt), 0) + 1 FROM task_tombstones))
+"""
+
+
+def _base_schema(cursor):
+    """
+    Version 1: the original text based tables and the listing indexes.
+
+    Uses IF NOT EXISTS so databases created before migrations were added
+    are adopted as they are.
+    """
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS
+        tasks(id INTEGER PRIMARY KEY, title TEXT, description TEXT,
+        assignedDate TEXT, dueDate TEXT, isComplete TEXt DEFAULT "No",
+        user TEXT)
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS
+        user(id INTEGER PRIMARY KEY, username TEXT UNIQUE,
+        password TEXT,
+        email TEXT, isAdmin TEXT DEFAULT "No")
+        """
+    )
+
+    # Indexes for the hot listing queries so they don't scan the whole
+    # table. idx_tasks_user serves get_my_tasks and idx_tasks_status_due
+    # serves both completed_tasks and overdue_tasks (isComplete first, then
+    # the dueDate range).
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_tasks_user
+        ON tasks(user)
+        """
+    )
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_tasks_status_due
+        ON tasks(isComplete, dueDate)
+        """
+    )
+
+
+def _compact_columns(cursor):
+    """
+    Version 2: store dates and flags as integers.
+
+    Dates become YYYYMMDD integers, which sort and compare the same way as
+    the 'YYYY-MM-DD' text, and 'Yes'/'No' flags become 1/0. SQLite can't
+    change a column type in place, so each table is rebuilt and its rows
+    copied across.
+    """
+    cursor.execute(
+        """
+        CREATE TABLE tasks_new(id INTEGER PRIMARY KEY, title TEXT,
+        description TEXT, assignedDate INTEGER, dueDate INTEGER,
+        isComplete INTEGER NOT NULL DEFAULT 0, user TEXT)
+        """
+    )
+    cursor.execute(
+        """
+        INSERT INTO tasks_new(id, title, description, assignedDate, dueDate,
+        isComplete, user)
+        SELECT id, title, description,
+               CAST(REPLACE(assignedDate, '-', '') AS INTEGER),
+               CAST(REPLACE(dueDate, '-', '') AS INTEGER),
+               CASE WHEN isComplete = 'Yes' THEN 1 ELSE 0 END,
+               user
+        FROM tasks
+        """
+    )
+    cursor.execute("DROP TABLE tasks")
+    cursor.execute("ALTER TABLE tasks_new RENAME TO tasks")
+    cursor.execute("CREATE INDEX idx_tasks_user ON tasks(user)")
+    cursor.execute(
+        "CREATE INDEX idx_tasks_status_due ON tasks(isComplete, dueDate)"
+    )
+
+    cursor.execute(
+        """
+        CREATE TABLE user_new(id INTEGER PRIMARY KEY, username TEXT UNIQUE,
+        password TEXT, email TEXT, isAdmin INTEGER NOT NULL DEFAULT 0)
+        """
+    )
+    cursor.execute(
+        """
+        INSERT INTO user_new(id, username, password, email, isAdmin)
+        SELECT id, username, password, email,
+               CASE WHEN isAdmin = 'Yes' THEN 1 ELSE 0 END
+        FROM user
+        """
+    )
+    cursor.execute("DROP TABLE user")
+    cursor.execute("ALTER TABLE user_new RENAME TO user")
+
+
+def _status_id_index(cursor):
+    """
+    Version 3: index completed/incomplete tasks in ID order.
+
+    Lets the paged completed task listing seek straight to the next page
+    instead of sorting every completed task.
+    """
+    cursor.execute(
+        "CREATE INDEX idx_tasks_status_id ON tasks(isComplete, id)"
+    )
+
+
+def _task_counts(cursor):
+    """
+    Version 4: per user task counters kept up to date by triggers.
+
+    task_counts holds the number of open and completed tasks for each
+    assignee, so workload stats read one row per user instead of counting
+    every task. Users without tasks have no row. Tasks without an assignee
+    are counted under ''.
+    """
+    cursor.execute(
+        """
+        CREATE TABLE task_counts(user TEXT PRIMARY KEY,
+        open INTEGER NOT NULL DEFAULT 0,
+        completed INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID
+        """
+    )
+    cursor.execute(
+        """
+        INSERT INTO task_counts(user, open, completed)
+        SELECT IFNULL(user, ''), SUM(isComplete = 0), SUM(isComplete != 0)
+        FROM tasks
+        GROUP BY IFNULL(user, '')
+        """
+    )
+
+    # Adds a task to its assignee's counts
+    count_new = """
+        INSERT INTO task_counts(user, open, completed)
+        VALUES(IFNULL(NEW.user, ''), NEW.isComplete = 0, NEW.isComplete != 0)
+        ON CONFLICT(user) DO UPDATE
+        SET open = open + excluded.open,
+            completed = completed + excluded.completed;
+    """
+    # Removes a task from its assignee's counts, dropping empty rows
+    uncount_old = """
+        UPDATE task_counts
+        SET open = open - (OLD.isComplete = 0),
+            completed = completed - (OLD.isComplete != 0)
+        WHERE user = IFNULL(OLD.user, '');
+        DELETE FROM task_counts
+        WHERE user = IFNULL(OLD.user, '') AND open = 0 AND completed = 0;
+    """
+    cursor.execute(
+        f"""
+        CREATE TRIGGER task_counts_insert AFTER INSERT ON tasks
+        BEGIN {count_new} END
+        """
+    )
+    cursor.execute(
+        f"""
+        CREATE TRIGGER task_counts_delete AFTER DELETE ON tasks
+        BEGIN {uncount_old} END
+        """
+    )
+    cursor.execute(
+        f"""
+        CREATE TRIGGER task_counts_update AFTER UPDATE OF user, isComplete
+        ON tasks
+        WHEN IFNULL(OLD.user, '') != IFNULL(NEW.user, '')
+        OR (OLD.isComplete = 0) != (NEW.isComplete = 0)
+        BEGIN {uncount_old} {count_new} END
+        """
+    )
+
+
+def _task_search(cursor):
+    """
+    Version 5: full text search over task titles and descriptions.
+
+    tasks_fts is an FTS5 index that reads its text from the tasks table
+    (external content), so the text isn't stored twice. Prefix indexes for
+    2 and 3 characters keep short prefix searches fast. Triggers keep the
+    index in step with the tasks and the existing tasks are indexed with
+    'rebuild'.
+    """
+    cursor.execute(
+        """
+        CREATE VIRTUAL TABLE tasks_fts USING fts5(
+            title, description,
+            content='tasks', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        """
+    )
+    cursor.execute("INSERT INTO tasks_fts(tasks_fts) VALUES('rebuild')")
+
+    add_new = """
+        INSERT INTO tasks_fts(rowid, title, description)
+        VALUES(NEW.id, NEW.title, NEW.description);
+    """
+    # External content indexes are told the old text to remove
+    remove_old = """
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+        VALUES('delete', OLD.id, OLD.title, OLD.description);
+    """
+    cursor.execute(
+        f"""
+        CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks
+        BEGIN {add_new} END
+        """
+    )
+    cursor.execute(
+        f"""
+        CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks
+        BEGIN {remove_old} END
+        """
+    )
+    cursor.execute(
+        f"""
+        CREATE TRIGGER tasks_fts_update AFTER UPDATE OF title, description
+        ON tasks
+        WHEN OLD.title IS NOT NEW.title
+        OR OLD.description IS NOT NEW.description
+        BEGIN {remove_old} {add_new} END
+        """
+    )
+
+
+def _task_user_ids(cursor):
+    """
+    Version 6: tasks reference their assignee by user ID.
+
+    The username text in tasks.user is replaced by userId, a foreign key to
+    user.id, so renaming a user no longer orphans their tasks and usernames
+    are read through a join. Deleting a user leaves their tasks unassigned
+    (ON DELETE SET NULL) in the same statement. Tasks assigned to a
+    username that doesn't exist become unassigned, and keep that username
+    in tasks.legacy_user so nothing is lost in the upgrade. The task
+    counters are rebuilt per user ID, with unassigned tasks counted under 0.
+    """
+    # The counter triggers and the index use tasks.user, which can't be
+    # dropped while anything still refers to it
+    for trigger in ("task_counts_insert", "task_counts_delete",
+                    "task_counts_update"):
+        cursor.execute(f"DROP TRIGGER {trigger}")
+    cursor.execute("DROP TABLE task_counts")
+    cursor.execute("DROP INDEX idx_tasks_user")
+
+    cursor.execute(
+        """
+        ALTER TABLE tasks
+        ADD COLUMN userId INTEGER REFERENCES user(id) ON DELETE SET NULL
+        """
+    )
+    cursor.execute(
+        """
+        UPDATE tasks
+        SET userId = (SELECT id FROM user WHERE username = tasks.user)
+        """
+    )
+    # Only the usernames that couldn't be linked are worth keeping, the rest
+    # are read through the join
+    cursor.execute("ALTER TABLE tasks RENAME COLUMN user TO legacy_user")
+    cursor.execute(
+        "UPDATE tasks SET legacy_user = NULL WHERE userId IS NOT NULL"
+    )
+    # Serves the per user listings and the foreign key checks when a user
+    # is deleted
+    cursor.execute("CREATE INDEX idx_tasks_user_id ON tasks(userId)")
+
+    cursor.execute(
+        """
+        CREATE TABLE task_counts(userId INTEGER PRIMARY KEY,
+        open INTEGER NOT NULL DEFAULT 0,
+        completed INTEGER NOT NULL DEFAULT 0)
+        """
+    )
+    cursor.execute(
+        """
+        INSERT INTO task_counts(userId, open, completed)
+        SELECT IFNULL(userId, 0), SUM(isComplete = 0), SUM(isComplete != 0)
+        FROM tasks
+        GROUP BY IFNULL(userId, 0)
+        """
+    )
+
+    count_new = """
+        INSERT INTO task_counts(userId, open, completed)
+        VALUES(IFNULL(NEW.userId, 0), NEW.isComplete = 0,
+               NEW.isComplete != 0)
+        ON CONFLICT(userId) DO UPDATE
+        SET open = open + excluded.open,
+            completed = completed + excluded.completed;
+    """
+    uncount_old = """
+        UPDATE task_counts
+        SET open = open - (OLD.isComplete = 0),
+            completed = completed - (OLD.isComplete != 0)
+        WHERE userId = IFNULL(OLD.userId, 0);
+        DELETE FROM task_counts
+        WHERE userId = IFNULL(OLD.userId, 0) AND open = 0 AND completed = 0;
+    """
+    cursor.execute(
+        f"""
+        CREATE TRIGGER task_counts_insert AFTER INSERT ON tasks
+        BEGIN {count_new} END
+        """
+    )
+    cursor.execute(
+        f"""
+        CREATE TRIGGER task_counts_delete AFTER DELETE ON tasks
+        BEGIN {uncount_old} END
+        """
+    )
+    cursor.execute(
+        f"""
+        CREATE TRIGGER task_counts_update AFTER UPDATE OF userId, isComplete
+        ON tasks
+        WHEN IFNULL(OLD.userId, 0) != IFNULL(NEW.userId, 0)
+        OR (OLD.isComplete = 0) != (NEW.isComplete = 0)
+        BEGIN {uncount_old} {count_new} END
+        """
+    )
+
+
+def _task_changes(cursor):
+    """
+    Version 7: track when tasks change, for delta exports.
+
+    tasks.updatedAt is set by every write path to CHANGE_CLOCK, and
+    task_tombstones records the tasks deleted and when. Renaming or
+    deleting a user also touches their tasks, as the exported assignee
+    changes. A task added again with the ID of a deleted task drops its
+    tombstone. export_watermarks stores how far each delta export has got.
+    """
+    cursor.execute(
+        "ALTER TABLE tasks ADD COLUMN updatedAt INTEGER NOT NULL DEFAULT 0"
+    )
+    cursor.execute("CREATE INDEX idx_tasks_updated ON tasks(updatedAt)")
+    cursor.execute(
+        """
+        CREATE TABLE task_tombstones(taskId INTEGER PRIMARY KEY,
+        deletedAt INTEGER NOT NULL)
+        """
+    )
+    cursor.execute(
+        "CREATE INDEX idx_tombstones_deleted ON task_tombstones(deletedAt)"
+    )
+    cursor.execute(
+        """
+        CREATE TABLE export_watermarks(name TEXT PRIMARY KEY,
+        watermark INTEGER NOT NULL) WITHOUT ROWID
+        """
+    )
+
+    cursor.execute(
+        f"""
+        CREATE TRIGGER task_tombstones_delete AFTER DELETE ON tasks
+        BEGIN
+            INSERT OR REPLACE INTO task_tombstones(taskId, deletedAt)
+            VALUES(OLD.id, {CHANGE_CLOCK});
+        END
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER task_tombstones_insert AFTER INSERT ON tasks
+        BEGIN
+            DELETE FROM task_tombstones WHERE taskId = NEW.id;
+        END
+        """
+    )
+    cursor.execute(
+        f"""
+        CREATE TRIGGER user_rename_touch_tasks AFTER UPDATE OF username
+        ON user
+        WHEN OLD.username IS NOT NEW.username
+        BEGIN
+            UPDATE tasks SET updatedAt = {CHANGE_CLOCK}
+            WHERE userId = NEW.id;
+        END
+        """
+    )
+    # Runs before the foreign key unassigns the tasks
+    cursor.execute(
+        f"""
+        CREATE TRIGGER user_delete_touch_tasks BEFORE DELETE ON user
+        BEGIN
+            UPDATE tasks SET updatedAt = {CHANGE_CLOCK}
+            WHERE userId = OLD.id;
+        END
+        """
+    )
+
+
+def _change_log(cursor):
+    """
+    Version 8: an append-only log of every change to tasks and users.
+
+    Triggers add one change_log row per inserted, updated or deleted row,
+    holding the row as JSON in the shape the services return it (the row
+    as it was for deletes). Passwords are never logged. AUTOINCREMENT
+    means sequence numbers are never reused, even once old changes are
+    pruned, and as they are handed out under the write lock they follow
+    commit order. change_checkpoints stores how far each consumer has read.
+    """
+    cursor.execute(
+        """
+        CREATE TABLE change_log(sequence INTEGER PRIMARY KEY AUTOINCREMENT,
+        tableName TEXT NOT NULL, rowId INTEGER NOT NULL,
+        operation TEXT NOT NULL, changedAt INTEGER NOT NULL, data TEXT)
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE change_checkpoints(consumer TEXT PRIMARY KEY,
+        sequence INTEGER NOT NULL) WITHOUT ROWID
+        """
+    )
+
+    def task_json(row):
+        return f"""
+            json_object(
+                'task_id', {row}.id, 'title', {row}.title,
+                'description', {row}.description,
+                'assigned_date', printf('%04d-%02d-%02d',
+                    {row}.assignedDate / 10000,
+                    {row}.assignedDate / 100 % 100,
+                    {row}.assignedDate % 100),
+                'due_date', printf('%04d-%02d-%02d', {row}.dueDate / 10000,
+                    {row}.dueDate / 100 % 100, {row}.dueDate % 100),
+                'is_complete',
+                    CASE {row}.isComplete WHEN 1 THEN 'Yes' ELSE 'No' END,
+                'user', (SELECT username FROM user
+                         WHERE id = {row}.userId))
+        """
+
+    def user_json(row):
+        return f"""
+            json_object(
+                'user_id', {row}.id, 'username', {row}.username,
+                'email', {row}.email,
+                'is_admin',
+                    CASE {row}.isAdmin WHEN 1 THEN 'Yes' ELSE 'No' END)
+        """
+
+    now = "CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)"
+    for table, to_json in (("tasks", task_json), ("user", user_json)):
+        for event, row in (("insert", "NEW"), ("update", "NEW"),
+                           ("delete", "OLD")):
+            cursor.execute(
+                f"""
+                CREATE TRIGGER {table}_log_{event} AFTER {event.upper()}
+                ON {table}
+                BEGIN
+                    INSERT INTO change_log(tableName, rowId, operation,
+                    changedAt, data)
+                    VALUES('{table}', {row}.id, '{event}', {now},
+                           {to_json(row)});
+                END
+                """
+            )
+
+
+# Ordered list of migrations. Entry N upgrades the schema to version N + 1.
+# Only ever append to this list, existing migrations must not change.
+MIGRATIONS = [
+    _base_schema,
+    _compact_columns,
+    _status_id_index,
+    _task_counts,
+    _task_search,
+    _task_user_ids,
+    _task_changes,
+    _change_log,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(db):
+    """Returns the schema version stored in the database."""
+    return db.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(db):
+    """
+    Function: migrate
+
+    Applies any migrations the database hasn't had yet. Each migration runs
+    in its own transaction together with the version bump, so a failed
+    migration leaves the database at the previous version. The version is
+    re-read after taking the write lock so two processes starting at the
+    same time don't apply the same migration twice.
+
+    Input:
+    - db: (sqlite3.Connection) connection to the database to upgrade.
+
+    Output:
+    - version: (int) the schema version after migrating.
+    """
+    version = schema_version(db)
+
+    while version < SCHEMA_VERSION:
+        cursor = db.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            version = schema_version(db)
+            if version >= SCHEMA_VERSION:
+                db.commit()
+                break
+
+            MIGRATIONS[version](cursor)
+            version += 1
+            # PRAGMA doesn't accept parameters, version is always an int
+            cursor.execute(f"PRAGMA user_version = {int(version)}")
+            db.commit()
+        except sqlite3.Error:
+            db.rollback()
+            raise
+
+    return version
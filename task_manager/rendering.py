@@ -0,0 +1,256 @@
+"""
+Rendering of task and user listings for Task Manager.
+
+Listings are formatted into a single string per page and written to the
+terminal in one go, instead of one print() per field. Output modes:
+- "table": compact, one row per record, cells truncated to fit the width.
+- "details": the original multi-line layout, one block per record.
+- "json": one JSON object per line, for other programs to read.
+- "csv": comma separated values with a header row.
+
+Long listings can be streamed into a pager such as 'less'.
+"""
+import contextlib
+import csv
+import io
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+
+OUTPUT_MODES = ("table", "details", "json", "csv")
+DEFAULT_OUTPUT = "table"
+
+# Pager used when $PAGER isn't set. less options: quit if the output fits
+# on one screen (-F), keep colours (-R), chop long lines (-S) and leave the
+# output on screen afterwards (-X).
+DEFAULT_PAGER = "less -FRSX" if os.name == "posix" else "more"
+
+# Table columns: (heading, attribute, width, right aligned). Columns with a
+# width of None share the space left over, but are never narrower than
+# MIN_COLUMN_WIDTH.
+TASK_TABLE = [
+    ("No.", "task_id", 7, True),
+    ("Assignee", "user", 12, False),
+    ("Assigned", "assigned_date", 10, False),
+    ("Due", "due_date", 10, False),
+    ("Done", "is_complete", 4, False),
+    ("Title", "title", None, False),
+    ("Description", "description", None, False),
+]
+USER_TABLE = [
+    ("ID", "user_id", 7, True),
+    ("Username", "username", 16, False),
+    ("Admin", "is_admin", 5, False),
+    ("Email", "email", None, False),
+]
+STATS_TABLE = [
+    ("Assignee", "user", 20, False),
+    ("Open", "open", 9, True),
+    ("Completed", "completed", 9, True),
+    ("Total", "total", 9, True),
+]
+TABLES = {"task": TASK_TABLE, "user": USER_TABLE, "stats": STATS_TABLE}
+MIN_COLUMN_WIDTH = 10
+
+# Labels of the details layout, in display order
+TASK_DETAILS = [
+    ("Task Number", "task_id"),
+    ("Task Assignee", "user"),
+    ("Assigned date", "assigned_date"),
+    ("Due date", "due_date"),
+    ("Task Title", "title"),
+    ("Completed", "is_complete"),
+]
+USER_DETAILS = [
+    ("User ID", "user_id"),
+    ("Username", "username"),
+    ("User Email", "email"),
+    ("Admin User", "is_admin"),
+]
+STATS_DETAILS = [
+    ("Task Assignee", "user"),
+    ("Open tasks", "open"),
+    ("Completed tasks", "completed"),
+    ("Total tasks", "total"),
+]
+DETAILS = {"task": TASK_DETAILS, "user": USER_DETAILS,
+           "stats": STATS_DETAILS}
+
+
+def truncate(text, width):
+    """Fits text on one line of at most width characters."""
+    text = str(text)
+    if len(text) <= width and text.isprintable():
+        return text
+
+    # Newlines and tabs would break the table layout
+    text = " ".join(text.split())
+    if len(text) <= width:
+        return text
+    if width <= 3:
+        return text[:width]
+    return text[:width - 3] + "..."
+
+
+def format_table(records, columns, width=None, header=True):
+    """
+    Function: format_table
+
+    Formats records as a table with one row per record.
+
+    Input:
+    - records: (list) tasks or users.
+    - columns: (list) column definitions, such as TASK_TABLE.
+    - width: (int) total width, the terminal width by default.
+    - header: (bool) include the heading rows.
+
+    Output:
+    - text: (str) the table, ending with a newline.
+    """
+    width = width or shutil.get_terminal_size().columns
+    flexible = sum(1 for column in columns if column[2] is None)
+    fixed = sum(column[2] or 0 for column in columns) + len(columns) - 1
+    flexible_width = max(MIN_COLUMN_WIDTH,
+                         (width - fixed) // flexible) if flexible else 0
+    widths = [column[2] or flexible_width for column in columns]
+
+    def row(cells):
+        return " ".join(
+            cell.rjust(size) if column[3] else cell.ljust(size)
+            for column, cell, size in zip(columns, cells, widths)
+        ).rstrip()
+
+    lines = []
+    if header:
+        lines.append(row([truncate(column[0], size)
+                          for column, size in zip(columns, widths)]))
+        lines.append(" ".join("-" * size for size in widths))
+    for record in records:
+        lines.append(row([truncate(getattr(record, column[1]), size)
+                          for column, size in zip(columns, widths)]))
+    return "\n".join(lines) + "\n"
+
+
+def format_details(records, kind="task"):
+    """Formats records in the multi-line layout used by the menus."""
+    lines = []
+    fields = DETAILS[kind]
+    for record in records:
+        lines.append("-" * 80)
+        lines.extend(f"{label}: {getattr(record, attribute)}"
+                     for label, attribute in fields)
+        if kind == "task":
+            lines.append("Task Description:")
+            lines.append(f"{record.description}\n")
+    lines.append("-" * 80 + "\n")
+    return "\n".join(lines) + "\n"
+
+
+def format_json_lines(records):
+    """Formats records as one JSON object per line."""
+    return "".join(json.dumps(record.to_dict()) + "\n" for record in records)
+
+
+def format_csv(records, header=True):
+    """Formats records as CSV, with a header row naming the fields."""
+    buffer = io.StringIO()
+    writer = None
+    for record in records:
+        values = record.to_dict()
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(values))
+            if header:
+                writer.writeheader()
+        writer.writerow(values)
+    return buffer.getvalue()
+
+
+class Renderer:
+    """
+    Formats pages of tasks or users in one of the OUTPUT_MODES.
+    """
+    def __init__(self, mode=DEFAULT_OUTPUT, width=None):
+        """
+        Initialise the Renderer.
+
+        Input:
+        - mode: (str) one of OUTPUT_MODES.
+        - width: (int) table width, the terminal width by default.
+        """
+        if mode not in OUTPUT_MODES:
+            raise ValueError(f"Unknown output mode: {mode}")
+        self.mode = mode
+        self.width = width
+
+    @property
+    def machine_readable(self):
+        """True for the json and csv modes, which are meant for programs."""
+        return self.mode in ("json", "csv")
+
+    def format(self, records, kind="task", header=True):
+        """
+        Function: format
+
+        Formats one page of records as a single string.
+
+        Input:
+        - records: (list) tasks or users.
+        - kind: (str) "task", "user" or "stats".
+        - header: (bool) include the table or CSV header, only wanted on
+          the first page of a stream.
+
+        Output:
+        - text: (str) the formatted records.
+        """
+        if self.mode == "table":
+            return format_table(records, TABLES[kind], self.width, header)
+        if self.mode == "details":
+            return format_details(records, kind)
+        if self.mode == "json":
+            return format_json_lines(records)
+        return format_csv(records, header)
+
+
+@contextlib.contextmanager
+def pager(out=None):
+    """
+    Function: pager
+
+    Context manager giving a stream that feeds the pager from $PAGER, or
+    DEFAULT_PAGER, so output can be written to it while it is still being
+    fetched. When out isn't a terminal, or no pager can be started, out is
+    used directly. Quitting the pager early stops the writing quietly.
+
+    Input:
+    - out: (file) where output goes without a pager, sys.stdout by default.
+    """
+    out = out or sys.stdout
+    command = os.environ.get("PAGER", DEFAULT_PAGER)
+    process = None
+    if command and out.isatty():
+        try:
+            process = subprocess.Popen(shlex.split(command),
+                                       stdin=subprocess.PIPE,
+                                       encoding=out.encoding,
+                                       errors="replace")
+        except OSError:
+            process = None
+
+    if process is None:
+        yield out
+        out.flush()
+        return
+
+    try:
+        yield process.stdin
+    except BrokenPipeError:
+        pass
+    finally:
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        process.wait()
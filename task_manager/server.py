@@ -0,0 +1,725 @@
+"""
+JSON API server for Task Manager.
+
+Serves the task and user operations over HTTP so many clients can use the
+system at the same time, instead of one person at the interactive menu.
+Client connections are handled by a fixed pool of worker threads and kept
+alive between requests, and each worker thread reuses its own database
+connection.
+
+Every request is authenticated with HTTP Basic auth using
+UserRepository.login, and the same role checks as the menus apply: users
+can read tasks and add, update and complete their own tasks, admins can
+do everything, including managing users.
+
+Enter "python -m task_manager.server" into console to run server.
+"""
+import argparse
+import base64
+import binascii
+import json
+import re
+import socket
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+from task_manager.business_logic import TaskService, UserService, Task, User
+from task_manager.connection import (DATABASE_ENV, ConnectionManager,
+                                     configured_database)
+from task_manager.data_access import EMAIL_PATTERN, PAGE_SIZE
+from task_manager.utilities import date_validation
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+
+# Worker threads handling client connections. A kept alive connection holds
+# its worker until it closes or has been idle for KEEPALIVE_TIMEOUT seconds,
+# further connections wait for a free worker.
+SERVER_WORKERS = 16
+KEEPALIVE_TIMEOUT = 15
+
+# Largest request body accepted, and largest page a listing returns
+MAX_BODY_SIZE = 1024 * 1024
+MAX_PAGE_SIZE = 500
+
+
+class ApiError(Exception):
+    """An error returned to the client as a JSON response."""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTPServer that handles each client connection on a fixed size thread
+    pool, rather than one new thread per connection.
+    """
+    def __init__(self, address, workers=SERVER_WORKERS, connections=None,
+                 verbose=False):
+        """
+        Initialise the server and the services it uses.
+
+        Input:
+        - address: (tuple) host and port to listen on.
+        - workers: (int) number of worker threads.
+        - connections: (ConnectionManager) optional manager to use a
+          different database.
+        - verbose: (bool) log every request to stderr.
+        """
+        super().__init__(address, ApiHandler)
+        self.task_service = TaskService(connections)
+        self.user_service = UserService(connections)
+        self.connections = self.task_service.task_repository.connections
+        self.verbose = verbose
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="task-manager-http")
+        self._lock = threading.Lock()
+        self._open_requests = set()
+
+    def process_request(self, request, client_address):
+        """Hands a new client connection to the thread pool."""
+        with self._lock:
+            self._open_requests.add(request)
+        self.executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        """Serves one client connection on a worker thread."""
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self._lock:
+                self._open_requests.discard(request)
+            self.shutdown_request(request)
+
+    def server_close(self):
+        """
+        Stops listening, disconnects kept alive clients so their workers
+        finish straight away, then closes the database connections.
+        """
+        super().server_close()
+        with self._lock:
+            requests = list(self._open_requests)
+        for request in requests:
+            try:
+                request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.executor.shutdown(cancel_futures=True)
+        self.connections.close_all()
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """
+    Handles the JSON API requests. Each route maps a method and path to a
+    handler method, and admin only routes are refused for standard users.
+    """
+    protocol_version = "HTTP/1.1"
+    server_version = "TaskManager/1.0"
+    timeout = KEEPALIVE_TIMEOUT
+    # Headers and body are written separately, without TCP_NODELAY each
+    # response on a kept alive connection stalls on delayed ACKs
+    disable_nagle_algorithm = True
+
+    # (HTTP method, path pattern, handler method, admin only)
+    ROUTES = [
+        ("GET", r"/me", "get_me", False),
+        ("GET", r"/tasks", "list_tasks", False),
+        ("GET", r"/tasks/mine", "list_my_tasks", False),
+        ("GET", r"/tasks/completed", "list_completed_tasks", True),
+        ("GET", r"/tasks/overdue", "list_overdue_tasks", True),
+        ("POST", r"/tasks", "add_task", False),
+        ("GET", r"/tasks/(\d+)", "get_task", False),
+        ("PUT", r"/tasks/(\d+)", "update_task", False),
+        ("POST", r"/tasks/(\d+)/complete", "mark_complete", False),
+        ("DELETE", r"/tasks/(\d+)", "delete_task", True),
+        ("GET", r"/users", "list_users", True),
+        ("POST", r"/users", "add_user", True),
+        ("GET", r"/users/(\d+)", "get_user", True),
+        ("PUT", r"/users/(\d+)", "update_user", True),
+        ("POST", r"/users/(\d+)/admin", "make_admin", True),
+        ("DELETE", r"/users/(\d+)", "delete_user", True),
+    ]
+    ROUTES = [(method, re.compile(pattern), action, admin_only)
+              for method, pattern, action, admin_only in ROUTES]
+
+    def do_GET(self):
+        """
+        Function: do_GET
+
+        Called by BaseHTTPRequestHandler for each GET request, and sends
+        the response of the matching route, see _dispatch.
+        """
+        self._dispatch("GET")
+
+    def do_POST(self):
+        """
+        Function: do_POST
+
+        Called by BaseHTTPRequestHandler for each POST request, and sends
+        the response of the matching route, see _dispatch.
+        """
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        """
+        Function: do_PUT
+
+        Called by BaseHTTPRequestHandler for each PUT request, and sends
+        the response of the matching route, see _dispatch.
+        """
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        """
+        Function: do_DELETE
+
+        Called by BaseHTTPRequestHandler for each DELETE request, and sends
+        the response of the matching route, see _dispatch.
+        """
+        self._dispatch("DELETE")
+
+    def log_message(self, format, *args):
+        """Only logs requests when the server is verbose."""
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _dispatch(self, method):
+        """Authenticates the request and calls the matching route."""
+        try:
+            # Always read the body first so the connection stays usable for
+            # the next request, whatever the response is
+            self.body = self._read_json()
+            url = urlsplit(self.path)
+            self.query = parse_qs(url.query)
+
+            action, args, admin_only = self._match_route(method, url.path)
+            self.role, self.username = self._authenticate()
+            if admin_only and self.role != "admin":
+                raise ApiError(HTTPStatus.FORBIDDEN,
+                               "Only admins can do this.")
+
+            status, result = getattr(self, action)(*args)
+            self._send_json(status, result)
+        except ApiError as e:
+            self._send_json(e.status, {"error": e.message})
+        except sqlite3.Error as e:
+            # Always logged, even when the server isn't verbose
+            super().log_message("Database error: %s", e)
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR,
+                            {"error": "Database error."})
+        except Exception as e:
+            # Answer anyway so the client isn't left with a dropped
+            # connection
+            super().log_message("Unexpected error: %r", e)
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR,
+                            {"error": "Internal server error."})
+
+    def _match_route(self, method, path):
+        """Returns (handler method, path arguments, admin only)."""
+        path_found = False
+        for route_method, pattern, action, admin_only in self.ROUTES:
+            match = pattern.fullmatch(path)
+            if not match:
+                continue
+            path_found = True
+            if route_method == method:
+                args = [int(arg) for arg in match.groups()]
+                return action, args, admin_only
+
+        if path_found:
+            raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED,
+                           "Method not allowed.")
+        raise ApiError(HTTPStatus.NOT_FOUND, "Not found.")
+
+    def _authenticate(self):
+        """Checks the Basic auth credentials. Returns (role, username)."""
+        header = self.headers.get("Authorization", "")
+        scheme, _, encoded = header.partition(" ")
+        try:
+            username, _, password = (base64.b64decode(encoded, validate=True)
+                                     .decode("utf-8").partition(":"))
+        except (binascii.Error, UnicodeDecodeError):
+            username = password = None
+
+        user_login = None
+        if scheme.lower() == "basic" and username:
+            user_login = self.server.user_service.login(username, password)
+
+        if not user_login:
+            raise ApiError(HTTPStatus.UNAUTHORIZED, "Invalid login.")
+        return user_login
+
+    def _read_json(self):
+        """Reads the JSON request body. Returns {} when there is none."""
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY_SIZE:
+            # The body can't be skipped safely, so drop the connection
+            self.close_connection = True
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                           "Invalid or too large request body.")
+        if length == 0:
+            return {}
+
+        try:
+            body = json.loads(self.rfile.read(length))
+        except (ValueError, UnicodeDecodeError):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Invalid JSON.")
+        if not isinstance(body, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST,
+                           "Request body must be a JSON object.")
+        return body
+
+    def _send_json(self, status, result):
+        """Sends result as a JSON response."""
+        body = json.dumps(result).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == HTTPStatus.UNAUTHORIZED:
+            self.send_header("WWW-Authenticate", 'Basic realm="tasks"')
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    # ********** REQUEST HELPERS **********
+
+    def _query_value(self, name, default=None):
+        """Returns the first value of a query string parameter."""
+        return self.query.get(name, [default])[0]
+
+    def _query_int(self, name, default):
+        """Returns a whole number query string parameter."""
+        try:
+            return int(self._query_value(name, default))
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST,
+                           f"'{name}' must be a whole number.")
+
+    def _query_date(self, name):
+        """Returns an optional 'YYYY-MM-DD' query string parameter."""
+        value = self._query_value(name)
+        if value is None:
+            return None
+        try:
+            return date_validation(value).strftime("%Y-%m-%d")
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST,
+                           f"'{name}' must be a valid YYYY-MM-DD date.")
+
+    def _page_args(self):
+        """Returns (after_id, limit) for the listing routes."""
+        limit = self._query_int("limit", PAGE_SIZE)
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ApiError(HTTPStatus.BAD_REQUEST,
+                           f"'limit' must be between 1 and {MAX_PAGE_SIZE}.")
+        return self._query_int("after_id", 0), limit
+
+    def _text(self, name, current=None):
+        """
+        Returns a text field from the body. Fields left out keep the
+        current value, and are required when there isn't one.
+        """
+        value = self.body.get(name, current)
+        if not isinstance(value, str) or not value.strip():
+            raise ApiError(HTTPStatus.BAD_REQUEST,
+                           f"'{name}' must be a non empty string.")
+        return value
+
+    def _due_date(self, assigned_date, current=None):
+        """Returns a valid due date from the body in 'YYYY-MM-DD' format."""
+        value = self._text("due_date", current)
+        try:
+            due_date = date_validation(value)
+        except ValueError as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, str(e))
+
+        if due_date < assigned_date:
+            raise ApiError(HTTPStatus.BAD_REQUEST,
+                           "Due date cannot be before assigned date.")
+        return due_date.strftime("%Y-%m-%d")
+
+    def _assignee(self, current=None):
+        """Returns the assignee from the body, checking they exist."""
+        username = self._text("user", current)
+        user = self.server.user_service.assignee_exists(username)
+        if not user:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "User does not exist.")
+        return user
+
+    def _own_task(self, task_id):
+        """Returns a task the logged in user is allowed to change."""
+        task = self.server.task_service.get_task(task_id)
+        if not task:
+            raise ApiError(HTTPStatus.NOT_FOUND, "Task does not exist.")
+        if self.role == "user" and self.username != task.user:
+            raise ApiError(HTTPStatus.FORBIDDEN,
+                           "Users only allowed to edit own tasks.")
+        if task.is_complete == "Yes":
+            raise ApiError(HTTPStatus.CONFLICT, "Task is already complete.")
+        return task
+
+    def _task_page(self, tasks):
+        """Builds a listing response with the cursor for the next page."""
+        return HTTPStatus.OK, {
+            "tasks": [task.to_dict() for task in tasks],
+            "next_after_id": tasks[-1].task_id if tasks else None,
+        }
+
+    def _saved(self, result, message="Database error."):
+        """Raises an error if a repository call failed."""
+        if result is None:
+            raise ApiError(HTTPStatus.INTERNAL_SERVER_ERROR, message)
+        return result
+
+    # ********** TASK ROUTES **********
+
+    def get_me(self):
+        """
+        Function: get_me
+
+        Route GET /me.
+
+        Output:
+        - status, result: 200 and the logged in username and role.
+        """
+        return HTTPStatus.OK, {"username": self.username, "role": self.role}
+
+    def list_tasks(self):
+        """
+        Function: list_tasks
+
+        Route GET /tasks. Lists all tasks for admins, standard users only
+        see their own. Pages are chosen with the after_id and limit query
+        parameters.
+
+        Output:
+        - status, result: 200 and the page of tasks with next_after_id,
+          the after_id of the next page or null after the last one.
+        """
+        if self.role != "admin":
+            return self.list_my_tasks()
+        return self._task_page(
+            self.server.task_service.view_all_tasks_page(*self._page_args()))
+
+    def list_my_tasks(self):
+        """
+        Function: list_my_tasks
+
+        Route GET /tasks/mine. Lists the tasks of the logged in user, a page
+        at a time like list_tasks.
+
+        Output:
+        - status, result: 200 and the page of tasks with next_after_id.
+        """
+        return self._task_page(self.server.task_service.get_my_tasks_page(
+            self.username, *self._page_args()))
+
+    def list_completed_tasks(self):
+        """
+        Function: list_completed_tasks
+
+        Route GET /tasks/completed, admins only. Lists completed tasks a
+        page at a time like list_tasks.
+
+        Output:
+        - status, result: 200 and the page of tasks with next_after_id.
+        """
+        return self._task_page(self.server.task_service.completed_tasks_page(
+            *self._page_args()))
+
+    def list_overdue_tasks(self):
+        """
+        Function: list_overdue_tasks
+
+        Route GET /tasks/overdue, admins only. Overdue tasks are ordered by
+        due date, then ID, so the next page is chosen with both the
+        after_due_date and after_id query parameters.
+
+        Output:
+        - status, result: 200 and the page of tasks with next_after_id and
+          next_after_due_date.
+        """
+        after_id, limit = self._page_args()
+        tasks = self.server.task_service.overdue_tasks_page(
+            self._query_date("after_due_date"), after_id, limit)
+        status, result = self._task_page(tasks)
+        result["next_after_due_date"] = tasks[-1].due_date if tasks else None
+        return status, result
+
+    def get_task(self, task_id):
+        """
+        Function: get_task
+
+        Route GET /tasks/<task_id>.
+
+        Input:
+        - task_id: (int) ID of the task.
+
+        Output:
+        - status, result: 200 and the task, 404 if it doesn't exist.
+        """
+        task = self.server.task_service.get_task(task_id)
+        if not task:
+            raise ApiError(HTTPStatus.NOT_FOUND, "Task does not exist.")
+        return HTTPStatus.OK, task.to_dict()
+
+    def add_task(self):
+        """
+        Function: add_task
+
+        Route POST /tasks. Adds a task from the title, description,
+        due_date and optional user in the body. The task is assigned to
+        the logged in user unless a user is given.
+
+        Output:
+        - status, result: 201 and the new task, 400 if the body is invalid
+          or the user doesn't exist.
+        """
+        assigned_date = date.today()
+        task = Task(
+            title=self._text("title"),
+            description=self._text("description"),
+            assigned_date=assigned_date.strftime("%Y-%m-%d"),
+            due_date=self._due_date(assigned_date),
+            user=self._assignee(self.username),
+        )
+        task_id = self._saved(self.server.task_service.add_task(task))
+        return HTTPStatus.CREATED, self.get_task(task_id)[1]
+
+    def update_task(self, task_id):
+        """
+        Function: update_task
+
+        Route PUT /tasks/<task_id>. Updates the title, description, due
+        date and assignee. Fields left out of the body keep their value.
+        Standard users can only update their own tasks.
+
+        Input:
+        - task_id: (int) ID of the task.
+
+        Output:
+        - status, result: 200 and the updated task, or an error if the task
+          doesn't exist, belongs to someone else or is already complete.
+        """
+        task = self._own_task(task_id)
+        assigned_date = datetime.strptime(task.assigned_date,
+                                          "%Y-%m-%d").date()
+        updated_task = Task(
+            title=self._text("title", task.title),
+            description=self._text("description", task.description),
+            assigned_date=task.assigned_date,
+            due_date=self._due_date(assigned_date, task.due_date),
+            user=self._assignee(task.user),
+            task_id=task_id,
+        )
+        self._saved(self.server.task_service.update_task(updated_task))
+        return self.get_task(task_id)
+
+    def mark_complete(self, task_id):
+        """
+        Function: mark_complete
+
+        Route POST /tasks/<task_id>/complete. Standard users can only
+        complete their own tasks.
+
+        Input:
+        - task_id: (int) ID of the task.
+
+        Output:
+        - status, result: 200 and the completed task, or an error as for
+          update_task.
+        """
+        self._own_task(task_id)
+        self._saved(self.server.task_service.mark_complete(task_id))
+        return self.get_task(task_id)
+
+    def delete_task(self, task_id):
+        """
+        Function: delete_task
+
+        Route DELETE /tasks/<task_id>, admins only.
+
+        Input:
+        - task_id: (int) ID of the task.
+
+        Output:
+        - status, result: 200 and the deleted ID, 404 if the task doesn't
+          exist.
+        """
+        if not self._saved(self.server.task_service.delete_task(task_id)):
+            raise ApiError(HTTPStatus.NOT_FOUND, "Task does not exist.")
+        return HTTPStatus.OK, {"deleted": task_id}
+
+    # ********** USER ROUTES **********
+
+    def list_users(self):
+        """
+        Function: list_users
+
+        Route GET /users, admins only.
+
+        Output:
+        - status, result: 200 and every user.
+        """
+        users = self.server.user_service.view_all_users()
+        return HTTPStatus.OK, {"users": [user.to_dict() for user in users]}
+
+    def get_user(self, user_id):
+        """
+        Function: get_user
+
+        Route GET /users/<user_id>, admins only.
+
+        Input:
+        - user_id: (int) ID of the user.
+
+        Output:
+        - status, result: 200 and the user, 404 if they don't exist.
+        """
+        user = self.server.user_service.get_user(user_id)
+        if not user:
+            raise ApiError(HTTPStatus.NOT_FOUND, "User does not exist.")
+        return HTTPStatus.OK, user.to_dict()
+
+    def _email(self, current=None):
+        """Returns a valid email address from the body."""
+        email = self._text("email", current)
+        if not EMAIL_PATTERN.match(email):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Invalid email format.")
+        return email
+
+    def _new_username(self, current=None):
+        """Returns a username from the body that isn't already taken."""
+        username = self._text("username", current)
+        if (username != current
+                and self.server.user_service.assignee_exists(username)):
+            raise ApiError(HTTPStatus.CONFLICT, "Username already exists.")
+        return username
+
+    def add_user(self):
+        """
+        Function: add_user
+
+        Route POST /users, admins only. Adds a standard user from the
+        username, password and email in the body.
+
+        Output:
+        - status, result: 201 and the new user, 400 if the body is invalid
+          or 409 if the username is taken.
+        """
+        user = User(
+            username=self._new_username(),
+            password=self._text("password"),
+            email=self._email(),
+        )
+        user_id = self._saved(self.server.user_service.add_user(user))
+        return HTTPStatus.CREATED, self.get_user(user_id)[1]
+
+    def update_user(self, user_id):
+        """
+        Function: update_user
+
+        Route PUT /users/<user_id>, admins only. Updates the username,
+        password and email. Fields left out of the body keep their value.
+
+        Input:
+        - user_id: (int) ID of the user.
+
+        Output:
+        - status, result: 200 and the updated user, 404 if they don't
+          exist or 409 if the new username is taken.
+        """
+        user = self.server.user_service.get_user(user_id)
+        if not user:
+            raise ApiError(HTTPStatus.NOT_FOUND, "User does not exist.")
+
+        updated_user = User(
+            username=self._new_username(user.username),
+            password=self._text("password", user.password),
+            email=self._email(user.email),
+            user_id=user_id,
+        )
+        self._saved(self.server.user_service.update_user(updated_user))
+        return self.get_user(user_id)
+
+    def make_admin(self, user_id):
+        """
+        Function: make_admin
+
+        Route POST /users/<user_id>/admin, admins only.
+
+        Input:
+        - user_id: (int) ID of the user to make an admin.
+
+        Output:
+        - status, result: 200 and the user, 404 if they don't exist.
+        """
+        if not self._saved(self.server.user_service.make_admin(user_id)):
+            raise ApiError(HTTPStatus.NOT_FOUND, "User does not exist.")
+        return self.get_user(user_id)
+
+    def delete_user(self, user_id):
+        """
+        Function: delete_user
+
+        Route DELETE /users/<user_id>, admins only. The user's tasks are
+        left unassigned.
+
+        Input:
+        - user_id: (int) ID of the user.
+
+        Output:
+        - status, result: 200 and the deleted ID, 404 if the user doesn't
+          exist.
+        """
+        if not self._saved(self.server.user_service.delete_user(user_id)):
+            raise ApiError(HTTPStatus.NOT_FOUND, "User does not exist.")
+        return HTTPStatus.OK, {"deleted": user_id}
+
+
+def main():
+    """
+    Function: main
+
+    Serves the API with the options given on the command line, see
+    --help, until interrupted with Ctrl+C. The server and its database
+    connections are then closed.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    parser.add_argument("--verbose", action="store_true",
+                        help="log every request")
+    parser.add_argument("--database", default=configured_database(),
+                        help=f"sqlite database file or 'file:' URI, "
+                             f"defaults to ${DATABASE_ENV}")
+    args = parser.parse_args()
+
+    server = PooledHTTPServer((args.host, args.port), args.workers,
+                              ConnectionManager(args.database),
+                              verbose=args.verbose)
+    print(f"Task Manager API listening on http://{args.host}:"
+          f"{server.server_address[1]} with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,16 +7,96 @@ import sys
 import time
 from datetime import datetime, date
 from task_manager.business_logic import TaskService, UserService, Task, User
+from task_manager.data_access import PAGE_SIZE
+from task_manager.import_pipeline import DEFAULT_WORKERS
+from task_manager.rendering import DEFAULT_OUTPUT, Renderer, pager
 from task_manager.utilities import validate_email, date_validation
 
+# Tasks fetched per query when a whole listing is written out
+STREAM_PAGE_SIZE = 1000
 
-def start_application():
+
+def stream_tasks(get_page, page_cursor, renderer, tasks, out, header=True):
+    """
+    Writes tasks, then every following page of the listing, to out. Each
+    page is formatted into one string and written at once.
+    """
+    while tasks:
+        out.write(renderer.format(tasks, header=header))
+        header = False
+        tasks = get_page(page_cursor(tasks[-1]), STREAM_PAGE_SIZE)
+
+
+def show_task_pages(get_page, page_cursor, empty_message, renderer):
+    """
+    Displays a task listing one page at a time with next and previous
+    page navigation, or the whole listing in the pager. Machine readable
+    output modes write the whole listing straight away.
+
+    Input:
+    - get_page: (function) returns up to limit tasks after a cursor, or
+      the first tasks when the cursor is None.
+    - page_cursor: (function) returns the cursor that follows a task.
+    - empty_message: (str) printed if there are no tasks at all.
+    - renderer: (Renderer) formats the tasks.
+    """
+    if renderer.machine_readable:
+        stream_tasks(get_page, page_cursor, renderer,
+                     get_page(None, STREAM_PAGE_SIZE), sys.stdout)
+        sys.stdout.flush()
+        return
+
+    # Cursor each visited page starts after, so previous pages can be
+    # fetched again without counting rows
+    cursors = [None]
+    tasks = get_page(None, PAGE_SIZE)
+
+    if not tasks:
+        print(empty_message)
+        time.sleep(2)
+        return
+
+    sys.stdout.write(renderer.format(tasks))
+    while True:
+        option = input(f"Page {len(cursors)}. Enter 'n' for next page, "
+                       f"'p' for previous page, 'a' to view all from this "
+                       f"page or '-1' for main menu: ").lower()
+
+        if option == "n":
+            next_cursor = page_cursor(tasks[-1])
+            next_tasks = get_page(next_cursor, PAGE_SIZE)
+            if not next_tasks:
+                print("\nNo more tasks.\n")
+                continue
+            cursors.append(next_cursor)
+            tasks = next_tasks
+            sys.stdout.write(renderer.format(tasks))
+        elif option == "p":
+            if len(cursors) == 1:
+                print("\nAlready on the first page.\n")
+                continue
+            cursors.pop()
+            tasks = get_page(cursors[-1], PAGE_SIZE)
+            sys.stdout.write(renderer.format(tasks))
+        elif option == "a":
+            with pager() as out:
+                stream_tasks(get_page, page_cursor, renderer, tasks, out)
+        elif option == "-1":
+            break
+        else:
+            print("\nInvalid option! Try again.\n")
+
+
+def start_application(output=DEFAULT_OUTPUT, connections=None):
     """
     Handles user login, displays user menus based on user role and provides
     interaction between user interface and business logic. Runs in a loop until
-    user decides to exit the program."""
-    task_service = TaskService()
-    user_service = UserService()
+    user decides to exit the program. Listings are displayed in the output
+    mode, see rendering.py. An optional ConnectionManager can be given to use
+    a different database."""
+    task_service = TaskService(connections)
+    user_service = UserService(connections)
+    renderer = Renderer(output)
 
     print("Task Management System")
     username = input("Username: ")
@@ -50,6 +130,7 @@ def start_application():
         print("3. View all my tasks")
         print("4. Update task")
         print("5. Mark task complete")
+        print("20. Search tasks")
 
         # Additional admin menu options
         if role == "admin":
@@ -67,12 +148,13 @@ def start_application():
             print("16. Delete user")
             print("17. Import users")
             print("18. Export users")
+            print("19. Task stats per user")
 
         try:
             choice = int(input("Enter your choice: "))
 
             # Prevent role "user" accessing admin menu
-            if role == "user" and choice > 5:
+            if role == "user" and 5 < choice < 20:
                 print("\nInvalid option, try again.\n")
                 continue
 
@@ -181,24 +263,11 @@ def start_application():
             elif choice == 3:
                 # View my tasks
                 print("\nView my tasks\n")
-                tasks = task_service.get_my_tasks(logged_in_user)
-
-                if tasks:
-                    for task in tasks:
-                        print("-" * 80)
-                        print(f"Task Number: {task.task_id}")
-                        print(f"Task Assignee: {task.user}")
-                        print(f"Assigned date: {task.assigned_date}")
-                        print(f"Due date: {task.due_date}")
-                        print(f"Task Title: {task.title}")
-                        print(f"Completed: {task.is_complete}")
-                        print("Task Description:")
-                        print(f"{task.description}")
-                    print("-" * 80 + "\n")
-                else:
-                    print("You have no tasks.")
-
-                time.sleep(2)
+                show_task_pages(
+                    lambda after, limit: task_service.get_my_tasks_page(
+                        logged_in_user, after or 0, limit),
+                    lambda task: task.task_id,
+                    "You have no tasks.", renderer)
 
             elif choice == 4:
                 # Update task
@@ -444,67 +513,31 @@ def start_application():
             elif choice == 6:
                 # ***** View all tasks *****
                 print("\nView all tasks\n")
-                tasks = task_service.view_all_tasks()
-                if tasks:
-                    for task in tasks:
-                        print("-" * 80)
-                        print(f"Task Number: {task.task_id}")
-                        print(f"Task Assignee: {task.user}")
-                        print(f"Assigned date: {task.assigned_date}")
-                        print(f"Due date: {task.due_date}")
-                        print(f"Task Title: {task.title}")
-                        print(f"Completed: {task.is_complete}")
-                        print("Task Description:")
-                        print(f"{task.description}\n")
-                    print("-" * 80 + "\n")
-                else:
-                    print("\nThere are no tasks!\n")
-
-                time.sleep(2)
+                show_task_pages(
+                    lambda after, limit: task_service.view_all_tasks_page(
+                        after or 0, limit),
+                    lambda task: task.task_id,
+                    "\nThere are no tasks!\n", renderer)
 
             elif choice == 7:
                 # ***** Overdue tasks *****
                 print("\nOverdue Tasks\n")
-                tasks = task_service.overdue_tasks()
-
-                if tasks is None:
-                    print("No overdue tasks.")
-                if tasks:
-                    for task in tasks:
-                        print("-" * 80)
-                        print(f"Task Number: {task.task_id}")
-                        print(f"Task Assignee: {task.user}")
-                        print(f"Assigned date: {task.assigned_date}")
-                        print(f"Due date: {task.due_date}")
-                        print(f"Task Title: {task.title}")
-                        print(f"Completed: {task.is_complete}")
-                        print("Task Description:")
-                        print(f"{task.description}\n")
-                    print("-" * 80 + "\n")
-                else:
-                    print("\nNo overdue tasks.\n")
-                time.sleep(2)
+                # Overdue tasks are ordered by due date, so pages start
+                # after a (due date, task number) pair
+                show_task_pages(
+                    lambda after, limit: task_service.overdue_tasks_page(
+                        *(after or (None, 0)), limit),
+                    lambda task: (task.due_date, task.task_id),
+                    "\nNo overdue tasks.\n", renderer)
 
             elif choice == 8:
                 # ***** View completed tasks *****
                 print("\nView completed tasks\n")
-                tasks = task_service.completed_tasks()
-                if tasks:
-                    for task in tasks:
-                        print("-" * 80)
-                        print(f"Task Number: {task.task_id}")
-                        print(f"Task Assignee: {task.user}")
-                        print(f"Assigned date: {task.assigned_date}")
-                        print(f"Due date: {task.due_date}")
-                        print(f"Task Title: {task.title}")
-                        print(f"Completed: {task.is_complete}")
-                        print("Task Description:")
-                        print(f"{task.description}\n")
-                    print("-" * 80 + "\n")
-                else:
-                    print("There are no completed tasks!")
-
-                time.sleep(2)
+                show_task_pages(
+                    lambda after, limit: task_service.completed_tasks_page(
+                        after or 0, limit),
+                    lambda task: task.task_id,
+                    "There are no completed tasks!", renderer)
 
             elif choice == 9:
                 # ***** Delete task *****
@@ -552,8 +585,15 @@ def start_application():
             elif choice == 10:
                 # ***** Import tasks *****
                 print("\nImport Tasks\n")
-                time.sleep(2)
-                task_service.import_tasks()
+                while True:
+                    bulk = input("Use bulk import for large files? "
+                                 "(y/n): ").lower()
+                    if bulk in ("y", "n"):
+                        break
+                    print("Invalid option! Try again.")
+
+                task_service.import_tasks(bulk=bulk == "y",
+                                          workers=DEFAULT_WORKERS)
                 time.sleep(2)
 
             elif choice == 11:
@@ -568,13 +608,8 @@ def start_application():
                 users = user_service.view_all_users()
 
                 if users:
-                    for user in users:
-                        print("\n" + "-" * 80)
-                        print(f"User ID: {user.user_id}")
-                        print(f"Username: {user.username}")
-                        print(f"User Email: {user.email}")
-                        print(f"Admin User: {user.is_admin}")
-                    print("-" * 80 + "\n")
+                    with pager() as out:
+                        out.write(renderer.format(users, "user"))
 
                 time.sleep(2)
 
@@ -738,8 +773,15 @@ def start_application():
             elif choice == 17:
                 # ***** Import users *****
                 print("\nImport users\n")
-                time.sleep(2)
-                user_service.import_users()
+                while True:
+                    bulk = input("Use bulk import for large files? "
+                                 "(y/n): ").lower()
+                    if bulk in ("y", "n"):
+                        break
+                    print("Invalid option! Try again.")
+
+                user_service.import_users(bulk=bulk == "y",
+                                          workers=DEFAULT_WORKERS)
                 time.sleep(2)
 
             elif choice == 18:
@@ -748,6 +790,44 @@ def start_application():
                 user_service.export_users()
                 time.sleep(2)
 
+            elif choice == 19:
+                # ***** Task stats per user *****
+                print("\nTask stats per user\n")
+                stats = task_service.task_stats()
+
+                if not stats:
+                    print("There are no tasks!")
+                    time.sleep(2)
+                    continue
+
+                with pager() as out:
+                    out.write(renderer.format(stats, "stats"))
+                    if not renderer.machine_readable:
+                        out.write(
+                            f"\n{len(stats)} users, "
+                            f"{sum(row.open for row in stats)} open, "
+                            f"{sum(row.completed for row in stats)} "
+                            f"completed, "
+                            f"{sum(row.total for row in stats)} tasks\n\n")
+                time.sleep(2)
+
+            elif choice == 20:
+                # Search tasks
+                print("\nSearch tasks\n")
+                query = input("Search for (end a word with '*' to match "
+                              "the start of words): ")
+
+                # Standard users only search their own tasks
+                assignee = logged_in_user if role == "user" else None
+                tasks = task_service.search_tasks(query, assignee)
+
+                if tasks:
+                    with pager() as out:
+                        out.write(renderer.format(tasks))
+                else:
+                    print("\nNo matching tasks.\n")
+                time.sleep(2)
+
             elif choice == 0:
                 # ***** Exit task manager
                 print("Exiting Task Manager")
@@ -3,12 +3,62 @@ Unit tests for the TaskService class in the task_manager project.
 
 Enter "python -m unittest tests.test" into console to run tests.
 """
+import asyncio
+import base64
+import contextlib
+import csv
+import http.client
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
 import unittest
-from task_manager.business_logic import TaskService, UserService, Task, User
+from pathlib import Path
+from unittest import mock
+from benchmarks import bench_suite, generate
+from task_manager.async_services import AsyncTaskService
+from task_manager.backup import (backup_database, list_backups,
+                                 restore_database)
+from task_manager.business_logic import (ChangeLogService, TaskService,
+                                         UserService, Task, User)
+from task_manager.cli import main as cli_main
+from task_manager.connection import (DATABASE_ENV, ConnectionManager,
+                                     configured_database)
+from task_manager.data_access import TaskRepository, UserRepository
+from task_manager.migrations import SCHEMA_VERSION, schema_version
+from task_manager.rendering import Renderer, pager
+from task_manager.server import PooledHTTPServer
+from task_manager.user_interface import show_task_pages
 
-# Creating the task and user services
-task_service = TaskService()
-user_service = UserService()
+# Creating the task and user services, on an in-memory database so the
+# tests never touch the real one
+memory_connections = ConnectionManager(":memory:")
+task_service = TaskService(memory_connections)
+user_service = UserService(memory_connections)
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """
+    Base class for tests that need a database of their own. Each test gets
+    a temporary directory, self.tmp, and a connection manager,
+    self.connections, for a new in-memory database. Classes that need a
+    database file set in_memory to False to use self.path instead.
+    """
+    in_memory = True
+
+    def setUp(self):
+        """Create a temporary directory and an empty database"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "test.db")
+        self.connections = ConnectionManager(
+            ":memory:" if self.in_memory else self.path)
+
+    def tearDown(self):
+        """Close connections and remove the temporary directory"""
+        self.connections.close_all()
+        self.tmp.cleanup()
 
 
 class TestTaskService(unittest.TestCase):
@@ -155,6 +205,1665 @@ class TestUserService(unittest.TestCase):
         user_ids = [user.user_id for user in updated_all_users]
         self.assertNotIn(user_id, user_ids)
 
+    def test_get_user(self):
+        """Test the get_user method returns every field of the user"""
+        # Arrange
+        admin = user_service.get_user(1)
+
+        # Assert
+        self.assertEqual(admin.username, "admin")
+        self.assertEqual(admin.is_admin, "Yes")
+
+
+class TestLazyIteration(DatabaseTestCase):
+    """
+    Unit testing of the TaskService iter_* methods.
+    """
+    def setUp(self):
+        """Create a service on a temporary database with some tasks"""
+        super().setUp()
+        UserService(self.connections)
+        self.task_service = TaskService(self.connections)
+        for i in range(7):
+            self.task_service.add_task(Task(
+                title=f"task {i}",
+                description="lazy",
+                assigned_date="2020-01-01",
+                due_date="2020-02-01",
+                user="admin"
+            ))
+
+    def test_iter_matches_lists(self):
+        """Iterators yield the same tasks as the list methods"""
+        def ids(tasks):
+            return [task.task_id for task in tasks]
+
+        iter_all = self.task_service.iter_all_tasks(batch_size=3)
+        self.assertNotIsInstance(iter_all, list)
+        self.assertEqual(ids(iter_all),
+                         ids(self.task_service.view_all_tasks()))
+        self.assertEqual(
+            ids(self.task_service.iter_my_tasks("admin", batch_size=2)),
+            ids(self.task_service.get_my_tasks("admin")))
+        self.assertEqual(
+            ids(self.task_service.iter_overdue_tasks(batch_size=2)),
+            ids(self.task_service.overdue_tasks()))
+
+
+class TestServiceCache(DatabaseTestCase):
+    """
+    Unit testing of the get_task/get_user cache in the services.
+    """
+    # A second manager opens the same database
+    in_memory = False
+
+    def setUp(self):
+        """Create services on a temporary database with one task"""
+        super().setUp()
+        self.user_service = UserService(self.connections)
+        self.task_service = TaskService(self.connections)
+        self.task_id = self.task_service.add_task(Task(
+            title="cached",
+            description="cache test",
+            assigned_date="2025-01-01",
+            due_date="2025-02-01",
+            user="admin"
+        ))
+
+    def test_repeated_lookups_hit_cache(self):
+        """A second lookup of the same task is served from the cache"""
+        self.task_service.get_task(self.task_id)
+        self.task_service.get_task(self.task_id)
+
+        stats = self.task_service.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_own_writes_invalidate(self):
+        """Updating or completing a task is seen by the next lookup"""
+        task = self.task_service.get_task(self.task_id)
+        self.task_service.update_task(Task(
+            title="renamed",
+            description=task.description,
+            assigned_date=task.assigned_date,
+            due_date=task.due_date,
+            user=task.user,
+            task_id=task.task_id
+        ))
+        self.assertEqual(self.task_service.get_task(self.task_id).title,
+                         "renamed")
+
+        self.task_service.mark_complete(self.task_id)
+        self.assertEqual(
+            self.task_service.get_task(self.task_id).is_complete, "Yes")
+
+        self.task_service.delete_task(self.task_id)
+        self.assertIsNone(self.task_service.get_task(self.task_id))
+
+    def test_other_connection_changes_detected(self):
+        """Changes committed by another connection clear the cache"""
+        self.task_service.get_task(self.task_id)
+        self.assertEqual(self.user_service.get_user(1).is_admin, "Yes")
+
+        other = ConnectionManager(self.path)
+        try:
+            TaskService(other).mark_complete(self.task_id)
+        finally:
+            other.close_all()
+
+        self.assertEqual(
+            self.task_service.get_task(self.task_id).is_complete, "Yes")
+
+    def test_user_rename_invalidates_username(self):
+        """Renaming a user drops the cached lookup of the old username"""
+        user_id = self.user_service.add_user(
+            User(username="old", password="pwd", email="old@test.com"))
+        self.assertEqual(self.user_service.assignee_exists("old"), "old")
+
+        user = self.user_service.get_user(user_id)
+        self.user_service.update_user(User(
+            username="new",
+            password=user.password,
+            email=user.email,
+            user_id=user_id
+        ))
+
+        self.assertIsNone(self.user_service.assignee_exists("old"))
+        self.assertEqual(self.user_service.get_user(user_id).username, "new")
+
+
+class TestQueryPlans(DatabaseTestCase):
+    """
+    Query plan regression tests for the TaskRepository listing queries.
+    Each query is captured as it runs and checked with EXPLAIN QUERY PLAN
+    to make sure it uses an index instead of scanning the tasks table.
+    """
+    def setUp(self):
+        """Create repositories on a temporary database"""
+        super().setUp()
+        UserRepository(self.connections)
+        self.task_repository = TaskRepository(self.connections)
+
+    def query_plans(self, method, *args):
+        """Runs a repository method and returns the plan of each query"""
+        db = self.connections.get_connection()
+        statements = []
+        db.set_trace_callback(statements.append)
+        try:
+            method(*args)
+        finally:
+            db.set_trace_callback(None)
+
+        plans = []
+        for statement in statements:
+            if statement.lstrip().upper().startswith("SELECT"):
+                rows = db.execute("EXPLAIN QUERY PLAN " + statement)
+                plans.append([row[3] for row in rows])
+        return plans
+
+    def assert_no_full_scan(self, plans):
+        """Fails if any query plan scans a table"""
+        self.assertTrue(plans)
+        for plan in plans:
+            for detail in plan:
+                self.assertFalse(detail.startswith("SCAN"), plan)
+
+    def test_get_my_tasks_uses_index(self):
+        """get_my_tasks searches by user through an index"""
+        self.assert_no_full_scan(
+            self.query_plans(self.task_repository.get_my_tasks, "admin"))
+
+    def test_completed_tasks_uses_index(self):
+        """completed_tasks searches by status through an index"""
+        self.assert_no_full_scan(
+            self.query_plans(self.task_repository.completed_tasks))
+
+    def test_overdue_tasks_uses_index(self):
+        """overdue_tasks searches by status and due date through an index"""
+        self.assert_no_full_scan(
+            self.query_plans(self.task_repository.overdue_tasks))
+
+    def test_pages_seek_without_sorting(self):
+        """Paged listings seek to the cursor and read rows in index order"""
+        pages = [
+            (self.task_repository.view_all_tasks_page, 5),
+            (self.task_repository.get_my_tasks_page, "admin", 5),
+            (self.task_repository.completed_tasks_page, 5),
+            (self.task_repository.overdue_tasks_page, "2025-01-01", 5),
+        ]
+        for method, *args in pages:
+            plans = self.query_plans(method, *args)
+            self.assert_no_full_scan(plans)
+            for plan in plans:
+                self.assertNotIn("USE TEMP B-TREE FOR ORDER BY", plan)
+
+    def test_pages_cover_listing(self):
+        """Following page cursors returns every task exactly once"""
+        for day in (3, 1, 2, 1, 3, 2, 1):
+            self.task_repository.add_task("t", "d", "2020-01-01",
+                                          f"2020-02-0{day}", "admin")
+
+        pages = []
+        cursor = (None, 0)
+        while True:
+            page = self.task_repository.overdue_tasks_page(*cursor, limit=3)
+            if not page:
+                break
+            pages.extend(page)
+            cursor = (page[-1][4], page[-1][0])
+
+        self.assertEqual(pages, sorted(self.task_repository.overdue_tasks(),
+                                       key=lambda task: (task[4], task[0])))
+
+    def test_overdue_tasks_page_rejects_invalid_date(self):
+        """Malformed page cursors raise ValueError instead of matching"""
+        for value in ("foo", "2020/01/05", "2020-02-30"):
+            with self.assertRaises(ValueError):
+                self.task_repository.overdue_tasks_page(value, 0)
+
+        self.task_repository.add_task("t", "d", "2020-01-01", "2020-01-06",
+                                      "admin")
+        self.assertEqual(
+            self.task_repository.overdue_tasks_page("2020-1-5", 0),
+            self.task_repository.overdue_tasks_page("2020-01-05", 0))
+        self.assertTrue(
+            self.task_repository.overdue_tasks_page("2020-1-5", 0))
+
+
+class TestMigrations(DatabaseTestCase):
+    """
+    Tests that databases using the original text based schema are upgraded
+    in place without changing what the services return.
+    """
+    in_memory = False
+
+    def setUp(self):
+        """Create a database with the original schema and some rows"""
+        super().setUp()
+        db = sqlite3.connect(self.path)
+        db.execute(
+            """
+            CREATE TABLE tasks(id INTEGER PRIMARY KEY, title TEXT,
+            description TEXT, assignedDate TEXT, dueDate TEXT,
+            isComplete TEXt DEFAULT "No", user TEXT)
+            """
+        )
+        db.execute(
+            """
+            CREATE TABLE user(id INTEGER PRIMARY KEY, username TEXT UNIQUE,
+            password TEXT, email TEXT, isAdmin TEXT DEFAULT "No")
+            """
+        )
+        db.execute("INSERT INTO user VALUES(1, 'admin', 'admin', "
+                   "'test@test.com', 'Yes')")
+        db.execute("INSERT INTO user VALUES(2, 'bob', 'pwd', "
+                   "'bob@test.com', 'No')")
+        db.execute("INSERT INTO tasks VALUES(1, 'old task', 'old', "
+                   "'2025-01-02', '2025-03-04', 'Yes', 'bob')")
+        db.execute("INSERT INTO tasks VALUES(2, 'lost task', 'old', "
+                   "'2025-01-02', '2025-03-04', 'No', 'gone')")
+        db.commit()
+        db.close()
+
+    def test_upgrade_keeps_values(self):
+        """Upgraded rows read back the same through the services"""
+        task_service = TaskService(self.connections)
+        user_service = UserService(self.connections)
+
+        task = task_service.get_task(1)
+        self.assertEqual(task.assigned_date, "2025-01-02")
+        self.assertEqual(task.due_date, "2025-03-04")
+        self.assertEqual(task.is_complete, "Yes")
+        self.assertEqual(task.user, "bob")
+
+        users = {user.username: user for user in
+                 user_service.view_all_users()}
+        self.assertEqual(users["admin"].is_admin, "Yes")
+        self.assertEqual(users["bob"].is_admin, "No")
+
+    def test_upgrade_stores_integers(self):
+        """Dates and flags are stored as integers after the upgrade"""
+        TaskService(self.connections)
+        db = self.connections.get_connection()
+
+        self.assertEqual(schema_version(db), SCHEMA_VERSION)
+        row = db.execute(
+            "SELECT assignedDate, dueDate, isComplete FROM tasks"
+        ).fetchone()
+        self.assertEqual(row, (20250102, 20250304, 1))
+
+    def test_upgrade_counts_existing_tasks(self):
+        """Task counters are filled in from the existing tasks"""
+        stats = TaskService(self.connections).task_stats()
+
+        self.assertEqual([stat.to_dict() for stat in stats],
+                         [{"user": "", "open": 1, "completed": 0,
+                           "total": 1},
+                          {"user": "bob", "open": 0, "completed": 1,
+                           "total": 1}])
+
+    def test_upgrade_links_tasks_to_user_ids(self):
+        """Assignees become user IDs, unknown usernames are kept aside"""
+        task_service = TaskService(self.connections)
+        db = self.connections.get_connection()
+
+        self.assertEqual(
+            db.execute("SELECT id, userId, legacy_user FROM tasks "
+                       "ORDER BY id").fetchall(),
+            [(1, 2, None), (2, None, "gone")])
+        self.assertIsNone(task_service.get_task(2).user)
+
+
+class TestBulkImport(DatabaseTestCase):
+    """
+    Unit testing of TaskRepository.bulk_import_tasks.
+    """
+    def setUp(self):
+        """Create repositories on a temporary database"""
+        super().setUp()
+        UserRepository(self.connections)
+        self.task_repository = TaskRepository(self.connections)
+        self.tasks_file = os.path.join(self.tmp.name, "tasks.txt")
+
+    def test_bulk_import_tasks(self):
+        """Valid lines are added and invalid lines are counted"""
+        with open(self.tasks_file, "w", encoding="utf-8") as file:
+            file.write("1,first,desc,2025-01-01,2025-02-01,no,admin\n")
+            file.write("2,second,desc,2025-01-01,2025-02-01,yes,admin\n")
+            file.write("\n")
+            file.write("3,bad date,desc,2025-02-30,2025-03-01,No,admin\n")
+            file.write("4,no user,desc,2025-01-01,2025-02-01,No,nobody\n")
+            file.write("x,bad id,desc,2025-01-01,2025-02-01,No,admin\n")
+            file.write("1,duplicate,desc,2025-01-01,2025-02-01,No,admin\n")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            summary = self.task_repository.bulk_import_tasks(
+                chunk_size=2, file_path=self.tasks_file)
+
+        self.assertEqual(summary["added"], 2)
+        self.assertEqual(summary["existing"], 1)
+        self.assertEqual(sum(summary["skipped"].values()), 3)
+
+        task = self.task_repository.get_task(2)
+        self.assertEqual(task, (2, "second", "desc", "2025-01-01",
+                                "2025-02-01", "Yes", "admin"))
+
+    def import_both_ways(self, lines):
+        """Imports users then tasks sequentially and with 2 workers"""
+        users_file = os.path.join(self.tmp.name, "users.txt")
+        with open(users_file, "w", encoding="utf-8") as file:
+            file.write("2,bob,pwd,bob@test.com,no\n")
+            file.write("3,admin,pwd,clash@test.com,no\n")
+            file.write("1,carol,pwd,carol@test.com,no\n")
+            file.write("4,dave,pwd,not-an-email,no\n")
+            file.write("5,erin,pwd,erin@test.com,yes\n")
+            file.write("6,bob,pwd,bob2@test.com,no\n")
+        with open(self.tasks_file, "w", encoding="utf-8") as file:
+            file.writelines(lines)
+
+        results = []
+        for workers in (1, 2):
+            connections = ConnectionManager(
+                os.path.join(self.tmp.name, f"workers{workers}.db"))
+            user_repository = UserRepository(connections)
+            task_repository = TaskRepository(connections)
+            with contextlib.redirect_stdout(io.StringIO()):
+                user_summary = user_repository.bulk_import_users(
+                    chunk_size=2, file_path=users_file, workers=workers)
+                task_summary = task_repository.bulk_import_tasks(
+                    chunk_size=3, file_path=self.tasks_file,
+                    workers=workers)
+            results.append((
+                user_summary["added"], user_summary["skipped"],
+                task_summary["added"], task_summary["skipped"],
+                task_summary["existing"],
+                user_repository.view_all_users(),
+                task_repository.view_all_tasks(),
+            ))
+            connections.close_all()
+        return results
+
+    def test_parallel_import_matches_sequential(self):
+        """Importing with a process pool gives the same result"""
+        lines = []
+        for i in range(1, 40):
+            user = ("admin", "bob", "erin", "nobody")[i % 4]
+            due = "2025-02-30" if i % 7 == 0 else "2025-02-01"
+            lines.append(f"{i % 30},task {i},desc,2025-01-01,{due},No,"
+                         f"{user}\n")
+        lines.append("bad line\n")
+
+        sequential, parallel = self.import_both_ways(lines)
+        self.assertEqual(sequential, parallel)
+        self.assertEqual(sequential[0], 2)
+        self.assertEqual(sum(sequential[1].values()), 4)
+
+    def test_csv_round_trip(self):
+        """Exported text with commas, quotes and newlines imports intact"""
+        user_repository = UserRepository(self.connections)
+        user_repository.add_user("o'brien, jr", 'pa"ss,word', "ob@test.com")
+        self.task_repository.add_task("Buy milk, eggs", 'Say "hi"\nthen go',
+                                      "2025-01-01", "2025-02-01",
+                                      "o'brien, jr")
+        self.task_repository.add_task("Plain", "text", "2025-01-01",
+                                      "2025-02-01", "admin")
+        users_file = os.path.join(self.tmp.name, "users.txt")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(
+                self.task_repository.export_tasks(self.tasks_file), 2)
+            self.assertEqual(user_repository.export_users(users_file), 2)
+
+            connections = ConnectionManager(
+                os.path.join(self.tmp.name, "copy.db"))
+            user_copy = UserRepository(connections)
+            task_copy = TaskRepository(connections)
+            user_summary = user_copy.bulk_import_users(file_path=users_file)
+            task_summary = task_copy.bulk_import_tasks(
+                file_path=self.tasks_file)
+
+        self.assertEqual((user_summary["added"], user_summary["existing"]),
+                         (1, 1))
+        self.assertEqual(task_summary["added"], 2)
+        self.assertFalse(task_summary["skipped"])
+        self.assertEqual(user_copy.view_all_users(),
+                         user_repository.view_all_users())
+        self.assertEqual(task_copy.view_all_tasks(),
+                         self.task_repository.view_all_tasks())
+        connections.close_all()
+
+    def test_unassigned_task_round_trip(self):
+        """Tasks left unassigned by a deleted user import unassigned"""
+        user_repository = UserRepository(self.connections)
+        user_repository.add_user("carol", "pwd", "carol@test.com")
+        self.task_repository.add_task("Orphan", "desc", "2025-01-01",
+                                      "2025-02-01", "carol")
+        self.task_repository.add_task("Kept", "desc", "2025-01-01",
+                                      "2025-02-01", "admin")
+        user_repository.delete_user(2)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(
+                self.task_repository.export_tasks(self.tasks_file), 2)
+
+            copies = []
+            for bulk in (True, False):
+                connections = ConnectionManager(
+                    os.path.join(self.tmp.name, f"bulk{bulk}.db"))
+                UserRepository(connections)
+                task_copy = TaskRepository(connections)
+                if bulk:
+                    summary = task_copy.bulk_import_tasks(
+                        file_path=self.tasks_file)
+                    self.assertEqual(summary["added"], 2)
+                    self.assertFalse(summary["skipped"])
+                else:
+                    with mock.patch("task_manager.data_access.TASKS_FILE",
+                                    self.tasks_file):
+                        task_copy.import_tasks()
+                copies.append(task_copy.view_all_tasks())
+                connections.close_all()
+
+        self.assertIsNone(self.task_repository.get_task(1)[6])
+        for tasks in copies:
+            self.assertEqual(tasks, self.task_repository.view_all_tasks())
+
+    def test_missing_import_file_is_named(self):
+        """A missing import file is reported by the path that was given"""
+        missing = os.path.join(self.tmp.name, "missing.txt")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertIsNone(
+                self.task_repository.bulk_import_tasks(file_path=missing))
+            self.assertIsNone(UserRepository(self.connections)
+                              .bulk_import_users(file_path=missing))
+        self.assertEqual(output.getvalue().count(f"'{missing}' not found"),
+                         2)
+
+    def test_failed_export_keeps_previous_file(self):
+        """An export that fails leaves the previous file untouched"""
+        users_file = os.path.join(self.tmp.name, "users.txt")
+        for path in (self.tasks_file, users_file):
+            with open(path, "w", encoding="utf-8") as file:
+                file.write("previous export\n")
+        db = self.connections.get_connection()
+        db.execute("DROP TABLE tasks")
+        db.execute("DROP TABLE user")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertIsNone(
+                self.task_repository.export_tasks(self.tasks_file))
+            self.assertIsNone(UserRepository(self.connections)
+                              .export_users(users_file))
+
+        for path in (self.tasks_file, users_file):
+            with open(path, encoding="utf-8") as file:
+                self.assertEqual(file.read(), "previous export\n")
+        self.assertFalse([name for name in os.listdir(self.tmp.name)
+                          if name.endswith(".partial")])
+
+    def test_headerless_and_other_dialects(self):
+        """Files without a header row and other CSV dialects are read"""
+        with open(self.tasks_file, "w", encoding="utf-8") as file:
+            file.write("1,old, file,2025-01-01,2025-02-01,No,admin\n")
+        with contextlib.redirect_stdout(io.StringIO()):
+            summary = self.task_repository.bulk_import_tasks(
+                file_path=self.tasks_file)
+        self.assertEqual(summary["added"], 1)
+        self.assertEqual(self.task_repository.get_task(1)[1:3],
+                         ("old", "file"))
+
+        with open(self.tasks_file, "w", encoding="utf-8") as file:
+            file.write("task_id\ttitle\tdescription\tassigned_date\t"
+                       "due_date\tis_complete\tuser\n")
+            file.write("2\ttab, separated\td\t2025-01-01\t2025-02-01\t"
+                       "Yes\tadmin\n")
+        with contextlib.redirect_stdout(io.StringIO()):
+            summary = self.task_repository.bulk_import_tasks(
+                file_path=self.tasks_file, dialect="excel-tab")
+        self.assertEqual(summary["added"], 1)
+        self.assertEqual(self.task_repository.get_task(2)[1],
+                         "tab, separated")
+
+
+class TestStorageProfiles(DatabaseTestCase):
+    """
+    Tests that storage profile pragmas are applied to new connections.
+    Each test opens self.path with its own profile.
+    """
+    in_memory = False
+
+    def pragma(self, db, name):
+        """Returns the current value of a pragma"""
+        return db.execute(f"PRAGMA {name}").fetchone()[0]
+
+    def test_fast_profile(self):
+        """Test the fast profile uses WAL with relaxed syncing"""
+        connections = ConnectionManager(self.path, profile="fast")
+        db = connections.get_connection()
+
+        self.assertEqual(self.pragma(db, "journal_mode"), "wal")
+        # NORMAL is 1, FULL is 2
+        self.assertEqual(self.pragma(db, "synchronous"), 1)
+        self.assertEqual(self.pragma(db, "busy_timeout"), 5000)
+        connections.close_all()
+
+    def test_custom_profile(self):
+        """Test a dictionary of pragmas can be used as a profile"""
+        connections = ConnectionManager(
+            self.path, profile={"synchronous": "OFF", "cache_size": -1000})
+        db = connections.get_connection()
+
+        self.assertEqual(self.pragma(db, "synchronous"), 0)
+        self.assertEqual(self.pragma(db, "cache_size"), -1000)
+        connections.close_all()
+
+    def test_invalid_profiles(self):
+        """Test unknown profiles, pragmas and values are rejected"""
+        with self.assertRaises(ValueError):
+            ConnectionManager(self.path, profile="turbo")
+        with self.assertRaises(ValueError):
+            ConnectionManager(self.path, profile={"foreign_keys": 1})
+        with self.assertRaises(ValueError):
+            ConnectionManager(self.path,
+                              profile={"synchronous": "OFF; DROP"})
+
+
+class TestDatabaseLocation(unittest.TestCase):
+    """
+    Tests that the database can be a file, a URI or in memory.
+    """
+    def add_task(self, connections, title="t"):
+        """Adds a task for admin and returns its ID"""
+        UserService(connections)
+        return TaskService(connections).add_task(Task(
+            title=title, description="d", assigned_date="2025-01-01",
+            due_date="2025-02-01", user="admin"))
+
+    def count_tasks(self, connections):
+        """Returns the number of tasks seen through a manager"""
+        return len(TaskService(connections).view_all_tasks())
+
+    def test_memory_databases_are_independent(self):
+        """Test each in-memory manager has its own database"""
+        first = ConnectionManager(":memory:")
+        second = ConnectionManager(":memory:")
+        self.add_task(first)
+
+        self.assertEqual(self.count_tasks(first), 1)
+        self.assertEqual(self.count_tasks(second), 0)
+        self.assertIsNone(first.path)
+        first.close_all()
+        second.close_all()
+
+    def test_memory_database_shared_by_threads(self):
+        """Test threads share the manager's in-memory database until
+        close_all"""
+        connections = ConnectionManager(":memory:")
+        ids = []
+
+        def add():
+            ids.append(self.add_task(connections, "from thread"))
+            connections.close_connection()
+
+        thread = threading.Thread(target=add)
+        thread.start()
+        thread.join()
+
+        self.assertEqual(TaskService(connections).get_task(ids[0]).title,
+                         "from thread")
+        connections.close_all()
+        self.assertEqual(self.count_tasks(connections), 0)
+        connections.close_all()
+
+    def test_uri_and_environment(self):
+        """Test file: URIs and $TASK_MANAGER_DATABASE name the database"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "uri test.db")
+            uri = f"file:{path.replace(' ', '%20')}?cache=private"
+            connections = ConnectionManager(uri)
+            self.add_task(connections)
+            connections.close_all()
+
+            self.assertEqual(connections.path, Path(path))
+            with mock.patch.dict(os.environ, {DATABASE_ENV: path}):
+                self.assertEqual(configured_database(), path)
+                plain = ConnectionManager(configured_database())
+                self.assertEqual(self.count_tasks(plain), 1)
+                plain.close_all()
+
+    def test_backup_of_memory_database(self):
+        """Test an in-memory database can be backed up and restored"""
+        connections = ConnectionManager(":memory:")
+        self.add_task(connections)
+        with tempfile.TemporaryDirectory() as tmp, \
+                contextlib.redirect_stdout(io.StringIO()):
+            summary = backup_database(connections, tmp)
+            copy = ConnectionManager(":memory:")
+            restore_database(summary["backup"], copy)
+
+        self.assertEqual(self.count_tasks(copy), 1)
+        connections.close_all()
+        copy.close_all()
+
+
+class TestAsyncServices(DatabaseTestCase,
+                        unittest.IsolatedAsyncioTestCase):
+    """
+    Unit testing of the AsyncTaskService.
+    """
+    def setUp(self):
+        """Create services on a temporary database with some tasks"""
+        super().setUp()
+        UserService(self.connections)
+        self.task_service = TaskService(self.connections)
+        self.async_service = AsyncTaskService(self.connections, max_workers=1)
+        for i in range(5):
+            self.task_service.add_task(Task(
+                title=f"task {i}",
+                description="async",
+                assigned_date="2020-01-01",
+                due_date="2020-02-01",
+                user="admin"
+            ))
+
+    async def asyncTearDown(self):
+        """Stop the worker threads"""
+        await self.async_service.close()
+
+    async def test_concurrent_calls_match_sync(self):
+        """Test concurrent async calls return the same as the sync service"""
+        tasks = await asyncio.gather(
+            *(self.async_service.get_task(i) for i in range(1, 6)))
+        mine = await self.async_service.get_my_tasks("admin")
+
+        self.assertEqual([task.title for task in tasks],
+                         [f"task {i}" for i in range(5)])
+        self.assertEqual([task.task_id for task in mine],
+                         [task.task_id
+                          for task in self.task_service.get_my_tasks("admin")])
+
+    async def test_async_iteration(self):
+        """Test the async generators read every task across batches"""
+        tasks = [task async for task in
+                 self.async_service.iter_overdue_tasks(batch_size=2)]
+
+        self.assertEqual([task.task_id for task in tasks], [1, 2, 3, 4, 5])
+
+    async def test_search_tasks(self):
+        """Test async search returns the same tasks as the sync service"""
+        tasks = await self.async_service.search_tasks("task")
+
+        self.assertEqual(
+            sorted(task.task_id for task in tasks),
+            sorted(task.task_id
+                   for task in self.task_service.search_tasks("task")))
+        self.assertEqual(len(tasks), 5)
+
+    async def test_task_stats(self):
+        """Test async stats count every task"""
+        stats = await self.async_service.task_stats()
+
+        self.assertEqual([(row.user, row.open, row.completed, row.total)
+                          for row in stats], [("admin", 5, 0, 5)])
+
+    async def test_apply_batch(self):
+        """Test an async batch is applied in one call"""
+        await self.async_service.apply_batch([
+            ("add", Task(title="batch", description="async",
+                         assigned_date="2020-01-01", due_date="2020-02-01",
+                         user="admin")),
+            ("complete", 1),
+            ("delete", 2),
+        ])
+
+        self.assertIsNone(await self.async_service.get_task(2))
+        self.assertEqual((await self.async_service.get_task(1)).is_complete,
+                         "Yes")
+        self.assertEqual(len(await self.async_service.view_all_tasks()), 5)
+
+    async def test_timed_out_call_never_runs(self):
+        """Test a call that times out while queued is cancelled"""
+        release = threading.Event()
+        # Keep the only worker thread busy
+        self.async_service.executor.submit(release.wait)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(self.async_service.delete_task(1), 0.05)
+        release.set()
+
+        self.assertIsNotNone(await self.async_service.get_task(1))
+
+
+class TestApiServer(DatabaseTestCase):
+    """
+    Unit testing of the JSON API server, run against a temporary database.
+    """
+    def setUp(self):
+        """Start a server with an admin and a standard user"""
+        super().setUp()
+        UserService(self.connections).add_user(
+            User(username="bob", password="pwd", email="bob@test.com"))
+
+        self.server = PooledHTTPServer(("127.0.0.1", 0), 2, self.connections)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.client = http.client.HTTPConnection(
+            "127.0.0.1", self.server.server_address[1], timeout=5)
+
+    def tearDown(self):
+        """Stop the server and remove the temporary database"""
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        super().tearDown()
+
+    def request(self, method, path, login=("admin", "admin"), body=None):
+        """Sends a request on the kept alive connection"""
+        headers = {}
+        if login:
+            token = base64.b64encode(":".join(login).encode()).decode()
+            headers["Authorization"] = f"Basic {token}"
+        if body is not None:
+            body = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.client.request(method, path, body, headers)
+            response = self.client.getresponse()
+            return response.status, json.loads(response.read())
+
+    def test_login_required(self):
+        """Test requests without a valid login are refused"""
+        self.assertEqual(self.request("GET", "/tasks", login=None)[0], 401)
+        self.assertEqual(
+            self.request("GET", "/tasks", login=("bob", "wrong"))[0], 401)
+
+        self.assertEqual(self.request("GET", "/me", login=("bob", "pwd")),
+                         (200, {"username": "bob", "role": "user"}))
+
+    def test_role_checks(self):
+        """Test admin only routes are refused for standard users"""
+        self.assertEqual(
+            self.request("GET", "/users", login=("bob", "pwd"))[0], 403)
+
+        status, result = self.request("GET", "/users")
+        self.assertEqual(status, 200)
+        self.assertEqual([user["username"] for user in result["users"]],
+                         ["admin", "bob"])
+        self.assertNotIn("password", result["users"][0])
+
+    def test_task_lifecycle(self):
+        """Test adding, reading and completing a task"""
+        status, task = self.request("POST", "/tasks", body={
+            "title": "api task", "description": "from the api",
+            "due_date": "2099-01-01", "user": "bob"})
+        self.assertEqual(status, 201)
+        self.assertEqual(task["user"], "bob")
+
+        path = f"/tasks/{task['task_id']}"
+        self.assertEqual(self.request("GET", path)[1]["title"], "api task")
+
+        # Admin tasks can't be completed by bob, his own can
+        _, admin_task = self.request("POST", "/tasks", body={
+            "title": "admin task", "description": "admin",
+            "due_date": "2099-01-01"})
+        self.assertEqual(
+            self.request("POST", f"/tasks/{admin_task['task_id']}/complete",
+                         login=("bob", "pwd"))[0], 403)
+
+        status, task = self.request("POST", path + "/complete",
+                                    login=("bob", "pwd"))
+        self.assertEqual((status, task["is_complete"]), (200, "Yes"))
+        self.assertEqual(self.request("PUT", path, body={"title": "x"})[0],
+                         409)
+
+    def test_invalid_requests(self):
+        """Test bad input is rejected with a JSON error"""
+        status, result = self.request("POST", "/tasks", body={
+            "title": "late", "description": "late",
+            "due_date": "2000-01-01"})
+        self.assertEqual(status, 400)
+        self.assertIn("error", result)
+
+        self.assertEqual(self.request("GET", "/tasks/999")[0], 404)
+        self.assertEqual(self.request("DELETE", "/tasks")[0], 405)
+
+        status, result = self.request(
+            "GET", "/tasks/overdue?after_due_date=foo")
+        self.assertEqual(status, 400)
+        self.assertIn("after_due_date", result["error"])
+
+    def test_unexpected_error(self):
+        """Test unexpected errors still get a JSON response"""
+        with mock.patch.object(self.server.task_service,
+                               "overdue_tasks_page",
+                               side_effect=RuntimeError("boom")), \
+                mock.patch("http.server.BaseHTTPRequestHandler.log_message"):
+            status, result = self.request("GET", "/tasks/overdue")
+        self.assertEqual(status, 500)
+        self.assertEqual(result, {"error": "Internal server error."})
+        self.assertEqual(self.request("GET", "/tasks/overdue")[0], 200)
+
+
+class TestCli(DatabaseTestCase):
+    """
+    Unit testing of the command line interface and batch operations.
+    """
+    # The CLI opens the database by its path
+    in_memory = False
+
+    def setUp(self):
+        """Create a temporary database with a standard user"""
+        super().setUp()
+        UserService(self.connections).add_user(
+            User(username="bob", password="pwd", email="bob@test.com"))
+        self.connections.close_all()
+
+    def run_cli(self, *args, login=("admin", "admin"), stdin=""):
+        """Runs the CLI, returns (exit status, JSON output lines)"""
+        out = io.StringIO()
+        argv = ["--database", self.path, "-u", login[0], "-p", login[1]]
+        with contextlib.redirect_stderr(io.StringIO()):
+            status = cli_main(argv + list(args), io.StringIO(stdin), out)
+        return status, [json.loads(line)
+                        for line in out.getvalue().splitlines()]
+
+    def test_batch_applies_operations(self):
+        """Test NDJSON operations are all applied"""
+        lines = [json.dumps({"op": "add", "title": f"t{i}",
+                             "description": "d", "due_date": "2099-01-01"})
+                 for i in range(50)]
+        lines.append(json.dumps({"op": "complete", "task_id": 1}))
+        lines.append(json.dumps({"op": "delete", "task_id": 2}))
+
+        status, output = self.run_cli("batch", stdin="\n".join(lines))
+
+        self.assertEqual(status, 0)
+        self.assertEqual(output[0]["added"], 50)
+        self.assertEqual(output[0]["completed"], 1)
+        self.assertEqual(output[0]["deleted"], 1)
+        self.assertEqual(len(self.run_cli("list", "all")[1]), 49)
+
+    def test_invalid_batch_changes_nothing(self):
+        """Test one invalid CSV operation stops the whole batch"""
+        csv_input = ("op,task_id,title,description,due_date,user\n"
+                     "add,,t,d,2099-01-01,bob\n"
+                     "add,,t,d,2099-01-01,nobody\n")
+
+        status, _ = self.run_cli("batch", "--format", "csv", stdin=csv_input)
+
+        self.assertEqual(status, 1)
+        self.assertEqual(self.run_cli("list", "all")[1], [])
+
+    def test_role_checks(self):
+        """Test standard users can't delete or use admin listings"""
+        self.run_cli("add", "--title", "t", "--description", "d",
+                     "--due-date", "2099-01-01")
+
+        self.assertEqual(self.run_cli("delete", "1", login=("bob", "pwd"))[0],
+                         1)
+        self.assertEqual(self.run_cli("list", "all", login=("bob", "pwd"))[0],
+                         1)
+        self.assertEqual(self.run_cli("list", login=("bob", "wrong"))[0], 2)
+
+    def test_backup_and_restore(self):
+        """Test the backup and restore commands round trip the database"""
+        self.run_cli("add", "--title", "t", "--description", "d",
+                     "--due-date", "2099-01-01")
+        status, output = self.run_cli("backup", "--directory",
+                                      self.tmp.name, "--pages", "1")
+        self.assertEqual(status, 0)
+        self.run_cli("delete", "1")
+
+        status, _ = self.run_cli("restore", output[0]["backup"])
+
+        self.assertEqual(status, 0)
+        self.assertEqual(self.run_cli("get", "1")[1][0]["title"], "t")
+        self.assertEqual(self.run_cli("backup", login=("bob", "pwd"))[0], 1)
+
+
+class TestTaskCounts(DatabaseTestCase):
+    """
+    Tests that the trigger maintained task counters match the tasks.
+    """
+    def setUp(self):
+        """Create services on a temporary database with two users"""
+        super().setUp()
+        self.user_service = UserService(self.connections)
+        self.user_service.add_user(
+            User(username="bob", password="pwd", email="bob@test.com"))
+        self.task_service = TaskService(self.connections)
+
+    def counted(self):
+        """Counts the tasks of each user directly from the tasks table"""
+        db = self.connections.get_connection()
+        return db.execute(
+            """
+            SELECT username, SUM(isComplete = 0), SUM(isComplete = 1),
+                   COUNT(*)
+            FROM tasks JOIN user ON user.id = tasks.userId
+            GROUP BY username
+            ORDER BY username
+            """
+        ).fetchall()
+
+    def stats(self):
+        """Returns the counters as rows"""
+        return [(stat.user, stat.open, stat.completed, stat.total)
+                for stat in self.task_service.task_stats()]
+
+    def test_counts_follow_changes(self):
+        """Test adding, completing, reassigning and deleting tasks"""
+        for i in range(6):
+            self.task_service.add_task(Task(
+                title=f"task {i}", description="count",
+                assigned_date="2025-01-01", due_date="2025-02-01",
+                user="admin" if i % 2 else "bob"))
+        self.task_service.mark_complete(1)
+        self.task_service.mark_complete(2)
+
+        task = self.task_service.get_task(3)
+        task = Task(task.title, task.description, task.assigned_date,
+                    task.due_date, "admin", task.task_id)
+        self.task_service.update_task(task)
+        self.task_service.delete_task(4)
+        self.task_service.apply_batch([("complete", 5), ("delete", 6)])
+
+        self.assertEqual(self.stats(), self.counted())
+        self.assertEqual(self.stats(), [("admin", 1, 1, 2), ("bob", 0, 2, 2)])
+
+        # Users whose tasks are all deleted have no row
+        for task_id in (1, 2, 3, 5):
+            self.task_service.delete_task(task_id)
+        self.assertEqual(self.stats(), [])
+
+
+class TestUserReferences(DatabaseTestCase):
+    """
+    Tests that tasks follow their assignee through renames and deletes.
+    """
+    def setUp(self):
+        """Create services on a temporary database with a user and tasks"""
+        super().setUp()
+        self.user_service = UserService(self.connections)
+        self.bob_id = self.user_service.add_user(
+            User(username="bob", password="pwd", email="bob@test.com"))
+        self.task_service = TaskService(self.connections)
+        for user in ("bob", "bob", "admin"):
+            self.task_service.add_task(Task(
+                title="task", description="owned",
+                assigned_date="2025-01-01", due_date="2025-02-01",
+                user=user))
+
+    def rename_bob(self, username):
+        """Renames bob through the user service"""
+        user = self.user_service.get_user(self.bob_id)
+        self.user_service.update_user(User(username, user.password,
+                                           user.email, user_id=self.bob_id))
+
+    def test_rename_keeps_tasks(self):
+        """Test a renamed user's tasks show and list under the new name"""
+        self.assertEqual(self.task_service.get_task(1).user, "bob")
+        self.rename_bob("robert")
+
+        self.assertEqual(self.task_service.get_task(1).user, "robert")
+        self.assertEqual(
+            [task.task_id
+             for task in self.task_service.get_my_tasks("robert")], [1, 2])
+        self.assertEqual(self.task_service.get_my_tasks("bob"), [])
+        self.assertEqual(
+            [(stat.user, stat.total)
+             for stat in self.task_service.task_stats()],
+            [("admin", 1), ("robert", 2)])
+
+    def test_delete_unassigns_tasks(self):
+        """Test deleting a user unassigns their tasks in one statement"""
+        self.user_service.delete_user(self.bob_id)
+
+        self.assertIsNone(self.task_service.get_task(1).user)
+        self.assertEqual(len(self.task_service.view_all_tasks()), 3)
+        self.assertEqual(
+            [(stat.user, stat.total)
+             for stat in self.task_service.task_stats()],
+            [("", 2), ("admin", 1)])
+
+    def test_unknown_assignee_rejected(self):
+        """Test tasks can't be added or moved to a user that doesn't
+        exist"""
+        task = self.task_service.get_task(1)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertIsNone(self.task_service.add_task(Task(
+                title="task", description="lost",
+                assigned_date="2025-01-01", due_date="2025-02-01",
+                user="nobody")))
+            self.assertFalse(self.task_service.update_task(Task(
+                title="renamed", description=task.description,
+                assigned_date=task.assigned_date, due_date=task.due_date,
+                user="nobody", task_id=1)))
+            with self.assertRaises(ValueError):
+                self.task_service.apply_batch([
+                    ("complete", 1),
+                    ("add", Task(title="task", description="lost",
+                                 assigned_date="2025-01-01",
+                                 due_date="2025-02-01", user="nobody"))])
+
+        self.assertEqual(output.getvalue().count("'nobody' does not exist"),
+                         3)
+        self.assertEqual(self.task_service.get_task(1).is_complete, "No")
+        self.assertEqual(len(self.task_service.view_all_tasks()), 3)
+        self.assertEqual(
+            (self.task_service.get_task(1).title,
+             self.task_service.get_task(1).user), ("task", "bob"))
+
+    def test_assignee_lookup_uses_indexes(self):
+        """Test tasks are found by user ID and joined by primary key"""
+        db = self.connections.get_connection()
+        statements = []
+        db.set_trace_callback(statements.append)
+        self.task_service.get_my_tasks("bob")
+        db.set_trace_callback(None)
+
+        plan = [row[3] for row in
+                db.execute("EXPLAIN QUERY PLAN " + statements[-1])]
+        self.assertFalse([detail for detail in plan
+                          if detail.startswith("SCAN")], plan)
+        self.assertTrue(any("idx_tasks_user_id" in detail
+                            for detail in plan), plan)
+
+
+class TestDeltaExport(DatabaseTestCase):
+    """
+    Tests that the delta export only writes what changed since the last
+    export, including tombstones for deleted tasks.
+    """
+    def setUp(self):
+        """Create services on a temporary database with some tasks"""
+        super().setUp()
+        self.user_service = UserService(self.connections)
+        self.bob_id = self.user_service.add_user(
+            User(username="bob", password="pwd", email="bob@test.com"))
+        self.task_repository = TaskRepository(self.connections)
+        self.changes_file = os.path.join(self.tmp.name, "changes.txt")
+        for i in range(5):
+            self.task_repository.add_task(f"task {i}", "d", "2025-01-01",
+                                          "2025-02-01",
+                                          "bob" if i == 4 else "admin")
+
+    def export(self, **kwargs):
+        """Exports the changes and returns (summary, rows by task ID)"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            summary = self.task_repository.export_task_changes(
+                self.changes_file, **kwargs)
+        with open(self.changes_file, encoding="utf-8", newline="") as file:
+            rows = {int(row["task_id"]): row
+                    for row in csv.DictReader(file)}
+        return summary, rows
+
+    def updated_at(self, task_id):
+        """Returns the stored change time of a task"""
+        db = self.connections.get_connection()
+        return db.execute("SELECT updatedAt FROM tasks WHERE id = ?",
+                          (task_id,)).fetchone()[0]
+
+    def test_write_paths_set_updated_at(self):
+        """Test every write moves updatedAt past all earlier changes"""
+        times = [self.updated_at(task_id) for task_id in range(1, 6)]
+        self.assertEqual(times, sorted(set(times)))
+
+        self.task_repository.update_task("new", "d", "2025-03-01", "admin",
+                                         1)
+        self.assertGreater(self.updated_at(1), times[-1])
+        self.task_repository.mark_complete(2)
+        self.assertGreater(self.updated_at(2), self.updated_at(1))
+        self.task_repository.apply_batch([("complete", 3)])
+        self.assertGreater(self.updated_at(3), self.updated_at(2))
+
+    def test_only_changes_are_exported(self):
+        """Test a second export holds just the changes and tombstones"""
+        summary, rows = self.export()
+        self.assertEqual((summary["changed"], summary["deleted"]), (5, 0))
+        self.assertEqual(sorted(rows), [1, 2, 3, 4, 5])
+
+        summary, rows = self.export()
+        self.assertEqual((summary["changed"], summary["deleted"]), (0, 0))
+
+        self.task_repository.mark_complete(1)
+        self.task_repository.delete_task(2)
+        new_id = self.task_repository.add_task("new", "d", "2025-01-01",
+                                               "2025-02-01", "admin")
+        user = self.user_service.get_user(self.bob_id)
+        self.user_service.update_user(User("robert", user.password,
+                                           user.email, user_id=self.bob_id))
+
+        summary, rows = self.export()
+        self.assertEqual((summary["changed"], summary["deleted"]), (3, 1))
+        self.assertEqual(sorted(rows), [1, 2, 5, new_id])
+        self.assertEqual(rows[1]["is_complete"], "Yes")
+        self.assertEqual(rows[2]["deleted"], "Yes")
+        self.assertEqual(rows[5]["user"], "robert")
+
+        # A failed export doesn't move the watermark
+        self.task_repository.mark_complete(3)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertIsNone(self.task_repository.export_task_changes(
+                os.path.join(self.tmp.name, "missing", "changes.txt")))
+        self.assertEqual(sorted(self.export()[1]), [3])
+
+    def test_since_overrides_watermark(self):
+        """Test since=-1 exports everything again"""
+        self.export()
+        summary, rows = self.export(since=-1)
+        self.assertEqual(summary["changed"], 5)
+
+    def test_delta_export_uses_indexes(self):
+        """Test changes are found without scanning the tasks table"""
+        db = self.connections.get_connection()
+        statements = []
+        db.set_trace_callback(statements.append)
+        self.export()
+        db.set_trace_callback(None)
+
+        for statement in statements:
+            if "updatedAt >" in statement or "deletedAt >" in statement:
+                plan = [row[3] for row in
+                        db.execute("EXPLAIN QUERY PLAN " + statement)]
+                self.assertFalse([detail for detail in plan
+                                  if detail.startswith("SCAN")], plan)
+
+
+class TestChangeLog(DatabaseTestCase):
+    """
+    Unit testing of the change log and its consumer API.
+    """
+    # The CLI opens the database by its path
+    in_memory = False
+
+    def setUp(self):
+        """Create services on a temporary database"""
+        super().setUp()
+        self.user_service = UserService(self.connections)
+        self.task_service = TaskService(self.connections)
+        self.change_service = ChangeLogService(self.connections)
+        self.start = self.change_service.latest_sequence()
+
+    def add_task(self, title):
+        """Adds a task for admin and returns its ID"""
+        return self.task_service.add_task(Task(
+            title=title, description="d", assigned_date="2025-01-01",
+            due_date="2025-02-01", user="admin"))
+
+    def test_changes_logged_in_order(self):
+        """Test inserts, updates and deletes are logged without passwords"""
+        user_id = self.user_service.add_user(
+            User(username="bob", password="secret", email="bob@test.com"))
+        task_id = self.add_task("t")
+        self.task_service.mark_complete(task_id)
+        self.task_service.delete_task(task_id)
+
+        changes = self.change_service.changes_since(self.start)
+        self.assertEqual(
+            [(c.table, c.row_id, c.operation) for c in changes],
+            [("user", user_id, "insert"), ("tasks", task_id, "insert"),
+             ("tasks", task_id, "update"), ("tasks", task_id, "delete")])
+        self.assertNotIn("password", changes[0].data)
+        self.assertEqual(changes[1].data["assigned_date"], "2025-01-01")
+        self.assertEqual(changes[1].data["user"], "admin")
+        self.assertEqual(changes[2].data["is_complete"], "Yes")
+        self.assertEqual(changes[3].data["title"], "t")
+        self.assertEqual(changes[2].data,
+                         {**changes[1].data, "is_complete": "Yes"})
+
+    def test_rolled_back_changes_not_logged(self):
+        """Test a failed batch leaves nothing in the log"""
+        task_id = self.add_task("t")
+        with self.assertRaises(ValueError):
+            self.task_service.apply_batch([("complete", task_id),
+                                           ("archive", task_id)])
+        changes = self.change_service.changes_since(self.start)
+        self.assertEqual([c.operation for c in changes], ["insert"])
+
+    def test_consumer_resumes_from_checkpoint(self):
+        """Test a consumer carries on after the last complete batch"""
+        ids = [self.add_task(f"t{i}") for i in range(5)]
+        self.change_service.save_checkpoint("sync", self.start)
+
+        seen = [c.row_id for c in self.change_service.tail(
+            consumer="sync", batch_size=2, follow=False)]
+        self.assertEqual(seen, ids)
+
+        # Stopping part way through a batch repeats that batch next time
+        self.add_task("t5")
+        self.add_task("t6")
+        tail = self.change_service.tail(consumer="sync", batch_size=2,
+                                        follow=False)
+        next(tail)
+        tail.close()
+        seen = [c.row_id for c in self.change_service.tail(
+            consumer="sync", batch_size=2, follow=False)]
+        self.assertEqual(seen, [ids[-1] + 1, ids[-1] + 2])
+        self.assertEqual(list(self.change_service.tail(consumer="sync",
+                                                       follow=False)), [])
+
+    def test_follow_waits_for_new_changes(self):
+        """Test tail picks up changes made while it is waiting"""
+        stop = threading.Event()
+        seen = []
+
+        def follow():
+            for change in ChangeLogService(self.connections).tail(
+                    after=self.start, poll_interval=0.01, stop=stop):
+                seen.append(change.row_id)
+                if len(seen) == 2:
+                    stop.set()
+
+        thread = threading.Thread(target=follow)
+        thread.start()
+        first = self.add_task("t1")
+        second = self.add_task("t2")
+        thread.join(5)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(seen, [first, second])
+
+    def test_prune_keeps_unread_changes(self):
+        """Test only changes every consumer has read are pruned"""
+        for i in range(4):
+            self.add_task(f"t{i}")
+        latest = self.change_service.latest_sequence()
+        self.assertEqual(self.change_service.prune_changes(), 0)
+
+        self.change_service.save_checkpoint("fast", latest)
+        self.change_service.save_checkpoint("slow", latest - 2)
+        self.change_service.prune_changes()
+
+        remaining = self.change_service.changes_since(0)
+        self.assertEqual([c.sequence for c in remaining],
+                         [latest - 1, latest])
+        self.add_task("t4")
+        self.assertEqual(self.change_service.latest_sequence(), latest + 1)
+
+    def test_changes_since_uses_primary_key(self):
+        """Test reading the log seeks instead of scanning it"""
+        db = self.connections.get_connection()
+        plan = " ".join(row[3] for row in db.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM change_log WHERE sequence > ? "
+            "ORDER BY sequence LIMIT 10", (0,)))
+        self.assertIn("INTEGER PRIMARY KEY (rowid>?)", plan)
+
+    def test_cli_changes(self):
+        """Test the changes command writes the log as JSON lines"""
+        self.add_task("t")
+        self.connections.close_all()
+        out = io.StringIO()
+        argv = ["--database", self.connections.database, "-u", "admin",
+                "-p", "admin", "changes", "--after", str(self.start)]
+        with contextlib.redirect_stderr(io.StringIO()):
+            status = cli_main(argv, io.StringIO(), out)
+
+        self.assertEqual(status, 0)
+        changes = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([(c["table"], c["data"]["title"]) for c in changes],
+                         [("tasks", "t")])
+
+
+class TestBackup(DatabaseTestCase):
+    """
+    Unit testing of the online backup and restore.
+    """
+    # Backups are checked and restored through the database file
+    in_memory = False
+
+    def setUp(self):
+        """Create services on a temporary database with some tasks"""
+        super().setUp()
+        UserService(self.connections)
+        self.task_service = TaskService(self.connections)
+        self.backups = os.path.join(self.tmp.name, "backups")
+        for i in range(200):
+            self.add_task(f"task {i}")
+
+    def add_task(self, title):
+        """Adds a task for admin and returns its ID"""
+        return self.task_service.add_task(Task(
+            title=title, description="d" * 500, assigned_date="2025-01-01",
+            due_date="2025-02-01", user="admin"))
+
+    def backup(self, **kwargs):
+        """Backs up quietly and returns the summary"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            return backup_database(self.connections, self.backups,
+                                   **kwargs)
+
+    def count_tasks(self, path):
+        """Returns the number of tasks in a database file"""
+        db = sqlite3.connect(path)
+        try:
+            return db.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+        finally:
+            db.close()
+
+    def test_backup_is_a_snapshot_while_writing(self):
+        """Test a stepped backup copies one point in time as writes go on"""
+        stop = threading.Event()
+        added = []
+
+        def write():
+            service = TaskService(self.connections)
+            while not stop.is_set():
+                added.append(service.add_task(Task(
+                    title="during", description="d",
+                    assigned_date="2025-01-01", due_date="2025-02-01",
+                    user="admin")))
+            self.connections.close_connection()
+
+        def started(status, remaining, total):
+            if not added:
+                thread.start()
+                while not added:
+                    stop.wait(0.001)
+
+        thread = threading.Thread(target=write)
+        summary = self.backup(pages=1, sleep=0.001, progress=started)
+        stop.set()
+        thread.join()
+
+        self.assertGreater(summary["pages"], 10)
+        self.assertTrue(all(added))
+        self.assertEqual(self.count_tasks(summary["backup"]), 200)
+        db = sqlite3.connect(summary["backup"])
+        self.assertEqual(db.execute("PRAGMA journal_mode").fetchone()[0],
+                         "delete")
+        db.close()
+
+    def test_rotation_keeps_newest(self):
+        """Test only the newest backups are kept"""
+        paths = [self.backup(keep=2)["backup"] for _ in range(4)]
+
+        remaining = list_backups(self.connections.database, self.backups)
+        self.assertEqual([str(path) for path in remaining],
+                         paths[:1:-1])
+        self.assertFalse(any(name.endswith(".partial")
+                             for name in os.listdir(self.backups)))
+
+    def test_restore_replaces_live_data(self):
+        """Test a restore brings back the backed up tasks"""
+        summary = self.backup()
+        self.task_service.get_task(1)
+        self.task_service.delete_task(1)
+        self.add_task("after backup")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            restored = restore_database(summary["backup"], self.connections)
+
+        self.assertEqual(restored["version"], SCHEMA_VERSION)
+        self.assertEqual(self.task_service.get_task(1).title, "task 0")
+        self.assertEqual(self.count_tasks(self.connections.database), 200)
+
+    def test_damaged_backup_not_restored(self):
+        """Test a backup failing the integrity check is refused"""
+        path = self.backup()["backup"]
+        with open(path, "r+b") as file:
+            file.seek(100)
+            file.write(b"\xff" * 4096)
+
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            self.assertIsNone(restore_database(path, self.connections))
+        self.assertIn("integrity check", out.getvalue())
+        self.assertEqual(self.count_tasks(self.connections.database), 200)
+
+
+class TestTaskSearch(DatabaseTestCase):
+    """
+    Unit testing of the full text task search.
+    """
+    def setUp(self):
+        """Create services on a temporary database with some tasks"""
+        super().setUp()
+        UserService(self.connections).add_user(
+            User(username="bob", password="pwd", email="bob@test.com"))
+        self.task_service = TaskService(self.connections)
+        for title, description, user in (
+                ("Quarterly report", "Write the quarterly report", "admin"),
+                ("Report bug", "Crash when saving", "bob"),
+                ("Reporting dashboard", "Charts for the team", "bob"),
+                ("Groceries", "Milk, eggs, bread", "admin")):
+            self.task_service.add_task(Task(
+                title=title, description=description,
+                assigned_date="2025-01-01", due_date="2025-02-01",
+                user=user))
+
+    def search(self, query, user=None):
+        """Returns the IDs of the matching tasks"""
+        return [task.task_id
+                for task in self.task_service.search_tasks(query, user)]
+
+    def test_ranked_and_prefix_search(self):
+        """Test the best match comes first and prefixes match"""
+        self.assertEqual(self.search("report")[0], 1)
+        self.assertEqual(sorted(self.search("report")), [1, 2])
+        self.assertEqual(sorted(self.search("rep*")), [1, 2, 3])
+        self.assertEqual(self.search("report crash"), [2])
+
+    def test_user_filter(self):
+        """Test searches can be limited to one user's tasks"""
+        self.assertEqual(sorted(self.search("rep*", "bob")), [2, 3])
+
+    def test_index_follows_changes(self):
+        """Test updated and deleted tasks are found correctly"""
+        task = self.task_service.get_task(4)
+        self.task_service.update_task(Task(
+            "Shopping", task.description, task.assigned_date,
+            task.due_date, task.user, task.task_id))
+        self.task_service.delete_task(1)
+
+        self.assertEqual(self.search("groceries"), [])
+        self.assertEqual(self.search("shopping"), [4])
+        self.assertEqual(sorted(self.search("report")), [2])
+
+    def test_query_syntax_is_safe(self):
+        """Test punctuation and FTS5 keywords don't cause errors"""
+        self.assertEqual(self.search('"milk" OR (eggs'), [])
+        self.assertEqual(self.search("milk, eggs!"), [4])
+        self.assertEqual(self.search("***"), [])
+
+
+class TestRendering(unittest.TestCase):
+    """
+    Unit testing of the listing renderer.
+    """
+    def setUp(self):
+        """Create some tasks to render"""
+        self.tasks = [Task(title=f"title {i}", description="line one\nline "
+                           "two that is much too long to fit in the table",
+                           assigned_date="2025-01-01", due_date="2025-02-01",
+                           user="admin", task_id=i)
+                      for i in range(1, 2501)]
+
+    def test_table_one_row_per_task(self):
+        """Test each task is one row no wider than the table"""
+        text = Renderer("table", width=100).format(self.tasks[:5])
+        lines = text.splitlines()
+
+        self.assertEqual(len(lines), 7)
+        self.assertTrue(lines[0].split()[:2] == ["No.", "Assignee"])
+        self.assertTrue(all(len(line) <= 100 for line in lines))
+        self.assertTrue(lines[2].endswith("..."))
+
+    def test_json_lines(self):
+        """Test the machine readable mode writes one object per task"""
+        text = Renderer("json").format(self.tasks[:3])
+        tasks = [json.loads(line) for line in text.splitlines()]
+
+        self.assertEqual([task["task_id"] for task in tasks], [1, 2, 3])
+        self.assertEqual(tasks[0]["description"], self.tasks[0].description)
+
+    def test_machine_readable_listing_streams_all_pages(self):
+        """Test json and csv listings write every page without prompts"""
+        def get_page(after, limit):
+            start = after or 0
+            return self.tasks[start:start + limit]
+
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            show_task_pages(get_page, lambda task: task.task_id, "empty",
+                            Renderer("csv"))
+
+        rows = list(csv.reader(io.StringIO(out.getvalue())))
+        self.assertEqual(len(rows), len(self.tasks) + 1)
+        self.assertEqual(rows[0][:2], ["task_id", "title"])
+        self.assertEqual(rows[-1][1], "title 2500")
+
+    def test_pager_without_terminal(self):
+        """Test output goes straight through when not on a terminal"""
+        out = io.StringIO()
+        with pager(out) as stream:
+            stream.write("text")
+
+        self.assertEqual(out.getvalue(), "text")
+
+
+class TestBenchSuite(unittest.TestCase):
+    """
+    Unit testing of the benchmark suite's runner and result comparison.
+    """
+    def results(self, **medians):
+        """Builds a result set with one case per keyword, at size 10"""
+        return {"results": [{"case": case, "size": 10, "median": median}
+                            for case, median in medians.items()]}
+
+    def compare(self, before, after):
+        """Returns {case: verdict} from compare_results"""
+        return {row[0]: row[5]
+                for row in bench_suite.compare_results(before, after, 0.1)}
+
+    def test_regression_and_no_change(self):
+        """Test only a slowdown past the threshold is a regression"""
+        verdicts = self.compare(self.results(slow=1.0, same=1.0, fast=1.0),
+                                self.results(slow=1.2, same=1.05, fast=0.5))
+        self.assertEqual(verdicts,
+                         {"slow": "regression", "same": "", "fast": "faster"})
+
+    def test_missing_case(self):
+        """Test a case missing from the later results is reported"""
+        rows = bench_suite.compare_results(self.results(kept=1.0, gone=1.0),
+                                           self.results(kept=1.0, new=1.0))
+        self.assertEqual([(row[0], row[3], row[5]) for row in rows],
+                         [("kept", 1.0, ""), ("gone", None, "missing")])
+
+    def test_zero_medians(self):
+        """Test cases too fast to measure both times count as unchanged"""
+        verdicts = self.compare(self.results(zero=0.0, grew=0.0),
+                                self.results(zero=0.0, grew=1e-6))
+        self.assertEqual(verdicts, {"zero": "", "grew": "regression"})
+
+    def test_compare_exit_status(self):
+        """Test compare exits with 1 for a regression or a missing case"""
+        base = self.results(first=1.0, second=1.0)
+        with tempfile.TemporaryDirectory() as tmp:
+            def status(after):
+                paths = []
+                for name, results in (("before", base), ("after", after)):
+                    paths.append(os.path.join(tmp, f"{name}.json"))
+                    with open(paths[-1], "w", encoding="utf-8") as file:
+                        json.dump(results, file)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    return bench_suite.main(["compare", *paths])
+
+            self.assertEqual(status(self.results(first=1.0, second=1.05)), 0)
+            self.assertEqual(status(self.results(first=1.0, second=2.0)), 1)
+            self.assertEqual(status(self.results(first=1.0)), 1)
+
+    def test_delete_cases_run_alone(self):
+        """Test the delete cases add the users they delete"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = bench_suite.run_suite(
+                [20], number=3, repeat=1, warmup=1, names=["delete_user"])
+        self.assertEqual([result["case"] for result in results["results"]],
+                         ["UserRepository.delete_user",
+                          "UserService.delete_user"])
+
+
+class TestGenerate(DatabaseTestCase):
+    """
+    Unit testing of the synthetic data generator.
+    """
+    def seed(self, connections, seed=1):
+        """Seeds a database with 20 users and 500 tasks"""
+        UserService(connections)
+        TaskService(connections)
+        return generate.seed_database(connections, 20, 500, seed)
+
+    def schema(self, connections):
+        """Returns the triggers and indexes of a database"""
+        return connections.get_connection().execute(
+            "SELECT type, name, sql FROM sqlite_master "
+            "WHERE type IN ('trigger', 'index') ORDER BY name").fetchall()
+
+    def rows(self, connections):
+        """Returns the users and tasks, leaving out the change clock"""
+        db = connections.get_connection()
+        return (db.execute("SELECT * FROM user ORDER BY id").fetchall(),
+                db.execute("SELECT id, title, description, assignedDate, "
+                           "dueDate, isComplete, userId FROM tasks "
+                           "ORDER BY id").fetchall())
+
+    def test_files_are_deterministic(self):
+        """Test the same seed writes byte identical files"""
+        contents = []
+        for name in ("first", "second"):
+            directory = os.path.join(self.tmp.name, name)
+            os.mkdir(directory)
+            generate.write_files(directory, 20, 500, seed=7)
+            contents.append([Path(directory, file).read_bytes()
+                             for file in ("users.txt", "tasks.txt")])
+
+        self.assertEqual(contents[0], contents[1])
+        self.assertEqual(contents[0][1].count(b"\n"), 501)
+
+    def test_seeding_is_deterministic_and_complete(self):
+        """Test seeding gives the same rows every time and restores the
+        triggers, indexes, counts and search index"""
+        UserService(self.connections)
+        TaskService(self.connections)
+        schema = self.schema(self.connections)
+        self.assertEqual(self.seed(self.connections)["tasks"], 500)
+
+        other = ConnectionManager(":memory:")
+        self.seed(other)
+        self.assertEqual(self.rows(self.connections), self.rows(other))
+        other.close_all()
+
+        self.assertEqual(self.schema(self.connections), schema)
+        db = self.connections.get_connection()
+        self.assertEqual(
+            db.execute("SELECT userId, open, completed FROM task_counts "
+                       "ORDER BY userId").fetchall(),
+            db.execute("SELECT userId, SUM(isComplete = 0), "
+                       "SUM(isComplete = 1) FROM tasks GROUP BY userId "
+                       "ORDER BY userId").fetchall())
+        db.execute("INSERT INTO tasks_fts(tasks_fts) "
+                   "VALUES('integrity-check')")
+
+        # The restored triggers keep working afterwards
+        task_service = TaskService(self.connections)
+        title = task_service.get_task(1).title
+        self.assertIn(1, [task.task_id for task in
+                          task_service.search_tasks(title.split()[0])])
+        task_service.delete_task(1)
+        self.assertEqual(
+            db.execute("SELECT SUM(open + completed) FROM task_counts")
+            .fetchone()[0], 499)
+
+    def test_tasks_need_users(self):
+        """Test tasks without users are refused before anything is
+        written"""
+        with self.assertRaises(ValueError):
+            generate.write_files(self.tmp.name, 0, 5)
+        with self.assertRaises(ValueError):
+            generate.seed_database(self.connections, 0, 5)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
 
 if __name__ == "__main__":
     unittest.main()